@@ -0,0 +1,106 @@
+import asyncio
+import re
+from collections import Counter
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+from urllib.parse import quote_plus
+
+from pydantic import BaseModel
+
+from src.models import (
+    BatchProductCheck,
+    CandidateItem,
+    ProductCheck,
+    QueryVariations,
+    SearchPageAnalysis,
+    SearchPageSource,
+    SearchURLGenerator,
+)
+from src.utils.tokens import estimate_tokens
+
+LINK_RE = re.compile(r"\[([^\]]+)\]\((\S*?/item/(\d+))[^)]*\)")
+AD_URL_RE = re.compile(r"^URL: (\S*/item/(\d+)\S*)", re.MULTILINE)
+
+
+@dataclass
+class Usage:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+
+
+class FakeModels:
+    """Answers `generate_content` deterministically from the prompt, like a well-behaved Gemini.
+
+    Search URLs point at the sites named in the prompt, search pages yield every linked ad as a candidate and
+    every `hit_every`-th ad (by id) is confirmed in verification.
+    """
+
+    def __init__(self, hit_every: int = 5, latency_ms: float = 0.0):
+        self.hit_every = hit_every
+        self.latency_ms = latency_ms
+        self.calls: Counter[str] = Counter()
+
+    async def generate_content(self, model: str, contents: str, config: dict[str, Any]) -> SimpleNamespace:
+        schema: type[BaseModel] = config["response_schema"]
+        self.calls[schema.__name__] += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        parsed = self._answer(schema, contents)
+        tokens_in = estimate_tokens(contents)
+        tokens_out = estimate_tokens(parsed.model_dump_json())
+        return SimpleNamespace(parsed=parsed, usage_metadata=Usage(tokens_in, tokens_out, tokens_in + tokens_out))
+
+    def _answer(self, schema: type[BaseModel], prompt: str) -> BaseModel:
+        if schema is QueryVariations:
+            wanted = re.search(r'second-hand: "(.*?)"', prompt)
+            base = wanted.group(1) if wanted else "item"
+            return QueryVariations(variations=[f"{base} used", f"{base} begagnad"])
+        if schema is SearchURLGenerator:
+            item = re.search(r"I want to buy a '(.*?)'", prompt)
+            query = quote_plus(item.group(1) if item else "item")
+            sites = re.search(r"marketplaces: (.*?)\.\n", prompt)
+            return SearchURLGenerator(
+                search_pages=[
+                    SearchPageSource(site_name=site, search_url=f"http://{site}/search?q={query}")
+                    for site in (sites.group(1).split(", ") if sites else [])
+                ]
+            )
+        if schema is SearchPageAnalysis:
+            seen: set[str] = set()
+            candidates = []
+            for title, url, _ in LINK_RE.findall(prompt):
+                if url not in seen:
+                    seen.add(url)
+                    candidates.append(
+                        CandidateItem(url=url, title=title, price="", reasoning="linked", confidence_score=80)
+                    )
+            return SearchPageAnalysis(candidates=candidates)
+        if schema is BatchProductCheck:
+            return BatchProductCheck(
+                results=[
+                    ProductCheck(
+                        url=url,
+                        found_item=int(item) % self.hit_every == 0,
+                        item_name=f"Item {item}",
+                        price="1000 kr",
+                        reasoning="deterministic",
+                    )
+                    for url, item in AD_URL_RE.findall(prompt)
+                ]
+            )
+        raise ValueError(f"Fake Gemini has no answer for {schema.__name__}")
+
+
+class FakeGenaiClient:
+    """Stand-in for `genai.Client` exposing only `aio.models.generate_content`."""
+
+    def __init__(self, hit_every: int = 5, latency_ms: float = 0.0):
+        self.models = FakeModels(hit_every=hit_every, latency_ms=latency_ms)
+        self.aio = SimpleNamespace(models=self.models)
+
+    @property
+    def calls(self) -> int:
+        return sum(self.models.calls.values())
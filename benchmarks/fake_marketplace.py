@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import html
+import json
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import parse_qs, urlsplit
+
+BOILERPLATE = (
+    "Home · Categories · Sell · Messages · My account · Help centre · Cookie settings · "
+    "Terms of use · Privacy · Safety tips · Download the app · Follow us · © Fake Marketplace AB"
+)
+
+
+@dataclass
+class MarketplaceConfig:
+    """Shape of the synthetic marketplace."""
+
+    listings_per_search: int = 20
+    ad_kb: float = 4.0
+    latency_ms: float = 50.0
+    # Emit schema.org JSON-LD on search pages, so the structured extractors handle them instead of the LLM.
+    json_ld: bool = False
+
+
+def ad_id(query: str, index: int) -> int:
+    """Stable ad id for the index-th listing of a query; different queries get disjoint ids."""
+    base = int.from_bytes(hashlib.sha1(query.encode()).digest()[:3], "big")
+    return base * 1000 + index
+
+
+class FakeMarketplace:
+    """Local HTTP server serving deterministic marketplace pages and accepting ntfy POSTs.
+
+    `GET /search?q=...` lists `listings_per_search` ads, `GET /item/<id>` serves an ad of roughly `ad_kb`
+    kilobytes and any POST is recorded as a notification. Every response is delayed by `latency_ms`.
+    """
+
+    def __init__(self, config: MarketplaceConfig | None = None):
+        self.config = config or MarketplaceConfig()
+        self.requests: Counter[str] = Counter()
+        self.bytes_sent = 0
+        self.notifications: list[str] = []
+        self.server: asyncio.Server | None = None
+
+    @property
+    def host(self) -> str:
+        assert self.server
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}"
+
+    @property
+    def pages_served(self) -> int:
+        return self.requests["search"] + self.requests["item"]
+
+    async def __aenter__(self) -> "FakeMarketplace":
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        assert self.server
+        self.server.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target = lines[0].split(" ")[:2]
+                headers = {k.lower(): v for k, _, v in (line.partition(": ") for line in lines[1:] if line)}
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                await asyncio.sleep(self.config.latency_ms / 1000)
+                status, content_type, payload = self._respond(method, target, body)
+                self.bytes_sent += len(payload)
+                head_out = (
+                    f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n"
+                )
+                writer.write(head_out.encode() + payload)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, target: str, body: bytes) -> tuple[str, str, bytes]:
+        parts = urlsplit(target)
+        if method == "POST":
+            self.requests["notify"] += 1
+            self.notifications.append(body.decode("utf-8", "replace"))
+            return "200 OK", "application/json", b"{}"
+        if parts.path == "/search":
+            self.requests["search"] += 1
+            query = parse_qs(parts.query).get("q", [""])[0]
+            return "200 OK", "text/html; charset=utf-8", self.search_page(query).encode()
+        if parts.path.startswith("/item/") and parts.path[6:].isdigit():
+            self.requests["item"] += 1
+            return "200 OK", "text/html; charset=utf-8", self.ad_page(int(parts.path[6:])).encode()
+        self.requests["other"] += 1
+        return "404 Not Found", "text/plain", b"not found"
+
+    @staticmethod
+    def price(item: int) -> int:
+        return 500 + (item * 37) % 4500
+
+    def search_page(self, query: str) -> str:
+        title = html.escape(query)
+        rows = []
+        items = []
+        for index in range(self.config.listings_per_search):
+            item = ad_id(query, index)
+            rows.append(
+                f'<li class="listing"><a href="/item/{item}">{title} #{index + 1} in good condition</a> '
+                f'<span class="price">{self.price(item)} kr</span> <span>Stockholm · today</span></li>'
+            )
+            items.append(
+                {
+                    "@type": "ListItem",
+                    "position": index + 1,
+                    "item": {
+                        "@type": "Product",
+                        "name": f"{query} #{index + 1} in good condition",
+                        "url": f"{self.url}/item/{item}",
+                        "offers": {"@type": "Offer", "price": self.price(item), "priceCurrency": "SEK"},
+                    },
+                }
+            )
+        json_ld = ""
+        if self.config.json_ld:
+            data = json.dumps({"@context": "https://schema.org", "@type": "ItemList", "itemListElement": items})
+            json_ld = f'<script type="application/ld+json">{data}</script>'
+        return (
+            f"<html><head><title>{title} – Fake Marketplace</title>{json_ld}</head><body>"
+            f"<nav>{BOILERPLATE}</nav><main><h1>Results for {title}</h1><ul>{''.join(rows)}</ul></main>"
+            f"<footer>{BOILERPLATE}</footer></body></html>"
+        )
+
+    def ad_page(self, item: int) -> str:
+        paragraph = (
+            f"<p>Item {item} is for sale. Well kept, works as it should, smoke-free home. "
+            f"Pickup in Stockholm or shipping at the buyer's cost. Original box and manual included.</p>"
+        )
+        repeat = max(1, int(self.config.ad_kb * 1024 / len(paragraph)))
+        return (
+            f"<html><head><title>Item {item}</title></head><body><nav>{BOILERPLATE}</nav><main>"
+            f'<h1>Item {item}</h1><p class="price">{self.price(item)} kr</p>{paragraph * repeat}</main>'
+            f"<footer>{BOILERPLATE}</footer></body></html>"
+        )
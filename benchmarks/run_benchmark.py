@@ -0,0 +1,202 @@
+"""Offline end-to-end benchmark of `scraper.main`.
+
+Runs the full pipeline against a local fake marketplace and a deterministic fake Gemini client in a
+scratch directory, then appends throughput, LLM calls per hit, peak RSS and wall clock to
+`benchmarks/history.jsonl` and compares them with the previous run of the same workload.
+
+    python -m benchmarks.run_benchmark --tasks 3 --listings 20 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any
+
+from benchmarks.fake_genai import FakeGenaiClient
+from benchmarks.fake_marketplace import FakeMarketplace, MarketplaceConfig
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.jsonl")
+
+# Metrics where a higher value is a regression; pages_per_min regresses when it drops.
+LOWER_IS_BETTER = ("wall_clock_s", "llm_calls_per_hit", "peak_rss_mb")
+HIGHER_IS_BETTER = ("pages_per_min",)
+
+
+@dataclass
+class Workload:
+    tasks: int = 3
+    listings: int = 20
+    ad_kb: float = 4.0
+    latency_ms: float = 50.0
+    llm_latency_ms: float = 200.0
+    hit_every: int = 5
+    json_ld: bool = False
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_revision() -> tuple[str, bool]:
+    """Short commit hash of the checkout and whether tracked files have uncommitted changes."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(status.strip())
+
+
+def bench_settings(workload: Workload, market: FakeMarketplace) -> Any:
+    """Default settings, pointed at the fake marketplace with politeness limits and quotas lifted."""
+    from src.config import Settings
+    from src.models import ModelQuota, RateLimitPolicy, ScrapeTask
+
+    return Settings(
+        gemini_api_key="offline-benchmark",
+        CI=False,
+        tasks=[
+            ScrapeTask(name=f"Bench {n}", search_query=f"bench item {n}", fuzzy_search=n % 2 == 1)
+            for n in range(workload.tasks)
+        ],
+        target_sites=[market.host],
+        ntfy_server=market.url,
+        rate_limit_default=RateLimitPolicy(requests_per_second=1000, burst=1000, min_interval=0),
+        model_quotas={"fake-flash": ModelQuota(requests_per_minute=1_000_000, tokens_per_minute=10**12)},
+        http2=False,
+    )
+
+
+async def run_benchmark(workload: Workload) -> dict[str, Any]:
+    """Runs `scraper.main` once in the current directory and returns its metrics."""
+    # src.config builds the default settings at import and needs an API key to do so.
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    from scraper import main
+    from src.utils.tracing import tracer
+
+    tracer.spans.clear()
+    marketplace = MarketplaceConfig(
+        listings_per_search=workload.listings,
+        ad_kb=workload.ad_kb,
+        latency_ms=workload.latency_ms,
+        json_ld=workload.json_ld,
+    )
+    async with FakeMarketplace(marketplace) as market:
+        client = FakeGenaiClient(hit_every=workload.hit_every, latency_ms=workload.llm_latency_ms)
+        started = time.perf_counter()
+        await main(bench_settings(workload, market), genai_client=client, launch_browser=False)
+        wall_clock = time.perf_counter() - started
+
+    with open(os.path.join("data", "results.jsonl"), encoding="utf-8") as f:
+        hits = sum(1 for line in f if line.strip())
+
+    stages = tracer.summary()["stage"]
+    return {
+        "wall_clock_s": round(wall_clock, 3),
+        "pages": market.pages_served,
+        "pages_per_min": round(market.pages_served / wall_clock * 60, 1),
+        "llm_calls": client.calls,
+        "llm_calls_by_schema": dict(client.models.calls),
+        "hits": hits,
+        "llm_calls_per_hit": round(client.calls / hits, 3) if hits else None,
+        "notifications": market.requests["notify"],
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stage_p95_s": {name: round(row["p95"], 4) for name, row in stages.items()},
+    }
+
+
+def compare(previous: dict[str, Any], current: dict[str, Any], tolerance: float) -> list[str]:
+    """Prints metric deltas against the previous run and returns the names of regressed metrics."""
+    regressions = []
+    print(f"\nCompared with {previous['commit']} ({previous['timestamp']}):")
+    for name in (*HIGHER_IS_BETTER, *LOWER_IS_BETTER):
+        old, new = previous["metrics"].get(name), current["metrics"].get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = change < -tolerance if name in HIGHER_IS_BETTER else change > tolerance
+        if worse:
+            regressions.append(name)
+        print(f"  {'⚠️ ' if worse else '  '}{name:<20} {old:>10} → {new:>10} ({change:+.1%})")
+    return regressions
+
+
+def main() -> int:
+    defaults = Workload()
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the scraper pipeline.")
+    parser.add_argument("--tasks", type=int, default=defaults.tasks, help="Scrape tasks per run")
+    parser.add_argument("--listings", type=int, default=defaults.listings, help="Listings per search page")
+    parser.add_argument("--ad-kb", type=float, default=defaults.ad_kb, help="Approximate size of an ad page")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="Marketplace response delay")
+    parser.add_argument("--llm-latency-ms", type=float, default=defaults.llm_latency_ms, help="Fake Gemini delay")
+    parser.add_argument("--hit-every", type=int, default=defaults.hit_every, help="Every n-th ad is a hit")
+    parser.add_argument("--json-ld", action="store_true", help="Serve JSON-LD so extractors replace the LLM")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--no-record", action="store_true", help="Don't append this run to the history")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the scraper's own log output")
+    args = parser.parse_args()
+
+    workload = Workload(
+        tasks=args.tasks,
+        listings=args.listings,
+        ad_kb=args.ad_kb,
+        latency_ms=args.latency_ms,
+        llm_latency_ms=args.llm_latency_ms,
+        hit_every=args.hit_every,
+        json_ld=args.json_ld,
+    )
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="scraper-bench-") as scratch:
+        os.chdir(scratch)
+        try:
+            metrics = asyncio.run(run_benchmark(workload))
+        finally:
+            os.chdir(cwd)
+
+    commit, dirty = git_revision()
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit + ("-dirty" if dirty else ""),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "workload": asdict(workload),
+        "metrics": metrics,
+    }
+    print(json.dumps(entry, indent=2))
+
+    history = []
+    if os.path.exists(HISTORY_FILE):
+        with open(HISTORY_FILE, encoding="utf-8") as f:
+            history = [json.loads(line) for line in f if line.strip()]
+    previous = next((e for e in reversed(history) if e["workload"] == entry["workload"]), None)
+    regressions = compare(previous, entry, args.tolerance) if previous else []
+
+    if not args.no_record:
+        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
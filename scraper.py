@@ -1,134 +1,317 @@
+import argparse
 import asyncio
 import logging
+import os
+import signal
 import sys
+from collections.abc import Callable, Iterator
+from contextlib import AbstractAsyncContextManager, contextmanager, nullcontext, suppress
+from datetime import datetime
+from typing import Any, Literal
 
 from crawl4ai import AsyncWebCrawler  # type: ignore
 
-from src.config import settings
-from src.models import (
-    SearchPageSource,
-)
+from src.config import Settings, settings
 from src.services.analysis import GeminiAnalyzer
+from src.services.browser_pool import BrowserPool
+from src.services.cassette import Cassette
+from src.services.change_detection import SearchPageChangeDetector
 from src.services.crawler import ContentFetcher
+from src.services.daemon import ScrapeDaemon
+from src.services.distiller import ContentDistiller
+from src.services.distributed import Coordinator, QueueWorker
+from src.services.extractors import ExtractorRegistry
+from src.services.http_client import HttpClient
+from src.services.llm_cache import LLMCache
+from src.services.model_scheduler import ModelScheduler
 from src.services.notification import NotificationService
+from src.services.page_cache import PageCache
+from src.services.pipeline import ScrapePipeline
 from src.services.presenter import ResultsPresenter
+from src.services.source_scheduler import SourceScheduler
 from src.services.storage import GitManager, HistoryManager
+from src.services.work_queue import WorkQueue, open_queue
+from src.utils.concurrency import DomainLimiter
+from src.utils.rate_limiter import DomainRateLimiter
+from src.utils.tracing import tracer
+from src.utils.usage_tracker import USAGE_FILE, UsageTracker
 
 # Configure logger
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
+def export_traces(trace_dir: str) -> None:
+    """Writes the spans recorded so far as JSONL and Chrome traces and logs the per-stage summary."""
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    tracer.export_jsonl(os.path.join(trace_dir, f"run-{stamp}.jsonl"))
+    tracer.export_chrome(os.path.join(trace_dir, f"run-{stamp}.trace.json"))
+    tracer.log_summary()
+
+
+async def main(
+    config: Settings = settings,
+    genai_client: Any | None = None,
+    launch_browser: bool = True,
+    daemon: bool = False,
+    role: Literal["standalone", "coordinator", "worker"] = "standalone",
+) -> None:
+    """Runs every configured task once, or keeps polling them on their own schedules when `daemon` is set.
+
+    With a `role`, the run is split over the work queue instead: the coordinator queues a search job per
+    due source and exits, and workers (any number, in parallel) run the queued stages.
+
+    `genai_client` replaces the Gemini client and `launch_browser=False` skips starting Chromium (pages
+    that need a browser then fail); both exist for the offline benchmark. When replaying a cassette, no
+    browser is started and notifications are only logged.
+    """
     logger.info("🚀 Starting AI-Driven Agentic Web Scraper...")
 
     # 1. Initialize Services
+    # Workers share the results log, caches and usage rollup with other processes; only the coordinator
+    # (or a standalone run) renders, prunes and rolls them up, so no worker overwrites the others' view.
+    owns_shared_files = role != "worker"
     try:
-        notification_service = NotificationService(settings.ntfy_topic)
-        storage_service = HistoryManager(settings.history_file)
-        git_service = GitManager(settings.history_file, settings.git_user_name, settings.git_user_email)
-        analyzer = GeminiAnalyzer(settings.gemini_api_key)
-        content_fetcher = ContentFetcher(headless=settings.headless)
+        cassette = Cassette(config.cassette_file, config.cassette_mode) if config.cassette_mode != "off" else None
+        replaying = cassette is not None and cassette.replaying
+        http_client = HttpClient(
+            max_connections=config.http_max_connections,
+            max_connections_per_host=config.http_max_connections_per_host,
+            http2=config.http2,
+        )
+        notification_service = NotificationService(
+            config.ntfy_topic,
+            http_client=http_client,
+            server_url=config.ntfy_server,
+            digest_window=config.notify_digest_seconds,
+            max_retries=config.notify_retries,
+            dry_run=replaying,
+        )
+        storage_service = HistoryManager(config.history_file, legacy_json_path=config.legacy_history_file)
+        git_service = GitManager(config.history_file, config.git_user_name, config.git_user_email)
+        llm_cache = None
+        if config.llm_cache_enabled:
+            llm_cache = LLMCache(config.llm_cache_file, config.llm_cache_ttl_hours)
+        analyzer = GeminiAnalyzer(
+            config.gemini_api_key,
+            client=genai_client,
+            cache=llm_cache,
+            cassette=cassette,
+            batch_token_budget=config.batch_token_budget,
+            batch_max_ads=config.batch_max_ads,
+            batch_retries=config.batch_retries,
+            max_concurrent_calls=config.llm_max_concurrency,
+            scheduler=ModelScheduler(config.model_quotas, max_wait=config.llm_max_wait),
+            usage=UsageTracker(
+                config.usage_detail_file,
+                rollup_file=USAGE_FILE if config.usage_rollup and owns_shared_files else None,
+                flush_interval=config.usage_flush_seconds,
+            ),
+        )
+        page_cache_ttl = dict(config.page_cache_ttl_hours)
+        if daemon:
+            # Polls exist to see new listings, so search pages are always refetched or revalidated (304).
+            page_cache_ttl["search"] = 0.0
+        content_fetcher = ContentFetcher(
+            headless=config.headless,
+            rate_limiter=DomainRateLimiter(config.rate_limit_default, config.rate_limits),
+            readiness=config.readiness,
+            page_cache=PageCache(config.page_cache_dir, page_cache_ttl) if config.page_cache_enabled else None,
+            http_client=http_client,
+            static_first=config.static_first,
+            browser_pool=BrowserPool.sized_for_memory(
+                config.browser_tabs,
+                pages_per_tab=config.browser_pages_per_tab,
+                mb_per_tab=config.browser_mb_per_tab,
+            ),
+            cassette=cassette,
+        )
         presenter = ResultsPresenter()
+        queue = None
+        if role != "standalone":
+            queue = open_queue(
+                config.queue_backend,
+                config.queue_file,
+                lease_seconds=config.queue_lease_seconds,
+                max_attempts=config.queue_max_attempts,
+            )
     except Exception as e:
         logger.critical(f"❌ Failed to initialize services: {e}")
         sys.exit(1)
 
     # Load history
-    seen_urls = storage_service.load()
-    logger.info(f"📜 Loaded {len(seen_urls)} previously seen items.")
-
-    async with AsyncWebCrawler(config=content_fetcher.browser_config) as crawler:
-        for task in settings.tasks:
-            logger.info(f"\n⚡ Starting Task: {task.name}")
-            notification_service.notify_start(task.name)
-
-            # A. Generate Queries / Direct URLs
-            if task.search_query.startswith("http"):
-                logger.info(f"   🔗 Direct URL detected: {task.search_query}")
-                all_search_urls = [SearchPageSource(site_name="Direct", search_url=task.search_query)]
-            else:
-                queries = [task.search_query]
-                if task.fuzzy_search:
-                    variations = await analyzer.generate_query_variations(task.search_query)
-                    queries.extend([v for v in variations if v not in queries])
-
-                logger.info(f"   🔎 Searching for queries: {', '.join(queries)}")
-
-                all_search_urls = []
-                for q in queries:
-                    urls = await analyzer.get_search_urls(q, settings.target_sites)
-                    all_search_urls.extend(urls)
-
-            ads_to_analyze: list[dict[str, str]] = []
-
-            # B. Agentic Search Page Analysis
-            for source in all_search_urls:
-                logger.info(f"   🌐 Checking: {source.search_url}")
-
-                list_content = await content_fetcher.fetch_ad_content(crawler, source.search_url)
-                if not list_content:
-                    continue
-
-                candidates = await analyzer.analyze_search_page(list_content, task)
-
-                if not candidates:
-                    logger.info("   ℹ️ No candidates found on this page.")
-                    continue
-
-                logger.info(f"   ✅ Agent selected {len(candidates)} candidates.")
-
-                # C. Deep Dive
-                for cand in candidates:
-                    if cand.url in seen_urls:
-                        continue
-
-                    full_url = content_fetcher.fix_relative_url(source.search_url, cand.url)
-                    if not content_fetcher.is_valid_ad_link(full_url) or full_url in seen_urls:
-                        continue
-
-                    logger.info(f"      🕵️ Deep diving: {cand.title} ({cand.price})")
-
-                    ad_content = await content_fetcher.fetch_ad_content(crawler, full_url)
-                    if ad_content:
-                        ads_to_analyze.append({"site": source.site_name, "url": full_url, "content": ad_content})
-                        seen_urls.append(full_url)
-
-            # D. Batch Verify
-            if ads_to_analyze:
-                item_label = task.name if task.search_query.startswith("http") else task.search_query
-                logger.info(f"   🧠 Verifying {len(ads_to_analyze)} candidates for {item_label}...")
-                results = await analyzer.analyze_batch(item_label, ads_to_analyze)
-
-                confirmed_hits = []
-                if results:
-                    for res in results:
-                        if res.found_item:
-                            logger.info(f"      🎉 MATCH! {res.item_name} - {res.price}")
-                            notification_service.notify_match(res.item_name, res.price, res.url)
-                            confirmed_hits.append(res)
-                        else:
-                            logger.info(f"      ❌ Skip: {res.item_name} ({res.reasoning})")
-
-                # Save verified hits (or update scan status)
-                presenter.save_results(confirmed_hits, task.name, total_scanned=len(ads_to_analyze))
-            else:
-                # Update status even if no candidates
-                presenter.save_results([], task.name, total_scanned=0)
-
-            logger.info(f"✨ Task '{task.name}' finished.")
-
-    storage_service.save(seen_urls)
-
-    if settings.ci_mode:
+    if config.history_retention_days is not None:
+        expired = storage_service.expire(config.history_retention_days)
+        if expired:
+            logger.info(f"🧹 Expired {expired} seen items older than {config.history_retention_days} days.")
+    logger.info(f"📜 Loaded {len(storage_service)} previously seen items.")
+
+    # Workers report crawl outcomes through the queue; only the coordinator keeps the schedule.
+    source_scheduler = None
+    if role != "worker":
+        source_scheduler = SourceScheduler(
+            config.source_schedule_file,
+            min_minutes=config.crawl_min_minutes,
+            max_minutes=config.crawl_max_minutes,
+            target_new=config.crawl_target_new,
+            enabled=config.adaptive_crawl,
+        )
+    pipeline = ScrapePipeline(
+        analyzer=analyzer,
+        content_fetcher=content_fetcher,
+        notification_service=notification_service,
+        presenter=presenter,
+        seen=storage_service,
+        target_sites=config.target_sites,
+        limiter=DomainLimiter(config.max_concurrency, config.max_concurrency_per_domain),
+        concurrent=config.concurrent_mode,
+        extractors=ExtractorRegistry(enabled=config.structured_extraction),
+        change_detector=SearchPageChangeDetector(config.change_detection_file) if config.change_detection else None,
+        distiller=ContentDistiller(
+            search_budget=config.distill_search_tokens,
+            ad_budget=config.distill_ad_tokens,
+            enabled=config.distill_content,
+        ),
+        source_scheduler=source_scheduler,
+        pagination=config.pagination,
+        max_search_pages=config.max_search_pages,
+    )
+
+    tracer.enabled = config.trace_enabled
+    browser: AbstractAsyncContextManager[Any] = (
+        AsyncWebCrawler(config=content_fetcher.browser_config)
+        if launch_browser and not replaying and role != "coordinator"
+        else nullcontext(None)
+    )
+    async with http_client, browser as crawler:
+        if queue and role == "coordinator":
+            await Coordinator(pipeline, queue).enqueue(config.tasks)
+        elif queue and role == "worker":
+            await run_worker(config, pipeline, queue, crawler)
+        elif daemon:
+            await run_daemon(config, pipeline, crawler)
+        else:
+            with tracer.span("run", tasks=len(config.tasks)):
+                await pipeline.run(crawler, config.tasks)
+        # Deliver pending digests while the HTTP client is still open.
+        await notification_service.aclose()
+
+    if owns_shared_files:
+        presenter.render()
+    if cassette:
+        cassette.save()
+        cassette.log_summary()
+    if tracer.enabled and tracer.spans:
+        export_traces(config.trace_dir)
+    notification_service.log_summary()
+    pipeline.extractors.log_summary()
+    pipeline.distiller.log_summary()
+    if pipeline.source_scheduler:
+        pipeline.source_scheduler.log_summary()
+        pipeline.source_scheduler.save()
+    if pipeline.change_detector:
+        pipeline.change_detector.log_summary()
+        pipeline.change_detector.close()
+    content_fetcher.rate_limiter.log_summary()
+    content_fetcher.browser_pool.log_summary()
+    content_fetcher.readiness_tracker.log_summary()
+    content_fetcher.readiness_tracker.save()
+    content_fetcher.tier_memory.log_summary()
+    content_fetcher.tier_memory.save()
+    if content_fetcher.page_cache:
+        content_fetcher.page_cache.log_summary()
+        if owns_shared_files:
+            content_fetcher.page_cache.prune()
+
+    analyzer.scheduler.log_summary()
+    analyzer.usage.log_summary(hits=pipeline.confirmed_hits)
+    analyzer.usage.flush()
+    storage_service.close()
+    if queue:
+        logger.info(f"   📥 Work queue: {queue.counts()}")
+        queue.close()
+    if llm_cache:
+        llm_cache.log_summary()
+        if owns_shared_files:
+            llm_cache.prune()
+        llm_cache.close()
+
+    if config.ci_mode and not replaying and not daemon and role == "standalone":
         git_service.commit_and_push("chore: update seen items and results", branch="scraper-results")
 
     logger.info("💤 Scraper finished successfully.")
 
 
+async def run_daemon(config: Settings, pipeline: ScrapePipeline, crawler: Any) -> None:
+    """Polls the tasks until SIGINT/SIGTERM, flushing results, usage and traces whenever no poll runs."""
+
+    def on_idle() -> None:
+        pipeline.presenter.render()
+        pipeline.analyzer.usage.flush()
+        if pipeline.source_scheduler:
+            pipeline.source_scheduler.save()
+        if tracer.enabled and tracer.spans:
+            export_traces(config.trace_dir)
+            # One trace file per busy period, so a resident process doesn't hold every span it ever recorded.
+            tracer.spans.clear()
+
+    scrape_daemon = ScrapeDaemon(
+        pipeline,
+        config.tasks,
+        default_minutes=config.daemon_poll_minutes,
+        jitter=config.daemon_jitter,
+        on_idle=on_idle,
+    )
+    with stop_on_signals(scrape_daemon.stop):
+        await scrape_daemon.run(crawler)
+
+
+async def run_worker(config: Settings, pipeline: ScrapePipeline, queue: WorkQueue, crawler: Any) -> None:
+    """Runs queued jobs until the queue stays empty for `worker_idle_exit` seconds or SIGINT/SIGTERM."""
+    worker = QueueWorker(
+        pipeline,
+        queue,
+        concurrency=config.worker_concurrency,
+        batch_size=config.batch_max_ads,
+        idle_exit=config.worker_idle_exit,
+    )
+    with stop_on_signals(worker.stop):
+        await worker.run(crawler)
+
+
+@contextmanager
+def stop_on_signals(stop: Callable[[], None]) -> Iterator[None]:
+    """Calls `stop` on SIGINT/SIGTERM while the block runs, so running work can finish cleanly."""
+    loop = asyncio.get_running_loop()
+    signals = (signal.SIGINT, signal.SIGTERM)
+    for sig in signals:
+        # Not available on Windows; Ctrl+C then ends the process via KeyboardInterrupt.
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop)
+    try:
+        yield
+    finally:
+        for sig in signals:
+            with suppress(NotImplementedError):
+                loop.remove_signal_handler(sig)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI-driven agentic marketplace scraper.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--daemon", action="store_true", help="Keep running and poll each task on its own interval until stopped"
+    )
+    mode.add_argument(
+        "--coordinator", action="store_true", help="Queue a search job per due source on the work queue and exit"
+    )
+    mode.add_argument("--worker", action="store_true", help="Run jobs from the work queue until it stays empty")
+    args = parser.parse_args()
+    role: Literal["standalone", "coordinator", "worker"] = (
+        "coordinator" if args.coordinator else "worker" if args.worker else "standalone"
+    )
     try:
-        asyncio.run(main())
+        asyncio.run(main(daemon=args.daemon, role=role))
     except KeyboardInterrupt:
         logger.info("🛑 Scraper stopped by user.")
     except Exception as e:
@@ -1,9 +1,10 @@
 import logging
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from src.models import ScrapeTask
+from src.models import ModelQuota, PaginationRule, RateLimitPolicy, ReadinessPolicy, ScrapeTask
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -16,7 +17,36 @@ class Settings(BaseSettings):
     ntfy_topic: str = Field(
         default="gemini_and_nils_subscribtion_service", description="Topic for ntfy.sh notifications"
     )
-    history_file: str = Field(default="seen_items.json", description="File to store seen URLs")
+    ntfy_server: str = Field(default="https://ntfy.sh", description="ntfy server (point at a local stand-in to test)")
+    notify_digest_seconds: float = Field(
+        default=60.0, ge=0, description="Window in which hits per task are coalesced into one message (0 = off)"
+    )
+    notify_retries: int = Field(default=3, ge=0, description="Retries for failed notification deliveries")
+    history_file: str = Field(default="seen_items.db", description="SQLite database of seen URLs")
+    legacy_history_file: str = Field(
+        default="seen_items.json", description="Old JSON history, imported once into history_file"
+    )
+    history_retention_days: float | None = Field(
+        default=None, description="Forget seen URLs older than this many days (None keeps them forever)"
+    )
+
+    # Daemon mode (scraper.py --daemon)
+    daemon_poll_minutes: float = Field(default=30.0, gt=0, description="Polling interval for tasks without their own")
+    daemon_jitter: float = Field(default=0.2, ge=0, lt=1, description="Random ± spread applied to every interval")
+
+    # Work queue (scraper.py --coordinator / --worker)
+    queue_backend: Literal["sqlite"] = Field(default="sqlite", description="Queue shared by coordinator and workers")
+    queue_file: str = Field(
+        default="data/work_queue.db", description="SQLite queue; every worker process must reach it as a local file"
+    )
+    queue_lease_seconds: float = Field(
+        default=600.0, gt=0, description="How long a claimed job stays with its worker before others may take it"
+    )
+    queue_max_attempts: int = Field(default=3, ge=1, description="Attempts per job before it is marked failed")
+    worker_concurrency: int = Field(default=4, ge=1, description="Jobs one worker process runs at a time")
+    worker_idle_exit: float | None = Field(
+        default=60.0, ge=0, description="Seconds a worker waits on an empty queue before exiting (None = never)"
+    )
 
     # Tasks
     tasks: list[ScrapeTask] = [
@@ -52,6 +82,94 @@ class Settings(BaseSettings):
         description="List of sites to search",
     )
 
+    # Adaptive crawl frequency per (task, site, query) source
+    adaptive_crawl: bool = Field(
+        default=True, description="Revisit sources according to how often they produce new listings"
+    )
+    crawl_min_minutes: float = Field(default=30.0, gt=0, description="Shortest revisit interval for a source")
+    crawl_max_minutes: float = Field(default=7 * 24 * 60.0, gt=0, description="Longest revisit interval for a source")
+    crawl_target_new: float = Field(
+        default=1.0, gt=0, description="New listings a crawl should find on average; sets the interval"
+    )
+    source_schedule_file: str = Field(
+        default="data/source_schedule.json", description="Learned per-source arrival rates and intervals"
+    )
+
+    # Search result pagination
+    max_search_pages: int = Field(
+        default=5, ge=1, description="Results pages walked per search; stops early at a page with only seen ads"
+    )
+    pagination: dict[str, PaginationRule] = Field(
+        default={
+            "blocket.se": PaginationRule(page_param="page", sort_params={"sort": "PUBLISHED_DESC"}),
+            "finn.no": PaginationRule(page_param="page", sort_params={"sort": "PUBLISHED_DESC"}),
+            "ebay.de": PaginationRule(page_param="_pgn", sort_params={"_sop": "10"}),
+            "tradera.com": PaginationRule(page_param="spage", sort_params={"sortBy": "AddedOn"}),
+        },
+        description="Per-domain results paging and newest-first sort; other sites are read one page deep",
+    )
+
+    # Search page analysis
+    structured_extraction: bool = Field(
+        default=True, description="Extract candidates from JSON-LD/__NEXT_DATA__/known markup before using the LLM"
+    )
+    change_detection: bool = Field(
+        default=True, description="Skip or diff search pages whose listing rows are unchanged since the last run"
+    )
+    change_detection_file: str = Field(
+        default="data/page_fingerprints.db", description="SQLite file for per-URL search page fingerprints"
+    )
+
+    # Content distillation (page text → LLM prompt)
+    distill_content: bool = Field(default=True, description="Strip boilerplate and keep the relevant region")
+    distill_search_tokens: int = Field(default=8000, ge=500, description="Token budget for a distilled search page")
+    distill_ad_tokens: int = Field(default=1200, ge=200, description="Token budget for a distilled ad page")
+
+    # Batch verification
+    batch_token_budget: int = Field(default=12000, ge=500, description="Estimated prompt tokens per verification chunk")
+    batch_max_ads: int = Field(default=20, ge=1, description="Max ads per verification chunk")
+    batch_retries: int = Field(default=1, ge=0, description="Retries for failed chunks and ads the model dropped")
+    llm_max_concurrency: int = Field(default=2, ge=1, description="Max in-flight Gemini requests")
+
+    # Gemini model routing
+    model_quotas: dict[str, ModelQuota] = Field(
+        default={
+            "gemini-2.0-flash": ModelQuota(requests_per_minute=15, tokens_per_minute=1_000_000),
+            "gemini-1.5-flash": ModelQuota(requests_per_minute=15, tokens_per_minute=1_000_000),
+            "gemini-1.5-flash-8b": ModelQuota(requests_per_minute=15, tokens_per_minute=1_000_000),
+            "gemini-1.5-pro": ModelQuota(requests_per_minute=2, tokens_per_minute=32_000),
+        },
+        description="Per-model quota, in preference (cost) order; requests go to the first model with capacity",
+    )
+    llm_max_wait: float = Field(default=120.0, ge=0, description="Max seconds a call waits for any model's quota")
+
+    # Tracing
+    trace_enabled: bool = Field(
+        default=True, description="Record per-stage spans and write a trace at the end of the run"
+    )
+    trace_dir: str = Field(default="data/traces", description="Where JSONL and Chrome trace files are written")
+
+    # LLM usage metrics
+    usage_detail_file: str = Field(
+        default="data/usage_detail.jsonl", description="Usage per model, call site, task and outcome"
+    )
+    usage_rollup: bool = Field(default=True, description="Also keep per-day, per-model totals in usage_metrics.json")
+    usage_flush_seconds: float = Field(default=60.0, ge=0, description="How often buffered usage is written out")
+
+    # Record/replay of fetches and LLM results
+    cassette_mode: Literal["off", "record", "replay"] = Field(
+        default="off", description="'record' captures every fetch and LLM result, 'replay' serves them offline"
+    )
+    cassette_file: str = Field(default="data/cassette.json.gz", description="Gzipped cassette file")
+
+    # LLM response cache
+    llm_cache_enabled: bool = Field(default=True, description="Serve repeated Gemini prompts from the local cache")
+    llm_cache_file: str = Field(default="data/llm_cache.db", description="SQLite file for cached Gemini results")
+    llm_cache_ttl_hours: dict[str, float] = Field(
+        default={"query_variations": 720.0, "search_urls": 720.0, "search_page": 24.0, "batch": 168.0},
+        description="Cache lifetime per call type; call types not listed are never cached",
+    )
+
     # Git settings
     ci_mode: bool = Field(default=False, alias="CI")
     git_user_name: str = "Scraper Bot"
@@ -59,6 +177,40 @@ class Settings(BaseSettings):
 
     # Browser settings
     headless: bool = True
+    static_first: bool = Field(
+        default=True, description="Try plain HTTP before launching the browser; escalate only when needed"
+    )
+    browser_tabs: int = Field(default=4, ge=1, description="Max concurrent browser tabs (reduced if memory is low)")
+    browser_pages_per_tab: int = Field(default=25, ge=1, description="Renders before a tab's context is recycled")
+    browser_mb_per_tab: int = Field(default=250, ge=50, description="Memory budget per tab used to size the pool")
+    readiness: ReadinessPolicy = Field(
+        default_factory=ReadinessPolicy, description="When a rendered page counts as ready (stability, selectors)"
+    )
+
+    # Page cache
+    page_cache_enabled: bool = Field(default=True, description="Serve repeat fetches from the on-disk page cache")
+    page_cache_dir: str = Field(default="data/page_cache", description="Directory for cached pages")
+    page_cache_ttl_hours: dict[str, float] = Field(
+        default={"search": 1.0, "ad": 72.0}, description="Freshness per URL class before revalidation"
+    )
+
+    # HTTP client (plain fetches, revalidation, notifications)
+    http_max_connections: int = Field(default=20, ge=1, description="Pooled connections across all hosts")
+    http_max_connections_per_host: int = Field(default=4, ge=1, description="Concurrent connections per host")
+    http2: bool = Field(default=True, description="Negotiate HTTP/2 when the h2 package is installed")
+
+    # Concurrency settings
+    concurrent_mode: bool = Field(default=True, description="Run tasks, search pages and deep dives concurrently")
+    max_concurrency: int = Field(default=4, ge=1, description="Global limit on in-flight page fetches")
+    max_concurrency_per_domain: int = Field(default=1, ge=1, description="Limit on in-flight fetches per domain")
+
+    # Rate limiting (per domain)
+    rate_limit_default: RateLimitPolicy = Field(
+        default_factory=RateLimitPolicy, description="Pacing applied to any domain without an override"
+    )
+    rate_limits: dict[str, RateLimitPolicy] = Field(
+        default_factory=dict, description="Per-domain pacing overrides, e.g. {'blocket.se': {...}}"
+    )
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field
 class SearchPageSource(BaseModel):
     site_name: str
     search_url: str
+    query: str | None = Field(default=None, description="The query this search page was generated for")
 
 
 class SearchURLGenerator(BaseModel):
@@ -42,6 +43,16 @@ class AdContent(BaseModel):
     site: str
 
 
+class FetchedPage(BaseModel):
+    """A fetched page: the text handed to the analyzer plus what is needed to cache and revalidate it."""
+
+    url: str
+    content: str
+    html: str = ""
+    headers: dict[str, str] = Field(default_factory=dict)
+    source: str = Field(default="browser", description="Where the content came from: browser, http, raw_html or cache")
+
+
 class QueryVariations(BaseModel):
     variations: list[str]
 
@@ -55,3 +66,42 @@ class ScrapeTask(BaseModel):
     currency: str = "SEK"
     description: str = ""
     fuzzy_search: bool = False
+    poll_minutes: float | None = Field(
+        default=None, gt=0, description="Polling interval in daemon mode (None uses the default interval)"
+    )
+
+
+class RateLimitPolicy(BaseModel):
+    """Request pacing applied to a single domain."""
+
+    requests_per_second: float = Field(default=0.5, gt=0, description="Sustained request rate")
+    burst: int = Field(default=1, ge=1, description="Requests allowed back-to-back after an idle period")
+    min_interval: float = Field(default=1.0, ge=0, description="Minimum seconds between two requests")
+
+
+class PaginationRule(BaseModel):
+    """How to request further search result pages, newest listings first, on one marketplace."""
+
+    page_param: str = Field(description="Query parameter holding the page number")
+    first_page: int = Field(default=1, description="Number of the first results page")
+    sort_params: dict[str, str] = Field(
+        default_factory=dict, description="Query parameters that sort results newest first"
+    )
+
+
+class ModelQuota(BaseModel):
+    """Per-minute Gemini quota for one model."""
+
+    requests_per_minute: int = Field(default=15, ge=1, description="Requests allowed per minute (RPM)")
+    tokens_per_minute: int = Field(default=1_000_000, ge=1, description="Input+output tokens per minute (TPM)")
+
+
+class ReadinessPolicy(BaseModel):
+    """Controls when a rendered page is considered ready to extract."""
+
+    stable_ms: int = Field(default=750, ge=0, description="How long the page text must stay unchanged")
+    min_text_length: int = Field(default=300, ge=0, description="Text length below which a page is never ready")
+    max_wait: float = Field(default=10.0, gt=0, description="Hard cap in seconds on waiting for readiness")
+    selectors: dict[str, str] = Field(
+        default_factory=dict, description="Per-domain CSS selector that marks the listing as rendered"
+    )
@@ -1,8 +1,9 @@
 import asyncio
 import logging
 import re
+import time
 import urllib.parse
-from typing import Any, cast
+from typing import Any, TypeVar
 
 from google import genai
 from pydantic import BaseModel
@@ -10,6 +11,7 @@ from pydantic import BaseModel
 from src.models import (
     BatchProductCheck,
     CandidateItem,
+    ModelQuota,
     ProductCheck,
     QueryVariations,
     ScrapeTask,
@@ -17,10 +19,20 @@ from src.models import (
     SearchPageSource,
     SearchURLGenerator,
 )
+from src.services.cassette import Cassette
+from src.services.llm_cache import LLMCache
+from src.services.model_scheduler import ModelScheduler, retry_after_seconds
+from src.utils.tokens import chunk_by_tokens, estimate_tokens
+from src.utils.tracing import ERROR, Span, tracer
 from src.utils.usage_tracker import UsageTracker
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T", bound=BaseModel)
+
+# Budgeted on top of the prompt estimate when reserving TPM quota for a call.
+OUTPUT_TOKEN_ALLOWANCE = 1000
+
 
 class GeminiAnalyzer:
     # Maintainable search URL templates
@@ -35,10 +47,41 @@ class GeminiAnalyzer:
         "hifishark.com": "https://www.hifishark.com/search?q={q}",
     }
 
-    def __init__(self, api_key: str):
+    # Preference (cost) order used when no scheduler is configured.
+    MODELS: list[str] = [
+        "gemini-2.0-flash",
+        "gemini-1.5-flash",
+        "gemini-1.5-flash-8b",
+        "gemini-1.5-pro",
+    ]
+
+    def __init__(
+        self,
+        api_key: str,
+        cache: LLMCache | None = None,
+        batch_token_budget: int = 12000,
+        batch_max_ads: int = 20,
+        batch_retries: int = 1,
+        max_concurrent_calls: int = 2,
+        scheduler: ModelScheduler | None = None,
+        usage: UsageTracker | None = None,
+        client: Any | None = None,
+        cassette: Cassette | None = None,
+    ):
         if not api_key:
             raise ValueError("GEMINI_API_KEY is missing!")
-        self.client = genai.Client(api_key=api_key)
+        # Anything with the `aio.models.generate_content` interface; the benchmark injects a fake.
+        self.client = client or genai.Client(api_key=api_key)
+        self.cache = cache
+        self.cassette = cassette
+        self.batch_token_budget = batch_token_budget
+        self.batch_max_ads = batch_max_ads
+        self.batch_retries = batch_retries
+        # Bounds in-flight Gemini requests; the scheduler paces them against each model's quota.
+        self._call_slots = asyncio.Semaphore(max_concurrent_calls)
+        self.scheduler = scheduler or ModelScheduler({model: ModelQuota() for model in self.MODELS})
+        self.max_attempts = 2 * len(self.scheduler.models)
+        self.usage = usage or UsageTracker()
 
     def _sanitize_input(self, text: str, max_length: int = 500) -> str:
         if not text:
@@ -48,41 +91,92 @@ class GeminiAnalyzer:
         clean = clean.replace("---", " - ")
         return clean[:max_length].strip()
 
-    async def generate_content_safe(self, prompt: str, schema: type[BaseModel]) -> Any | None:
-        """Tries multiple models to generate content, handling quotas with backoff."""
-        models_to_try = [
-            "gemini-2.0-flash",
-            "gemini-1.5-flash",
-            "gemini-1.5-flash-8b",
-            "gemini-1.5-pro",
-        ]
+    async def generate_content_safe(
+        self, prompt: str, schema: type[T], call_type: str = "default", bypass_cache: bool = False
+    ) -> T | None:
+        """Generates content on the cheapest model with quota, rerouting on 429s and errors.
 
-        for i, model in enumerate(models_to_try):
+        Returns the parsed result. Results are served from / stored in the LLM cache according to the
+        TTL for `call_type`, unless `bypass_cache` is set. A replaying cassette answers instead of Gemini.
+        """
+        with tracer.span(f"llm.{call_type}") as span:
+            if self.cassette and self.cassette.replaying:
+                replayed = self.cassette.replay_llm(prompt, schema)
+                span.outcome = "cassette" if replayed is not None else ERROR
+                return replayed
+
+            result = await self._generate_cached(prompt, schema, call_type, bypass_cache, span)
+            if self.cassette and self.cassette.recording:
+                self.cassette.record_llm(prompt, schema, result)
+            return result
+
+    async def _generate_cached(
+        self, prompt: str, schema: type[T], call_type: str, bypass_cache: bool, span: Span
+    ) -> T | None:
+        if self.cache and not bypass_cache:
+            cached = self.cache.get(prompt, schema, self.scheduler.models, call_type)
+            if cached is not None:
+                logger.info(f"   💾 LLM cache hit ({call_type})")
+                span.outcome = "cache_hit"
+                return cached
+
+        async with self._call_slots:
+            result = await self._generate_uncached(prompt, schema, call_type)
+        span.outcome = "ok" if result is not None else ERROR
+        return result
+
+    async def _generate_uncached(self, prompt: str, schema: type[T], call_type: str) -> T | None:
+        estimated = estimate_tokens(prompt) + OUTPUT_TOKEN_ALLOWANCE
+        failed: set[str] = set()
+        for _ in range(self.max_attempts):
+            grant = await self.scheduler.acquire(estimated, exclude=failed)
+            if grant is None:
+                logger.error(f"   ❌ No Gemini model has quota for this {call_type} call")
+                return None
+            model = grant.model
+            started = time.monotonic()
             try:
-                # Jittered backoff to avoid synchronized spikes
-                delay = (i * 5) + 2
-                await asyncio.sleep(delay)
-
-                response = await self.client.aio.models.generate_content(
-                    model=model,
-                    contents=prompt,
-                    config={
-                        "response_mime_type": "application/json",
-                        "response_schema": schema,
-                    },
-                )
-                UsageTracker.log_use(model=model)
-                return response
+                with tracer.span("llm.request", model=model):
+                    response = await self.client.aio.models.generate_content(
+                        model=model,
+                        contents=prompt,
+                        config={
+                            "response_mime_type": "application/json",
+                            "response_schema": schema,
+                        },
+                    )
             except Exception as e:
-                UsageTracker.log_use(model=model, calls=1)  # Log the attempt even if it fails
+                latency = time.monotonic() - started
                 err = str(e).lower()
 
                 if any(x in err for x in ["429", "quota", "503", "overload"]):
-                    logger.warning(f"   [QUOTA] {model} overloaded. Retrying with next model...")
-                    continue
+                    logger.warning(f"   [QUOTA] {model} overloaded. Routing to another model...")
+                    self.usage.record(model, call_type, "throttled", latency)
+                    self.scheduler.record_failure(grant, throttled=True, retry_after=retry_after_seconds(e))
                 elif "404" in err:
-                    continue
-                logger.error(f"   ❌ Error with {model}: {e}")
+                    self.usage.record(model, call_type, "not_found", latency)
+                    self.scheduler.disable(model)
+                else:
+                    logger.error(f"   ❌ Error with {model}: {e}")
+                    self.usage.record(model, call_type, "error", latency)
+                    self.scheduler.record_failure(grant)
+                    failed.add(model)
+                continue
+            except BaseException:
+                # A cancelled call reports neither success nor failure; don't leave the model stuck half-open.
+                self.scheduler.release(grant)
+                raise
+
+            tokens_in, tokens_out = self.usage.tokens_from(response)
+            self.scheduler.record_success(grant, estimated, tokens_in + tokens_out)
+            parsed = response.parsed
+            outcome = "ok" if isinstance(parsed, schema) else "invalid"
+            self.usage.record(model, call_type, outcome, time.monotonic() - started, tokens_in, tokens_out)
+            if not isinstance(parsed, schema):
+                return None
+            if self.cache:
+                self.cache.put(prompt, schema, model, call_type, parsed)
+            return parsed
 
         return None
 
@@ -94,9 +188,9 @@ class GeminiAnalyzer:
         Focus on common misspellings, partial names, or alternative terms.
         Return a JSON object with a 'variations' list of strings.
         """
-        response = await self.generate_content_safe(prompt, QueryVariations)
-        if response and response.parsed:
-            return cast(list[str], response.parsed.variations)
+        parsed = await self.generate_content_safe(prompt, QueryVariations, call_type="query_variations")
+        if parsed:
+            return parsed.variations
         return [query]
 
     async def get_search_urls(self, item_name: str, target_sites: list[str]) -> list[SearchPageSource]:
@@ -126,13 +220,14 @@ class GeminiAnalyzer:
           ]
         }}
         """
-        response = await self.generate_content_safe(prompt, SearchURLGenerator)
-        if response and response.parsed:
-            results.extend(cast(list[SearchPageSource], response.parsed.search_pages))
+        parsed = await self.generate_content_safe(prompt, SearchURLGenerator, call_type="search_urls")
+        if parsed:
+            results.extend(parsed.search_pages)
 
         return results
 
-    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem]:
+    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem] | None:
+        """Returns the candidates on a search page, or None if the analysis itself failed."""
         logger.info(f"   🧠 Agentic Analysis of search page for '{task.name}'...")
 
         price_instruction = ""
@@ -165,24 +260,25 @@ class GeminiAnalyzer:
         Return exactly a JSON object with a 'candidates' list.
         """
 
-        response = await self.generate_content_safe(prompt, SearchPageAnalysis)
-        if response and response.parsed:
-            candidates = cast(list[CandidateItem], response.parsed.candidates)
+        parsed = await self.generate_content_safe(prompt, SearchPageAnalysis, call_type="search_page")
+        if parsed:
+            candidates = parsed.candidates
             # Relaxed confidence score to 50 for broader initial selection
             return [c for c in candidates if c.confidence_score >= 50]
 
-        return []
+        return None
 
-    async def analyze_batch(self, item_name: str, ads: list[dict[str, str]]) -> list[ProductCheck] | None:
-        if not ads:
-            return []
+    def _batch_entry(self, ad: dict[str, str]) -> str:
+        clean_url = self._sanitize_input(ad["url"], max_length=500)
+        clean_content = self._sanitize_input(ad["content"], max_length=5000)
+        return f"({ad['site']}) ---\nURL: {clean_url}\nCONTENT: {clean_content}\n\n"
 
-        sanitized_item = self._sanitize_input(item_name)
+    async def _verify_chunk(
+        self, sanitized_item: str, ads: list[dict[str, str]], retry: bool = False
+    ) -> list[ProductCheck] | None:
         prompt = f"I am looking for: {sanitized_item}\n\nHere are {len(ads)} advertisements to check:\n\n"
         for i, ad in enumerate(ads):
-            clean_url = self._sanitize_input(ad["url"], max_length=500)
-            clean_content = self._sanitize_input(ad["content"], max_length=5000)
-            prompt += f"--- AD #{i + 1} ({ad['site']}) ---\nURL: {clean_url}\nCONTENT: {clean_content}\n\n"
+            prompt += f"--- AD #{i + 1} " + self._batch_entry(ad)
 
         prompt += """
         --------------------------------------------------
@@ -196,8 +292,75 @@ class GeminiAnalyzer:
         5. 'reasoning': Brief explanation.
         """
 
-        response = await self.generate_content_safe(prompt, BatchProductCheck)
-        if response and response.parsed:
-            return cast(list[ProductCheck] | None, response.parsed.results)
+        parsed = await self.generate_content_safe(prompt, BatchProductCheck, call_type="batch", bypass_cache=retry)
+        return parsed.results if parsed else None
 
-        return None
+    def _match_results(
+        self, ads: list[dict[str, str]], results: list[ProductCheck]
+    ) -> tuple[dict[str, ProductCheck], int]:
+        """Maps results back to the ads' original URLs. Returns the matches and the number of unknown URLs.
+
+        The model only sees sanitised URLs, so results are matched on that form; results for URLs that were
+        not in the chunk (hallucinated or mangled) are discarded.
+        """
+        by_prompt_url = {self._sanitize_input(ad["url"], max_length=500): ad["url"] for ad in ads}
+        matched: dict[str, ProductCheck] = {}
+        unknown = 0
+        for res in results:
+            url = by_prompt_url.get(res.url.strip()) or (res.url if res.url in by_prompt_url.values() else None)
+            if url is None:
+                unknown += 1
+                continue
+            matched.setdefault(url, res.model_copy(update={"url": url}))
+        return matched, unknown
+
+    async def analyze_batch(self, item_name: str, ads: list[dict[str, str]]) -> list[ProductCheck] | None:
+        """Verifies ads in token-budgeted chunks run concurrently, merging results by URL.
+
+        Failed chunks and ads the model left out are retried up to `batch_retries` times. Returns results
+        in the order of `ads`, or None if no chunk succeeded.
+        """
+        if not ads:
+            return []
+
+        sanitized_item = self._sanitize_input(item_name)
+        merged: dict[str, ProductCheck] = {}
+        pending = ads
+        any_succeeded = False
+
+        for attempt in range(self.batch_retries + 1):
+            entries = [self._batch_entry(ad) for ad in pending]
+            chunks = [
+                [pending[i] for i in chunk]
+                for chunk in chunk_by_tokens(entries, self.batch_token_budget, self.batch_max_ads)
+            ]
+            if len(chunks) > 1:
+                logger.info(f"   🧩 Verifying {len(pending)} ads in {len(chunks)} chunks")
+
+            outcomes = await asyncio.gather(
+                *(self._verify_chunk(sanitized_item, chunk, retry=attempt > 0) for chunk in chunks)
+            )
+
+            missing: list[dict[str, str]] = []
+            for chunk, results in zip(chunks, outcomes, strict=True):
+                if results is None:
+                    missing.extend(chunk)
+                    continue
+                any_succeeded = True
+                matched, unknown = self._match_results(chunk, results)
+                if unknown:
+                    logger.warning(f"   ⚠️ Discarded {unknown} batch results for URLs that were not in the chunk")
+                merged.update(matched)
+                missing.extend(ad for ad in chunk if ad["url"] not in matched)
+
+            if not missing:
+                break
+            if attempt < self.batch_retries:
+                logger.warning(f"   🔁 Retrying {len(missing)} ads from failed chunks or dropped by the model")
+            else:
+                logger.warning(f"   ⚠️ {len(missing)} ads could not be verified")
+            pending = missing
+
+        if not any_succeeded:
+            return None
+        return [merged[ad["url"]] for ad in ads if ad["url"] in merged]
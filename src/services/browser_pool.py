@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from crawl4ai import AsyncWebCrawler  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+def available_memory_mb() -> int | None:
+    """Returns available physical memory in MB, or None where the platform does not report it."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+@dataclass
+class PoolStats:
+    size: int
+    busy: int = 0
+    peak_busy: int = 0
+    pages: int = 0
+    recycles: int = 0
+    busy_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    started: float = 0.0
+
+    @property
+    def utilisation(self) -> float:
+        """Share of tab-time spent rendering since the pool was first used."""
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return self.busy_seconds / (self.size * elapsed) if elapsed > 0 else 0.0
+
+
+class BrowserPool:
+    """A fixed set of tabs (crawl4ai sessions) on one AsyncWebCrawler, checked out one page at a time.
+
+    Each tab keeps its page and context between renders; after `pages_per_tab` renders the session is
+    killed and recreated on next use, which keeps Chromium memory bounded on long runs.
+    """
+
+    def __init__(self, size: int = 4, pages_per_tab: int = 25):
+        if size < 1:
+            raise ValueError("Browser pool needs at least one tab")
+        self.size = size
+        self.pages_per_tab = pages_per_tab
+        self.stats = PoolStats(size=size)
+        self._free: asyncio.Queue[str] = asyncio.Queue()
+        self._uses: dict[str, int] = {}
+        for n in range(size):
+            self._free.put_nowait(f"tab-{n}")
+            self._uses[f"tab-{n}"] = 0
+
+    @classmethod
+    def sized_for_memory(
+        cls, max_tabs: int, pages_per_tab: int = 25, mb_per_tab: int = 250, reserve_mb: int = 512
+    ) -> "BrowserPool":
+        """Creates a pool of at most `max_tabs`, fewer if available memory cannot hold that many tabs."""
+        size = max_tabs
+        available = available_memory_mb()
+        if available is not None:
+            size = max(1, min(max_tabs, (available - reserve_mb) // mb_per_tab))
+            if size < max_tabs:
+                logger.info(f"   🧮 Browser pool limited to {size} tabs by {available} MB available memory")
+        return cls(size=size, pages_per_tab=pages_per_tab)
+
+    async def _recycle(self, crawler: AsyncWebCrawler, session_id: str) -> None:
+        strategy = crawler.crawler_strategy
+        manager = getattr(strategy, "browser_manager", None)
+        try:
+            await (manager or strategy).kill_session(session_id)
+            self.stats.recycles += 1
+        except Exception as e:
+            logger.warning(f"   ⚠️ Could not recycle browser tab {session_id}: {e}")
+
+    @asynccontextmanager
+    async def tab(self, crawler: AsyncWebCrawler) -> AsyncIterator[str]:
+        """Checks out a tab and yields its crawl4ai session id."""
+        if not self.stats.started:
+            self.stats.started = time.monotonic()
+
+        waited = time.monotonic()
+        session_id = await self._free.get()
+        self.stats.wait_seconds += time.monotonic() - waited
+
+        self.stats.busy += 1
+        self.stats.peak_busy = max(self.stats.peak_busy, self.stats.busy)
+        started = time.monotonic()
+        failed = False
+        try:
+            yield session_id
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.stats.busy -= 1
+            self.stats.pages += 1
+            self.stats.busy_seconds += time.monotonic() - started
+            self._uses[session_id] += 1
+            # A tab whose render failed or timed out may be stuck mid-navigation; start it fresh.
+            if failed or self._uses[session_id] >= self.pages_per_tab:
+                self._uses[session_id] = 0
+                await self._recycle(crawler, session_id)
+            self._free.put_nowait(session_id)
+
+    def log_summary(self) -> None:
+        s = self.stats
+        logger.info(
+            f"   🗂️ Browser pool: {s.pages} pages on {s.size} tabs (peak {s.peak_busy} busy), "
+            f"utilisation {s.utilisation:.0%}, {s.recycles} recycles, {s.wait_seconds:.1f}s queued"
+        )
@@ -0,0 +1,123 @@
+import gzip
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from src.models import FetchedPage
+from src.services.llm_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+CASSETTE_VERSION = 1
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+@dataclass
+class CassetteStats:
+    recorded: int = 0
+    replayed: int = 0
+    misses: int = 0
+
+
+class Cassette:
+    """Records page fetches and Gemini results of a run into a gzipped JSON file, and replays them.
+
+    Fetches are keyed by URL and LLM calls by a hash of prompt and schema. A key seen several times
+    keeps every response in order; replay serves them in the same order and repeats the last one once
+    they run out. Failures (None) are recorded too, so a replay takes the same path as the recording.
+    In replay mode nothing touches the network: a key that was never recorded is a miss and returns None.
+    """
+
+    def __init__(self, file_path: str = "data/cassette.json.gz", mode: str = "record"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {CASSETTE_MODES}")
+        self.file_path = file_path
+        self.mode = mode
+        self.stats = CassetteStats()
+        self._tracks: dict[str, dict[str, list[Any]]] = {"fetch": {}, "llm": {}}
+        self._positions: dict[tuple[str, str], int] = {}
+        if mode == "replay":
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        try:
+            with gzip.open(self.file_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Cassette {self.file_path} does not exist; record one first") from None
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Cassette {self.file_path} has unsupported version {data.get('version')}")
+        self._tracks = {"fetch": data.get("fetch", {}), "llm": data.get("llm", {})}
+        logger.info(
+            f"📼 Replaying {len(self._tracks['fetch'])} URLs and {len(self._tracks['llm'])} prompts "
+            f"from {self.file_path}"
+        )
+
+    def _record(self, track: str, key: str, value: Any) -> None:
+        self._tracks[track].setdefault(key, []).append(value)
+        self.stats.recorded += 1
+
+    def _replay(self, track: str, key: str) -> Any:
+        responses = self._tracks[track].get(key)
+        if not responses:
+            self.stats.misses += 1
+            logger.warning(f"   📼 Cassette miss ({track}): {key[:80]}")
+            return None
+        position = self._positions.get((track, key), 0)
+        self._positions[(track, key)] = position + 1
+        self.stats.replayed += 1
+        return responses[min(position, len(responses) - 1)]
+
+    def record_page(self, url: str, page: FetchedPage | None) -> None:
+        self._record("fetch", url, page.model_dump() if page else None)
+
+    def replay_page(self, url: str) -> FetchedPage | None:
+        data = self._replay("fetch", url)
+        return FetchedPage.model_validate(data) if data else None
+
+    def record_llm(self, prompt: str, schema: type[BaseModel], result: BaseModel | None) -> None:
+        self._record("llm", cache_key(prompt, schema, model=""), result.model_dump() if result else None)
+
+    def replay_llm(self, prompt: str, schema: type[T]) -> T | None:
+        data = self._replay("llm", cache_key(prompt, schema, model=""))
+        if data is None:
+            return None
+        try:
+            return schema.model_validate(data)
+        except ValidationError:
+            # The schema changed since the recording.
+            self.stats.replayed -= 1
+            self.stats.misses += 1
+            return None
+
+    def save(self) -> None:
+        """Writes the recording. Only does anything in record mode."""
+        if not self.recording:
+            return
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        tmp_path = f"{self.file_path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"version": CASSETTE_VERSION, **self._tracks}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.file_path)
+        logger.info(f"📼 Recorded {self.stats.recorded} responses to {self.file_path}")
+
+    def log_summary(self) -> None:
+        s = self.stats
+        if self.replaying:
+            logger.info(f"   📼 Cassette: {s.replayed} responses replayed, {s.misses} misses")
+        elif self.recording:
+            logger.info(f"   📼 Cassette: {s.recorded} responses recorded")
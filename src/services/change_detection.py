@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from collections.abc import Collection
+from dataclasses import dataclass, field
+from urllib.parse import urljoin
+
+from src.utils.tokens import estimate_tokens
+from src.utils.urls import ad_key, canonical_url
+
+logger = logging.getLogger(__name__)
+
+# Fewer listing blocks than this and the page is not fingerprinted (too little structure to diff safely).
+MIN_LISTING_BLOCKS = 3
+
+LINK_RE = re.compile(r"\]\([^)]+\)|https?://")
+# The target of a markdown link, or a bare absolute URL.
+LINK_TARGET_RE = re.compile(r"\]\(<?([^)\s>]+)|(https?://[^\s)\]>\"']+)")
+PRICE_RE = re.compile(r"\d[\d\s.,]*\s*(kr|sek|nok|dkk|€|eur|\$|:-)", re.I)
+# Text that changes on every visit without the listing changing ("3 min ago", "för 2 timmar sedan").
+VOLATILE_RE = re.compile(
+    r"\b\d+\s*(sek|s|min|minuter|minutes?|h|tim|timmar|hours?|dagar|days?|std|stunden|tage)\b"
+    r"(\s*(ago|sedan|siden))?",
+    re.I,
+)
+
+
+def split_blocks(content: str) -> list[str]:
+    """Splits markdown into blocks separated by blank lines or headings."""
+    blocks: list[str] = []
+    current: list[str] = []
+    for line in content.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            if line.strip():
+                current.append(line)
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def listing_blocks(content: str) -> list[str]:
+    """Blocks that look like result rows: they carry a link and a price."""
+    return [b for b in split_blocks(content) if LINK_RE.search(b) and PRICE_RE.search(b)]
+
+
+def block_ad_keys(block: str, base_url: str) -> set[str]:
+    """The ad keys of the links in a block, relative links resolved against `base_url`."""
+    return {ad_key(canonical_url(urljoin(base_url, a or b))) for a, b in LINK_TARGET_RE.findall(block)}
+
+
+def fingerprint(block: str) -> str:
+    normalised = VOLATILE_RE.sub("", block.lower())
+    normalised = re.sub(r"\s+", " ", normalised).strip()
+    return hashlib.sha1(normalised.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class PageDiff:
+    key: str
+    content: str
+    fingerprints: list[str]
+    url: str = ""
+    blocks: list[str] = field(default_factory=list)
+    new_blocks: list[str] = field(default_factory=list)
+    # False when the page had no stored fingerprint or too little structure: send it whole.
+    comparable: bool = False
+
+    @property
+    def unchanged(self) -> bool:
+        return self.comparable and not self.new_blocks
+
+    def content_for_analysis(self) -> str:
+        return "\n\n".join(self.new_blocks) if self.comparable else self.content
+
+
+@dataclass
+class ChangeStats:
+    pages: int = 0
+    skipped: int = 0
+    partial: int = 0
+    tokens_full: int = 0
+    tokens_sent: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_full - self.tokens_sent
+
+
+class SearchPageChangeDetector:
+    """Fingerprints the listing rows of each search page and diffs them against the previous run.
+
+    Unchanged pages skip LLM analysis; changed pages send only the new listing rows.
+    """
+
+    def __init__(self, file_path: str = "data/page_fingerprints.db", enabled: bool = True):
+        self.enabled = enabled
+        self.stats = ChangeStats()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_fingerprints "
+            "(key TEXT PRIMARY KEY, fingerprints TEXT NOT NULL, updated REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def diff(self, key: str, content: str, url: str = "") -> PageDiff:
+        blocks = listing_blocks(content)
+        fingerprints = [fingerprint(b) for b in blocks]
+        page_diff = PageDiff(key=key, content=content, fingerprints=fingerprints, url=url, blocks=blocks)
+        if not self.enabled or len(blocks) < MIN_LISTING_BLOCKS:
+            return page_diff
+
+        row = self.conn.execute("SELECT fingerprints FROM page_fingerprints WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return page_diff
+
+        previous = set(json.loads(row[0]))
+        page_diff.comparable = True
+        page_diff.new_blocks = [b for b, fp in zip(blocks, fingerprints, strict=True) if fp not in previous]
+        return page_diff
+
+    def record_analysis(self, page_diff: PageDiff, analysed: bool, unfinished: Collection[str] = ()) -> None:
+        """Counts the savings for this page and, if the analysis succeeded, stores its fingerprints.
+
+        Rows linking to one of the `unfinished` ad keys are left out, so they count as new next run.
+        """
+        sent = "" if page_diff.unchanged else page_diff.content_for_analysis()
+        self.stats.pages += 1
+        self.stats.tokens_full += estimate_tokens(page_diff.content)
+        self.stats.tokens_sent += estimate_tokens(sent)
+        if page_diff.unchanged:
+            self.stats.skipped += 1
+        elif page_diff.comparable:
+            self.stats.partial += 1
+
+        if analysed and len(page_diff.fingerprints) >= MIN_LISTING_BLOCKS:
+            fingerprints = [
+                fp
+                for block, fp in zip(page_diff.blocks, page_diff.fingerprints, strict=True)
+                if block_ad_keys(block, page_diff.url).isdisjoint(unfinished)
+            ]
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO page_fingerprints (key, fingerprints, updated) VALUES (?, ?, ?)",
+                    (page_diff.key, json.dumps(fingerprints), time.time()),
+                )
+
+    def log_summary(self) -> None:
+        s = self.stats
+        logger.info(
+            f"   🔁 Change detection: {s.skipped}/{s.pages} search pages unchanged (LLM calls saved), "
+            f"{s.partial} sent as diffs, ~{s.tokens_saved} of {s.tokens_full} tokens saved"
+        )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -1,79 +1,260 @@
 import asyncio
 import logging
+import time
 from typing import cast
 from urllib.parse import urljoin
 
-import requests
+import httpx
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig  # type: ignore
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator  # type: ignore
+
+from src.models import FetchedPage, ReadinessPolicy
+from src.services.browser_pool import BrowserPool
+from src.services.cassette import Cassette
+from src.services.fetch_tiers import TierMemory
+from src.services.http_client import HttpClient
+from src.services.page_cache import CacheEntry, PageCache
+from src.services.readiness import ReadinessTracker, build_wait_condition, wait_timed_out
+from src.utils.rate_limiter import DomainRateLimiter
+from src.utils.tracing import ERROR, Span, tracer
+from src.utils.urls import domain_of
 
 logger = logging.getLogger(__name__)
 
 MAX_CONTENT_LENGTH = 150000
+MIN_CONTENT_LENGTH = 300
+PLACEHOLDERS = ["loading...", "wait a moment", "checking your browser"]
+
+# Sites that block headless browsers but still answer plain HTTP with usable HTML.
+HTTP_FALLBACK_DOMAINS = ["blocket.se", "finn.no", "kleinanzeigen.de", "hifishark.com", "tradera.com"]
+
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
 
 
 class ContentFetcher:
-    def __init__(self, headless: bool = True):
+    def __init__(
+        self,
+        headless: bool = True,
+        rate_limiter: DomainRateLimiter | None = None,
+        readiness: ReadinessPolicy | None = None,
+        readiness_tracker: ReadinessTracker | None = None,
+        page_cache: PageCache | None = None,
+        http_client: HttpClient | None = None,
+        static_first: bool = True,
+        tier_memory: TierMemory | None = None,
+        browser_pool: BrowserPool | None = None,
+        cassette: Cassette | None = None,
+    ):
+        self.page_cache = page_cache
+        self.cassette = cassette
+        self.http_client = http_client or HttpClient()
+        self.static_first = static_first
+        self.tier_memory = tier_memory or TierMemory()
+        self.markdown_generator = DefaultMarkdownGenerator()
+        self.browser_pool = browser_pool or BrowserPool()
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        self.readiness = readiness or ReadinessPolicy()
+        self.readiness_tracker = readiness_tracker or ReadinessTracker()
         self.browser_config = BrowserConfig(
             headless=headless,
             extra_args=["--disable-blink-features=AutomationControlled"],
         )
         self.run_config = CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
-            wait_until="networkidle",
-            delay_before_return_html=10.0,  # Increased delay
+            wait_until="domcontentloaded",
+            wait_for=build_wait_condition(self.readiness),
+            wait_for_timeout=int(self.readiness.max_wait * 1000),
+            delay_before_return_html=0.2,
             magic=True,
             remove_overlay_elements=True,
             page_timeout=60000,
         )
+        self._domain_run_configs: dict[str, CrawlerRunConfig] = {}
+
+    def run_config_for(self, url: str) -> CrawlerRunConfig:
+        """Returns the run config for a URL, using the domain's readiness selector when one is configured."""
+        domain = domain_of(url)
+        selector = self.readiness.selectors.get(domain)
+        if not selector:
+            return self.run_config
+        if domain not in self._domain_run_configs:
+            self._domain_run_configs[domain] = self.run_config.clone(
+                wait_for=build_wait_condition(self.readiness, selector)
+            )
+        return self._domain_run_configs[domain]
 
     async def fetch_ad_content(self, crawler: AsyncWebCrawler, url: str) -> str | None:
+        page = await self.fetch_page(crawler, url)
+        return page.content if page else None
+
+    async def fetch_page(self, crawler: AsyncWebCrawler, url: str) -> FetchedPage | None:
         logger.info(f"📥 Fetching content: {url}")
 
-        await asyncio.sleep(2)
+        url_class = self.url_class(url)
+        with tracer.span("fetch", url=url, url_class=url_class) as span:
+            if self.cassette and self.cassette.replaying:
+                replayed = self.cassette.replay_page(url)
+                span.outcome = "cassette" if replayed else ERROR
+                return replayed
+
+            page = await self._fetch_cached(crawler, url, url_class, span)
+            if self.cassette and self.cassette.recording:
+                self.cassette.record_page(url, page)
+            return page
+
+    async def _fetch_cached(self, crawler: AsyncWebCrawler, url: str, url_class: str, span: Span) -> FetchedPage | None:
+        stale_entry: CacheEntry | None = None
+        revalidated_page: FetchedPage | None = None
+        if self.page_cache:
+            cached, stale_entry = self.page_cache.lookup(url)
+            if cached:
+                logger.info("   🗄️ Served from page cache")
+                span.outcome = "cache"
+                return cached
+            resp = await self._revalidate(stale_entry) if stale_entry else None
+            if stale_entry and resp is not None and resp.status_code == 304:
+                revalidated = self.page_cache.mark_revalidated(stale_entry)
+                if revalidated:
+                    logger.info("   🗄️ Page unchanged (304), served from page cache")
+                    span.outcome = "revalidated"
+                    return revalidated
+            elif resp is not None and resp.status_code == 200:
+                # The page changed: the response already carries the new body, so tier 1 needs no second GET.
+                revalidated_page = await self._page_from_response(url, resp)
 
-        # Method 2: Crawl4AI (Browser) for complex sites
-        await asyncio.sleep(2)
+        page = await self._fetch_tiered(crawler, url, revalidated_page)
+        span.outcome = page.source if page else ERROR
+        if page and self.page_cache:
+            self.page_cache.put(url_class, page)
+        return page
+
+    async def _fetch_tiered(
+        self, crawler: AsyncWebCrawler, url: str, static_page: FetchedPage | None = None
+    ) -> FetchedPage | None:
+        """Fetches through the tiers. `static_page` is a plain-HTTP response already at hand, used as tier 1."""
+        domain = domain_of(url)
+
+        # Tier 1: plain HTTP + HTML-to-markdown, unless the domain is known to need a browser
+        if self.static_first and not self.tier_memory.needs_browser(domain):
+            static_page = static_page or await self._fetch_with_http(url)
+            if static_page and self.is_usable_content(static_page.content):
+                self.tier_memory.record(domain, static_ok=True)
+                return static_page
+            self.tier_memory.record(domain, static_ok=False)
+            logger.info("   🖥️ Static HTML not usable, escalating to browser...")
+
+        # Tier 2: Crawl4AI (Browser) for complex sites
+        page = await self._fetch_with_browser(crawler, url)
+        if page:
+            return page
+
+        # Last resort: raw HTML for sites that block headless browsers
+        if any(d in url for d in HTTP_FALLBACK_DOMAINS):
+            logger.info("   ⚠️ Trying HTTP fallback...")
+            raw = static_page or await self._fetch_with_http(url)
+            if raw and len(raw.html) > 500:
+                return raw.model_copy(update={"content": raw.html[:30000], "source": "raw_html"})
+
+        return None
+
+    async def _fetch_with_browser(self, crawler: AsyncWebCrawler, url: str) -> FetchedPage | None:
+        with tracer.span("fetch.browser", url=url) as span:
+            page = await self._render(crawler, url)
+            span.outcome = "ok" if page else ERROR
+            return page
+
+    async def _render(self, crawler: AsyncWebCrawler, url: str) -> FetchedPage | None:
+        await self.rate_limiter.acquire(url)
         try:
-            # Wrap in timeout just in case
-            result = await asyncio.wait_for(crawler.arun(url=url, config=self.run_config), timeout=70.0)
+            async with self.browser_pool.tab(crawler) as session_id:
+                config = self.run_config_for(url).clone(session_id=session_id)
+                # Wrap in timeout just in case
+                started = time.monotonic()
+                result = await asyncio.wait_for(crawler.arun(url=url, config=config), timeout=70.0)
+                self.readiness_tracker.record(
+                    domain_of(url), time.monotonic() - started, timed_out=wait_timed_out(cast(str, result.html or ""))
+                )
             extracted_content = cast(str | None, result.markdown or result.html)
 
-            if extracted_content and len(extracted_content) > 300:
+            if extracted_content and len(extracted_content) > MIN_CONTENT_LENGTH:
                 # Check if we got actual results (not just placeholders)
-                placeholders = ["loading...", "wait a moment", "checking your browser"]
-                if not any(p in extracted_content.lower() for p in placeholders):
-                    return extracted_content[:MAX_CONTENT_LENGTH]
+                if self.is_usable_content(extracted_content):
+                    return FetchedPage(
+                        url=url,
+                        content=extracted_content[:MAX_CONTENT_LENGTH],
+                        html=cast(str, result.html or ""),
+                        headers=dict(result.response_headers or {}),
+                        source="browser",
+                    )
                 else:
                     logger.warning(f"   ⚠️ Detected placeholder content for {url}")
         except TimeoutError:
             logger.warning(f"   ⏱️ Timeout fetching {url}")
         except Exception as e:
             logger.warning(f"   ⚠️ Crawler failed for {url}: {e}")
+        return None
 
-        # Method 2: Requests Fallback
-        domains = ["blocket.se", "finn.no", "kleinanzeigen.de", "hifishark.com", "tradera.com"]
-        if any(domain in url for domain in domains):
-            logger.info("   ⚠️ Trying requests fallback...")
-            return self._fetch_with_requests(url)
+    async def _fetch_with_http(self, url: str) -> FetchedPage | None:
+        """Fetches server-rendered HTML without a browser and converts it to markdown."""
+        await self.rate_limiter.acquire(url)
+        with tracer.span("fetch.http", url=url) as span:
+            try:
+                resp = await self.http_client.get(url, headers=REQUEST_HEADERS)
+                span.attrs["status"] = resp.status_code
+                if resp.status_code == 200:
+                    return await self._page_from_response(url, resp)
+            except Exception as e:
+                logger.warning(f"   ⚠️ HTTP fetch failed for {url}: {e}")
+            span.outcome = ERROR
+            return None
 
-        return None
+    async def _page_from_response(self, url: str, resp: httpx.Response) -> FetchedPage:
+        markdown = await asyncio.to_thread(self._html_to_markdown, resp.text, url)
+        return FetchedPage(
+            url=url,
+            content=markdown[:MAX_CONTENT_LENGTH],
+            html=resp.text,
+            headers=dict(resp.headers),
+            source="http",
+        )
+
+    def _html_to_markdown(self, html: str, base_url: str) -> str:
+        result = self.markdown_generator.generate_markdown(input_html=html, base_url=base_url, citations=False)
+        return cast(str, result.raw_markdown)
 
-    def _fetch_with_requests(self, url: str) -> str | None:
+    async def _revalidate(self, entry: CacheEntry) -> httpx.Response | None:
+        """Sends a conditional GET for a stale cache entry: 304 if unchanged, 200 with the new body otherwise."""
+        headers = dict(REQUEST_HEADERS)
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        await self.rate_limiter.acquire(entry.url)
         try:
-            headers = {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-                ),
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-            }
-            resp = requests.get(url, headers=headers, timeout=15)
-            if resp.status_code == 200 and len(resp.text) > 500:
-                return resp.text[:30000]
+            return await self.http_client.conditional_get(entry.url, headers=headers)
         except Exception as e:
-            logger.error(f"   ❌ Fallback failed: {e}")
-        return None
+            logger.debug(f"Revalidation failed for {entry.url}: {e}")
+            return None
+
+    def url_class(self, url: str) -> str:
+        """Classifies a URL for cache TTLs: individual ads or search result pages."""
+        return "ad" if self.is_valid_ad_link(url) else "search"
+
+    @staticmethod
+    def is_usable_content(content: str | None) -> bool:
+        """Quality gate shared by all tiers: long enough and not an anti-bot or loading placeholder."""
+        if not content or len(content) <= MIN_CONTENT_LENGTH:
+            return False
+        lowered = content.lower()
+        return not any(p in lowered for p in PLACEHOLDERS)
 
     @staticmethod
     def fix_relative_url(base_url: str, href: str) -> str:
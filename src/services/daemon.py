@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import random
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Any
+
+from crawl4ai import AsyncWebCrawler  # type: ignore
+
+from src.models import ScrapeTask
+from src.services.pipeline import ScrapePipeline
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeDaemon:
+    """Keeps one pipeline (browser, HTTP pool, stores) resident and polls each task on its own schedule.
+
+    A task is polled again `poll_minutes` after its previous poll finished (the task's own interval or
+    `default_minutes`), spread by ±`jitter` so polls don't line up. First polls are staggered within the
+    jitter window. Whenever no poll is running, `on_idle` is called to flush results and metrics.
+    `stop()` lets running polls finish and ends the loop.
+    """
+
+    def __init__(
+        self,
+        pipeline: ScrapePipeline,
+        tasks: list[ScrapeTask],
+        default_minutes: float = 30.0,
+        jitter: float = 0.2,
+        on_idle: Callable[[], None] | None = None,
+        rng: random.Random | None = None,
+    ):
+        self.pipeline = pipeline
+        self.tasks = tasks
+        self.default_minutes = default_minutes
+        self.jitter = jitter
+        self.on_idle = on_idle
+        self.rng = rng or random.Random()
+        self.polls: dict[str, int] = {task.name: 0 for task in tasks}
+        self.failures = 0
+        self._stop = asyncio.Event()
+        self._in_flight = 0
+        # Sequential mode runs one poll at a time, like a one-shot run awaits one task at a time.
+        self._turn: AbstractAsyncContextManager[Any] = nullcontext() if pipeline.concurrent else asyncio.Lock()
+
+    def interval_for(self, task: ScrapeTask) -> float:
+        """Seconds until the task's next poll, with jitter applied."""
+        base = (task.poll_minutes or self.default_minutes) * 60
+        return base * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def stop(self) -> None:
+        if not self._stop.is_set():
+            logger.info("🛑 Stopping daemon after the running polls finish...")
+        self._stop.set()
+
+    async def run(self, crawler: AsyncWebCrawler) -> None:
+        schedule = ", ".join(f"{t.name} every {t.poll_minutes or self.default_minutes:g} min" for t in self.tasks)
+        logger.info(f"🔁 Daemon polling {schedule}")
+        await asyncio.gather(*(self._poll_loop(crawler, task) for task in self.tasks))
+        logger.info(f"🔁 Daemon stopped after {sum(self.polls.values())} polls ({self.failures} failed)")
+
+    async def _poll_loop(self, crawler: AsyncWebCrawler, task: ScrapeTask) -> None:
+        delay = self.rng.uniform(0, self.jitter * (task.poll_minutes or self.default_minutes) * 60)
+        while not await self._wait(delay):
+            async with self._turn:
+                await self._poll(crawler, task)
+            delay = self.interval_for(task)
+            logger.info(f"   ⏰ Next poll of '{task.name}' in {delay / 60:.1f} min")
+
+    async def _poll(self, crawler: AsyncWebCrawler, task: ScrapeTask) -> None:
+        self._in_flight += 1
+        try:
+            # Only the first poll of a session announces the task, not every poll after it.
+            await self.pipeline.run_task(crawler, task, announce=self.polls[task.name] == 0)
+        except Exception as e:
+            # One failed poll must not take the daemon down; the task is retried on its next poll.
+            self.failures += 1
+            logger.error(f"❌ Poll of '{task.name}' failed: {e}")
+            await self.pipeline.notification_service.notify_error(f"Poll of '{task.name}' failed: {e}")
+        finally:
+            self._in_flight -= 1
+            self.polls[task.name] += 1
+        if self._in_flight == 0:
+            self.pipeline.reset_run_state()
+            if self.on_idle:
+                self.on_idle()
+
+    async def _wait(self, seconds: float) -> bool:
+        """Sleeps for `seconds` or until stopped. Returns True if the daemon was stopped."""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except TimeoutError:
+            return False
+        return True
@@ -0,0 +1,138 @@
+import logging
+import re
+from dataclasses import dataclass
+
+from src.services.change_detection import LINK_RE, PRICE_RE, split_blocks
+from src.utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_RE = re.compile(r"<(script|style|noscript|svg|template)\b.*?</\1>", re.S | re.I)
+TAG_RE = re.compile(r"<[^>]+>")
+IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+INLINE_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+BOILERPLATE_RE = re.compile(
+    r"cookie|consent|samtyck|integritet|privacy|datenschutz|personvern|newsletter|nyhetsbrev|"
+    r"logga in|log in|sign in|anmelden|registrera|app store|google play|kundservice|customer service|"
+    r"©|copyright|alle rechte|all rights reserved",
+    re.I,
+)
+
+
+@dataclass
+class DistilledContent:
+    text: str
+    tokens_in: int
+    tokens_out: int
+
+
+@dataclass
+class DistillStats:
+    pages: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.tokens_in / self.tokens_out if self.tokens_out else 0.0
+
+
+def _link_text_share(block: str) -> float:
+    """Share of a block's visible text that sits inside links; navigation menus are almost all links."""
+    visible = INLINE_LINK_RE.sub(r"\1", block)
+    linked = sum(len(text) for text in INLINE_LINK_RE.findall(block))
+    return linked / len(visible) if visible.strip() else 1.0
+
+
+def _is_boilerplate(block: str) -> bool:
+    if PRICE_RE.search(block) and len(block) > 40:
+        return False
+    if BOILERPLATE_RE.search(block) and len(block) < 600:
+        return True
+    links = len(INLINE_LINK_RE.findall(block))
+    return links >= 3 and _link_text_share(block) > 0.8
+
+
+class ContentDistiller:
+    """Shrinks fetched page text before it is sent to Gemini.
+
+    Drops markup, images, navigation, banners and footers, collapses repeated blocks and keeps the region
+    around the listings (search pages) or the price (ads), cut at block boundaries to a token budget.
+    """
+
+    def __init__(self, search_budget: int = 8000, ad_budget: int = 1200, enabled: bool = True):
+        self.budgets = {"search": search_budget, "ad": ad_budget}
+        self.enabled = enabled
+        self.stats = DistillStats()
+
+    def distill(self, content: str, kind: str = "search") -> DistilledContent:
+        """Distills one page; `kind` is 'search' or 'ad'."""
+        tokens_in = estimate_tokens(content)
+        if not self.enabled:
+            return DistilledContent(content, tokens_in, tokens_in)
+
+        text = content
+        if "</" in text and TAG_RE.search(text):
+            # Raw HTML from the last-resort fetch path: drop non-content elements and tags.
+            text = TAG_RE.sub(" ", SCRIPT_RE.sub(" ", text))
+        text = IMAGE_RE.sub("", text)
+        if kind == "ad":
+            # Ad verification only needs the wording, not link targets.
+            text = INLINE_LINK_RE.sub(r"\1", text)
+
+        blocks: list[str] = []
+        seen: set[str] = set()
+        for block in split_blocks(text):
+            block = "\n".join(line.rstrip() for line in block.splitlines() if line.strip())
+            key = re.sub(r"\s+", " ", block.lower()).strip()
+            if not key or key in seen or _is_boilerplate(block):
+                continue
+            seen.add(key)
+            blocks.append(block)
+
+        blocks = self._relevant_region(blocks, kind)
+        distilled = self._fit_budget(blocks, self.budgets.get(kind, self.budgets["search"]))
+
+        result = DistilledContent(distilled, tokens_in, estimate_tokens(distilled))
+        self.stats.pages += 1
+        self.stats.tokens_in += result.tokens_in
+        self.stats.tokens_out += result.tokens_out
+        logger.info(f"   ✂️ Distilled {kind} page: ~{result.tokens_in} → ~{result.tokens_out} tokens")
+        return result
+
+    @staticmethod
+    def _relevant_region(blocks: list[str], kind: str) -> list[str]:
+        """Search pages: from one block before the first listing to one after the last. Ads: from the title on."""
+        if kind == "search":
+            hits = [i for i, b in enumerate(blocks) if LINK_RE.search(b) and PRICE_RE.search(b)]
+            if len(hits) >= 2:
+                return blocks[max(0, hits[0] - 1) : hits[-1] + 2]
+            return blocks
+        title = next((i for i, b in enumerate(blocks) if b.lstrip().startswith("# ")), 0)
+        return blocks[title:]
+
+    @staticmethod
+    def _fit_budget(blocks: list[str], budget: int) -> str:
+        """Keeps whole blocks in order up to the budget. If no price made the cut, the first one after it is added."""
+        kept: list[str] = []
+        used = 0
+        for block in blocks:
+            cost = estimate_tokens(block) + 1
+            if used + cost > budget:
+                if not any(PRICE_RE.search(b) for b in kept):
+                    price = next((b for b in blocks[len(kept) :] if PRICE_RE.search(b)), None)
+                    if price:
+                        # Keep the price even if it means going slightly over: it is what ads are checked on.
+                        kept.append(price[:1000])
+                if not kept:
+                    kept.append(block[: budget * CHARS_PER_TOKEN])
+                break
+            kept.append(block)
+            used += cost
+        return "\n\n".join(kept)
+
+    def log_summary(self) -> None:
+        s = self.stats
+        logger.info(
+            f"   ✂️ Distiller: {s.pages} pages, ~{s.tokens_in} → ~{s.tokens_out} tokens ({s.ratio:.1f}x smaller)"
+        )
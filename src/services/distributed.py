@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import Counter
+from contextlib import suppress
+from typing import Any
+
+from crawl4ai import AsyncWebCrawler  # type: ignore
+
+from src.models import CandidateItem, ScrapeTask, SearchPageSource
+from src.services.change_detection import PageDiff
+from src.services.pipeline import ScrapePipeline
+from src.services.work_queue import Job, WorkQueue
+from src.utils.urls import ad_key, canonical_url
+from src.utils.usage_tracker import current_task
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages as job kinds. Lower priority values are claimed first: reading every search page and
+# fetching every ad before verifying lets the verify jobs of a task pile up into full batches.
+SEARCH = "search"
+DEEP_DIVE = "deep_dive"
+VERIFY = "verify"
+STAGE_PRIORITY = {SEARCH: 0, DEEP_DIVE: 1, VERIFY: 2}
+
+
+class Coordinator:
+    """Turns the tasks into search jobs, one per due search source.
+
+    Workers report how many new ads each search turned up; the coordinator feeds those counts into the
+    pipeline's source scheduler before deciding which sources are due, so it stays the only process
+    that writes the schedule.
+    """
+
+    def __init__(self, pipeline: ScrapePipeline, queue: WorkQueue):
+        self.pipeline = pipeline
+        self.queue = queue
+
+    async def enqueue(self, tasks: list[ScrapeTask]) -> int:
+        self.collect_search_results()
+        queued = sum(await asyncio.gather(*(self._enqueue_task(task) for task in tasks)))
+        logger.info(f"📥 Queued {queued} search jobs for {len(tasks)} tasks ({self.queue.outstanding()} outstanding)")
+        return queued
+
+    async def _enqueue_task(self, task: ScrapeTask) -> int:
+        task_token = current_task.set(task.name)
+        try:
+            sources = self.pipeline.due_sources(task, await self.pipeline.search_sources(task))
+        finally:
+            current_task.reset(task_token)
+        queued = 0
+        for source in sources:
+            queued += self.queue.enqueue(
+                SEARCH,
+                f"search|{task.name}|{canonical_url(source.search_url)}",
+                {"task": task.model_dump(), "source": source.model_dump()},
+                group=task.name,
+                priority=STAGE_PRIORITY[SEARCH],
+                # Searches recur every run, but a source still waiting for a worker is not queued twice.
+                repeat=True,
+            )
+        return queued
+
+    def collect_search_results(self) -> None:
+        scheduler = self.pipeline.source_scheduler
+        for job in self.queue.take_results(SEARCH):
+            if scheduler and job.result:
+                scheduler.record(job.result["source_key"], job.result["new_listings"], now=job.updated)
+
+
+class QueueWorker:
+    """Runs queued pipeline stages until the queue has been empty for `idle_exit` seconds.
+
+    Up to `concurrency` jobs run at once, sharing the pipeline's browser and fetch limits. Verify jobs
+    of one task are claimed together, up to `batch_size`, so they are checked in one batch call. Any
+    number of workers can share a queue; an ad is fetched and verified once because its jobs are keyed
+    by the canonical ad URL. `idle_exit=None` keeps the worker waiting for work until `stop()`.
+    """
+
+    def __init__(
+        self,
+        pipeline: ScrapePipeline,
+        queue: WorkQueue,
+        worker_id: str | None = None,
+        concurrency: int = 4,
+        batch_size: int = 20,
+        idle_exit: float | None = 60.0,
+        poll_interval: float = 1.0,
+    ):
+        self.pipeline = pipeline
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.idle_exit = idle_exit
+        self.poll_interval = poll_interval
+        self.done: Counter[str] = Counter()
+        self.failed: Counter[str] = Counter()
+        self._stop = asyncio.Event()
+
+    def stop(self) -> None:
+        if not self._stop.is_set():
+            logger.info("🛑 Stopping worker after the running jobs finish...")
+        self._stop.set()
+
+    async def run(self, crawler: AsyncWebCrawler) -> None:
+        logger.info(f"👷 Worker {self.worker_id} consuming jobs ({self.concurrency} at a time)")
+        await asyncio.gather(*(self._loop(crawler) for _ in range(self.concurrency)))
+        logger.info(
+            f"👷 Worker {self.worker_id} finished: {sum(self.done.values())} jobs done "
+            f"({dict(self.done)}), {sum(self.failed.values())} failed"
+        )
+
+    async def _loop(self, crawler: AsyncWebCrawler) -> None:
+        idle_since: float | None = None
+        while not self._stop.is_set():
+            # Queue calls block while another process holds the queue, so they run off the event loop.
+            jobs = await asyncio.to_thread(self.queue.claim, self.worker_id)
+            if not jobs:
+                # Running jobs elsewhere may still queue more work, so only an empty queue counts as idle.
+                if await asyncio.to_thread(self.queue.outstanding):
+                    idle_since = None
+                else:
+                    idle_since = idle_since or time.monotonic()
+                    if self.idle_exit is not None and time.monotonic() - idle_since >= self.idle_exit:
+                        return
+                await self._wait(self.poll_interval)
+                continue
+            idle_since = None
+            if jobs[0].kind == VERIFY and self.batch_size > 1:
+                jobs += await asyncio.to_thread(
+                    self.queue.claim, self.worker_id, kinds=(VERIFY,), group=jobs[0].group, limit=self.batch_size - 1
+                )
+            await self._run(crawler, jobs)
+
+    async def _run(self, crawler: AsyncWebCrawler, jobs: list[Job]) -> None:
+        kind = jobs[0].kind
+        task_token = current_task.set(jobs[0].group)
+        try:
+            results = await self._handle(crawler, jobs)
+            error = "stage failed"
+        except Exception as e:
+            results, error = [None] * len(jobs), str(e)
+        finally:
+            current_task.reset(task_token)
+
+        done = [job for job, result in zip(jobs, results, strict=True) if result is not None]
+        failed = [job for job, result in zip(jobs, results, strict=True) if result is None]
+        released = 0
+        if done:
+            completed = await asyncio.to_thread(self.queue.complete, done, next((r for r in results if r), None))
+            self.done[kind] += completed
+            released += completed
+        if failed:
+            logger.warning(f"   ⚠️ {kind} job {failed[0].key} failed (attempt {failed[0].attempts}): {error}")
+            failures = await asyncio.to_thread(self.queue.fail, failed, error)
+            self.failed[kind] += failures
+            released += failures
+        if released < len(jobs):
+            # The lease ran out mid-job and another worker took the job over; its outcome stands.
+            logger.warning(f"   ⚠️ Lost the lease on {len(jobs) - released} {kind} jobs; left to their new owner")
+
+    async def _handle(self, crawler: AsyncWebCrawler, jobs: list[Job]) -> list[dict[str, Any] | None]:
+        """Runs one stage. Returns each job's result (empty if there is none), or None for jobs that failed."""
+        job = jobs[0]
+        task = ScrapeTask.model_validate(job.payload["task"])
+        if job.kind == SEARCH:
+            return [await self._search(crawler, task, SearchPageSource.model_validate(job.payload["source"]))]
+        if job.kind == DEEP_DIVE:
+            source = SearchPageSource.model_validate(job.payload["source"])
+            cand = CandidateItem.model_validate(job.payload["candidate"])
+            return [await self._deep_dive(crawler, task, source, cand, job.payload["url"])]
+        if job.kind == VERIFY:
+            verified = await self.pipeline.verify(task, [j.payload["ad"] for j in jobs])
+            # Ads the model gave no verdict for are failed, so the queue retries them instead of dropping them.
+            return [{} if verified is not None and j.payload["ad"]["url"] in verified else None for j in jobs]
+        raise ValueError(f"Unknown job kind {job.kind!r}")
+
+    async def _search(
+        self, crawler: AsyncWebCrawler, task: ScrapeTask, source: SearchPageSource
+    ) -> dict[str, Any] | None:
+        page_diffs: list[PageDiff] = []
+        candidates = await self.pipeline.walk_results(crawler, task, source, page_diffs)
+        if candidates is None:
+            return None
+        queued = new_listings = 0
+        for cand in candidates:
+            urls = self.pipeline.ad_urls(source, cand)
+            if urls is None or self.pipeline.is_known(*urls):
+                continue
+            key = f"ad|{ad_key(urls[0])}"
+            # Only ads the queue never held are new; a failed deep dive queued again was counted before.
+            first_seen = not await asyncio.to_thread(self.queue.__contains__, key)
+            enqueued = await asyncio.to_thread(
+                self.queue.enqueue,
+                DEEP_DIVE,
+                key,
+                {
+                    "task": task.model_dump(),
+                    "source": source.model_dump(),
+                    "candidate": cand.model_dump(),
+                    "url": urls[0],
+                },
+                group=task.name,
+                priority=STAGE_PRIORITY[DEEP_DIVE],
+            )
+            queued += enqueued
+            new_listings += enqueued and first_seen
+        # Queued deep dives are durable and retried by the queue, so every analysed row counts as handled.
+        self.pipeline.save_fingerprints(source, page_diffs, [])
+        logger.info(f"   📥 {len(candidates)} candidates, {queued} ads queued for deep dives ({new_listings} new)")
+        return {"source_key": self.pipeline.source_key(task, source), "new_listings": new_listings}
+
+    async def _deep_dive(
+        self, crawler: AsyncWebCrawler, task: ScrapeTask, source: SearchPageSource, cand: CandidateItem, url: str
+    ) -> dict[str, Any] | None:
+        ad = await self.pipeline.fetch_ad(crawler, source, cand, url)
+        if ad is None:
+            return None
+        await asyncio.to_thread(
+            self.queue.enqueue,
+            VERIFY,
+            f"verify|{ad_key(url)}",
+            {"task": task.model_dump(), "ad": ad},
+            group=task.name,
+            priority=STAGE_PRIORITY[VERIFY],
+        )
+        return {}
+
+    async def _wait(self, seconds: float) -> None:
+        with suppress(TimeoutError):
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
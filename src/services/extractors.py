@@ -0,0 +1,288 @@
+import json
+import logging
+import re
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+from urllib.parse import urljoin
+
+from src.models import CandidateItem, FetchedPage, ScrapeTask
+from src.services.crawler import ContentFetcher
+from src.utils.urls import domain_of
+
+logger = logging.getLogger(__name__)
+
+MIN_CONFIDENCE = 50
+
+JSON_LD_RE = re.compile(r"<script[^>]+type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>", re.S | re.I)
+NEXT_DATA_RE = re.compile(r"<script[^>]+id=[\"']__NEXT_DATA__[\"'][^>]*>(.*?)</script>", re.S | re.I)
+MARKDOWN_LINK_RE = re.compile(r"\[([^\]]{3,200})\]\((\S+?)(?:\s+\"[^\"]*\")?\)")
+PRICE_RE = re.compile(r"(\d[\d\s.,]*)\s*(kr|sek|nok|dkk|€|eur|\$|usd|:-)", re.I)
+# Currency codes and the symbols that name exactly one currency; "kr" and ":-" could be SEK, NOK or DKK.
+CURRENCY_RE = re.compile(r"\b(sek|nok|dkk|eur|usd|gbp)\b|(€)|(\$)|(£)", re.I)
+CURRENCY_SYMBOLS = {"€": "EUR", "$": "USD", "£": "GBP"}
+TOKEN_RE = re.compile(r"[a-z0-9äöåæøüß]+(?:[.\-][a-z0-9]+)*")
+
+URL_KEYS = ("url", "href", "link", "canonicalUrl", "itemUrl", "shareUrl")
+TITLE_KEYS = ("title", "heading", "name", "subject")
+PRICE_KEYS = ("price", "priceText", "formattedPrice", "displayPrice", "amount", "offers")
+
+
+@dataclass
+class Listing:
+    url: str
+    title: str
+    price: str
+
+
+@dataclass
+class ExtractedListings:
+    """Listings read from a search page, split by whether their title shares enough words with the query."""
+
+    candidates: list[CandidateItem]
+    # Within the price cap but without a query-term match (synonyms, other languages, model numbers):
+    # the LLM judges these from the listing rows alone instead of the whole page.
+    unmatched: list[Listing] = field(default_factory=list)
+
+
+def listings_markdown(listings: list[Listing]) -> str:
+    return "\n".join(f"- [{listing.title}]({listing.url}) {listing.price}" for listing in listings)
+
+
+class SearchPageExtractor(Protocol):
+    """Turns a fetched search page into listings without an LLM. Returns None if the layout is not recognised."""
+
+    name: str
+
+    def extract(self, page: FetchedPage) -> list[Listing] | None: ...
+
+
+def price_currency(text: str) -> str | None:
+    """The ISO code of the currency a price names, e.g. 'EUR' for '95 €'. None if it names none unambiguously."""
+    match = CURRENCY_RE.search(text)
+    if not match:
+        return None
+    code = match.group(1)
+    return code.upper() if code else CURRENCY_SYMBOLS[match.group(match.lastindex or 0)]
+
+
+def parse_price(text: str) -> float | None:
+    """Parses '1 500 kr', '1.500,00 €' or '1,500.00' into a number. Returns None if there is no number."""
+    match = re.search(r"\d[\d\s.,]*", text.replace("\xa0", " "))
+    if not match:
+        return None
+    raw = re.sub(r"\s", "", match.group()).rstrip(".,")
+    if "," in raw and "." in raw:
+        decimal = "," if raw.rfind(",") > raw.rfind(".") else "."
+        raw = raw.replace("." if decimal == "," else ",", "").replace(decimal, ".")
+    elif "," in raw or "." in raw:
+        sep = "," if "," in raw else "."
+        parts = raw.split(sep)
+        # Groups of exactly three digits after the separator mean it separates thousands.
+        if all(len(p) == 3 for p in parts[1:]):
+            raw = raw.replace(sep, "")
+        else:
+            cut = raw.rfind(sep)
+            raw = raw[:cut].replace(sep, "") + "." + raw[cut + 1 :]
+    try:
+        return float(raw)
+    except ValueError:
+        return None
+
+
+def _price_text(value: Any) -> str | None:
+    if isinstance(value, int | float):
+        return str(value)
+    if isinstance(value, str) and re.search(r"\d", value):
+        return value.strip()
+    if isinstance(value, list):
+        for item in value:
+            text = _price_text(item)
+            if text:
+                return text
+    if isinstance(value, dict):
+        amount = next((value[k] for k in ("price", "amount", "value", "lowPrice") if k in value), None)
+        text = _price_text(amount)
+        if text:
+            currency = value.get("priceCurrency") or value.get("currency") or value.get("currencyCode")
+            return f"{text} {currency}" if isinstance(currency, str) else text
+    return None
+
+
+def _walk_listings(obj: Any, base_url: str, depth: int = 0) -> Iterator[Listing]:
+    """Yields every object in a JSON document that looks like an ad: an ad link, a title and a price."""
+    if depth > 25:
+        return
+    if isinstance(obj, list):
+        for item in obj:
+            yield from _walk_listings(item, base_url, depth + 1)
+        return
+    if not isinstance(obj, dict):
+        return
+
+    item = obj.get("item")
+    target: dict[str, Any] = item if isinstance(item, dict) else obj
+    url = next((target[k] for k in URL_KEYS if isinstance(target.get(k), str)), None)
+    if url is None and isinstance(item, str):
+        url = item
+    title = next((target[k] for k in TITLE_KEYS if isinstance(target.get(k), str)), None)
+    price = next((p for p in (_price_text(target.get(k)) for k in PRICE_KEYS) if p), None)
+
+    if url and title and price:
+        full_url = urljoin(base_url, url)
+        if ContentFetcher.is_valid_ad_link(full_url):
+            yield Listing(url=full_url, title=title.strip(), price=price)
+            return
+
+    for value in obj.values():
+        yield from _walk_listings(value, base_url, depth + 1)
+
+
+def _dedupe(listings: Iterator[Listing]) -> list[Listing]:
+    unique: dict[str, Listing] = {}
+    for listing in listings:
+        unique.setdefault(listing.url, listing)
+    return list(unique.values())
+
+
+class JsonLdExtractor:
+    """Reads schema.org ItemList/Product/Offer blocks embedded as JSON-LD."""
+
+    name = "json-ld"
+
+    def extract(self, page: FetchedPage) -> list[Listing] | None:
+        documents = []
+        for block in JSON_LD_RE.findall(page.html):
+            try:
+                documents.append(json.loads(block))
+            except json.JSONDecodeError:
+                continue
+        listings = _dedupe(_walk_listings(documents, page.url))
+        return listings or None
+
+
+class NextDataExtractor:
+    """Reads listing objects out of a Next.js `__NEXT_DATA__` hydration payload."""
+
+    name = "next-data"
+
+    def extract(self, page: FetchedPage) -> list[Listing] | None:
+        match = NEXT_DATA_RE.search(page.html)
+        if not match:
+            return None
+        try:
+            data = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            return None
+        listings = _dedupe(_walk_listings(data, page.url))
+        return listings or None
+
+
+class MarkdownListingExtractor:
+    """Reads server-rendered listing rows: an ad link with a price on the same or the next two lines."""
+
+    name = "markdown-listing"
+
+    def extract(self, page: FetchedPage) -> list[Listing] | None:
+        lines = page.content.splitlines()
+        found: list[Listing] = []
+        for i, line in enumerate(lines):
+            for title, href in MARKDOWN_LINK_RE.findall(line):
+                url = urljoin(page.url, href)
+                if not ContentFetcher.is_valid_ad_link(url):
+                    continue
+                window = " ".join(lines[i : i + 3])
+                price = PRICE_RE.search(window)
+                if price:
+                    found.append(Listing(url=url, title=title.strip(), price=price.group().strip()))
+        listings = _dedupe(iter(found))
+        return listings or None
+
+
+@dataclass
+class SiteExtractionStats:
+    pages: int = 0
+    extracted: int = 0
+    fallbacks: int = 0
+    by_extractor: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def coverage(self) -> float:
+        return self.extracted / self.pages if self.pages else 0.0
+
+
+class ExtractorRegistry:
+    """Per-site extractors tried in order before falling back to LLM analysis of the search page."""
+
+    DEFAULT_EXTRACTORS: list[SearchPageExtractor] = [JsonLdExtractor(), NextDataExtractor()]
+    SITE_EXTRACTORS: dict[str, list[SearchPageExtractor]] = {
+        "hifitorget.se": [MarkdownListingExtractor()],
+    }
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stats: dict[str, SiteExtractionStats] = {}
+
+    def extractors_for(self, domain: str) -> list[SearchPageExtractor]:
+        return self.SITE_EXTRACTORS.get(domain, []) + self.DEFAULT_EXTRACTORS
+
+    def extract(self, page: FetchedPage, task: ScrapeTask, query: str | None = None) -> ExtractedListings | None:
+        """Returns the page's listings within the price cap, or None to fall back to analysing the whole page."""
+        if not self.enabled:
+            return None
+
+        domain = domain_of(page.url)
+        stats = self.stats.setdefault(domain, SiteExtractionStats())
+        stats.pages += 1
+
+        for extractor in self.extractors_for(domain):
+            try:
+                listings = extractor.extract(page)
+            except Exception as e:
+                logger.warning(f"   ⚠️ Extractor {extractor.name} failed on {page.url}: {e}")
+                continue
+            if listings:
+                stats.extracted += 1
+                stats.by_extractor[extractor.name] = stats.by_extractor.get(extractor.name, 0) + 1
+                logger.info(f"   🧩 {extractor.name} extracted {len(listings)} listings without the LLM")
+                return self._to_candidates(listings, task, query or task.search_query)
+
+        stats.fallbacks += 1
+        if domain in self.SITE_EXTRACTORS:
+            logger.warning(f"   ⚠️ Known layout for {domain} not recognised (changed?), falling back to LLM")
+        return None
+
+    @staticmethod
+    def _to_candidates(listings: list[Listing], task: ScrapeTask, query: str) -> ExtractedListings:
+        query_tokens = set(TOKEN_RE.findall(query.lower()))
+        extracted = ExtractedListings(candidates=[])
+        for listing in listings:
+            # A budget in one currency says nothing about a price in another.
+            currency = price_currency(listing.price)
+            if task.max_price and currency in (None, task.currency.upper()):
+                price = parse_price(listing.price)
+                if price is not None and price > task.max_price:
+                    continue
+            title_tokens = set(TOKEN_RE.findall(listing.title.lower()))
+            score = round(100 * len(query_tokens & title_tokens) / len(query_tokens)) if query_tokens else 0
+            if score < MIN_CONFIDENCE:
+                extracted.unmatched.append(listing)
+                continue
+            extracted.candidates.append(
+                CandidateItem(
+                    url=listing.url,
+                    title=listing.title,
+                    price=listing.price,
+                    reasoning="Matched query terms in structured listing data",
+                    confidence_score=score,
+                )
+            )
+        return extracted
+
+    def log_summary(self) -> None:
+        for domain, s in sorted(self.stats.items()):
+            used = ", ".join(f"{name}={n}" for name, n in sorted(s.by_extractor.items())) or "none"
+            logger.info(
+                f"   🧩 {domain}: {s.extracted}/{s.pages} pages extracted locally ({s.coverage:.0%}), "
+                f"{s.fallbacks} LLM fallbacks [{used}]"
+            )
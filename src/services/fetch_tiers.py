@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import time
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+RECENT_OUTCOMES = 10
+
+
+class DomainTier(BaseModel):
+    """Recent static-fetch outcomes for one domain (True = plain HTML was good enough)."""
+
+    recent: list[bool] = Field(default_factory=list)
+    last_probe: float = 0.0
+    static_hits: int = 0
+    escalations: int = 0
+
+
+class TierMemory:
+    """Remembers which domains need a browser, so they skip the static attempt on later fetches.
+
+    A domain is sent straight to the browser once its last `failures_to_escalate` static attempts all
+    failed. It is re-probed with a static fetch every `reprobe_hours` in case the site changed.
+    Saving merges this process's outcomes into the file, so processes sharing it don't drop each other's.
+    """
+
+    def __init__(
+        self,
+        file_path: str = "data/fetch_tiers.json",
+        failures_to_escalate: int = 3,
+        reprobe_hours: float = 24.0,
+    ):
+        self.file_path = file_path
+        self.failures_to_escalate = failures_to_escalate
+        self.reprobe_hours = reprobe_hours
+        self.domains: dict[str, DomainTier] = self._load()
+        # Outcomes recorded since the last save, replayed onto the file's current state when saving.
+        self._unsaved: dict[str, list[tuple[bool, float]]] = {}
+        self.run_static_hits = 0
+        self.run_escalations = 0
+
+    def _load(self) -> dict[str, DomainTier]:
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {domain: DomainTier.model_validate(tier) for domain, tier in data.items()}
+        except Exception as e:
+            logger.warning(f"Could not load fetch tier memory: {e}")
+            return {}
+
+    def needs_browser(self, domain: str) -> bool:
+        tier = self.domains.get(domain)
+        if tier is None or len(tier.recent) < self.failures_to_escalate:
+            return False
+        if any(tier.recent[-self.failures_to_escalate :]):
+            return False
+        return time.time() - tier.last_probe < self.reprobe_hours * 3600
+
+    def record(self, domain: str, static_ok: bool) -> None:
+        now = time.time()
+        self._apply(self.domains, domain, static_ok, now)
+        self._unsaved.setdefault(domain, []).append((static_ok, now))
+        if static_ok:
+            self.run_static_hits += 1
+        else:
+            self.run_escalations += 1
+
+    @staticmethod
+    def _apply(domains: dict[str, DomainTier], domain: str, static_ok: bool, at: float) -> None:
+        tier = domains.setdefault(domain, DomainTier())
+        tier.recent = (tier.recent + [static_ok])[-RECENT_OUTCOMES:]
+        tier.last_probe = max(tier.last_probe, at)
+        if static_ok:
+            tier.static_hits += 1
+        else:
+            tier.escalations += 1
+
+    def save(self) -> None:
+        domains = self._load()
+        for domain, outcomes in self._unsaved.items():
+            for static_ok, at in outcomes:
+                self._apply(domains, domain, static_ok, at)
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({d: t.model_dump() for d, t in sorted(domains.items())}, f, indent=2)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            logger.error(f"Error saving fetch tier memory: {e}")
+            return
+        self.domains = domains
+        self._unsaved.clear()
+
+    def log_summary(self) -> None:
+        browser_domains = [d for d in sorted(self.domains) if self.needs_browser(d)]
+        logger.info(
+            f"   🪶 Static tier: {self.run_static_hits} pages served without a browser, "
+            f"{self.run_escalations} escalated"
+        )
+        if browser_domains:
+            logger.info(f"   🖥️ Browser-only domains: {', '.join(browser_domains)}")
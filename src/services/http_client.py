@@ -0,0 +1,67 @@
+import asyncio
+import importlib.util
+import logging
+from types import TracebackType
+from typing import Any
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class HttpClient:
+    """Shared async HTTP client with keep-alive pooling, per-host connection limits and HTTP/2 when available."""
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_connections_per_host: int = 4,
+        timeout: float = 15.0,
+        http2: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            follow_redirects=True,
+            transport=transport,
+        )
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return self._hosts[host]
+
+    async def get(self, url: str, headers: dict[str, str] | None = None, **kwargs: Any) -> httpx.Response:
+        async with self._host_slot(url):
+            return await self._client.get(url, headers=headers, **kwargs)
+
+    async def post(self, url: str, content: bytes, headers: dict[str, str] | None = None) -> httpx.Response:
+        async with self._host_slot(url):
+            return await self._client.post(url, content=content, headers=headers)
+
+    async def conditional_get(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        """Issues a conditional GET. Only a 200 has its body read; a 304 or error status comes back without it."""
+        async with self._host_slot(url), self._client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code == 200:
+                await resp.aread()
+            return resp
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        await self.aclose()
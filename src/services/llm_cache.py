@@ -0,0 +1,106 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+
+@dataclass
+class LLMCacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def cache_key(prompt: str, schema: type[BaseModel], model: str) -> str:
+    """Hashes the whitespace-normalised prompt, the response schema and the model name."""
+    normalised = re.sub(r"\s+", " ", prompt).strip()
+    schema_json = json.dumps(schema.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(f"{model}\x00{schema_json}\x00{normalised}".encode()).hexdigest()
+
+
+class LLMCache:
+    """Persistent cache of parsed Gemini responses, with a TTL per call type.
+
+    Call types without a TTL are never cached. Entries are stored as the parsed pydantic result, so a
+    hit costs a single indexed SQLite read and no quota.
+    """
+
+    def __init__(self, file_path: str = "data/llm_cache.db", ttl_hours: dict[str, float] | None = None):
+        self.file_path = file_path
+        self.ttl_hours = ttl_hours or {}
+        self.stats = LLMCacheStats()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, call_type TEXT NOT NULL, model TEXT NOT NULL, "
+            "created REAL NOT NULL, payload TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def ttl_seconds(self, call_type: str) -> float:
+        return self.ttl_hours.get(call_type, 0.0) * 3600
+
+    def get(self, prompt: str, schema: type[T], models: list[str], call_type: str) -> T | None:
+        """Returns the cached result from the first model in `models` that has a fresh entry."""
+        ttl = self.ttl_seconds(call_type)
+        if ttl <= 0:
+            self.stats.bypassed += 1
+            return None
+
+        for model in models:
+            row = self.conn.execute(
+                "SELECT created, payload FROM llm_cache WHERE key = ?", (cache_key(prompt, schema, model),)
+            ).fetchone()
+            if row and time.time() - row[0] < ttl:
+                try:
+                    result = schema.model_validate_json(row[1])
+                except ValidationError:
+                    continue
+                self.stats.hits += 1
+                return result
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, prompt: str, schema: type[BaseModel], model: str, call_type: str, result: BaseModel) -> None:
+        if self.ttl_seconds(call_type) <= 0:
+            return
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, call_type, model, created, payload) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(prompt, schema, model), call_type, model, time.time(), result.model_dump_json()),
+            )
+
+    def prune(self) -> int:
+        """Deletes entries older than the longest TTL. Returns the number removed."""
+        longest = max(self.ttl_hours.values(), default=0.0) * 3600
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - longest,))
+        return cursor.rowcount
+
+    def log_summary(self) -> None:
+        s = self.stats
+        logger.info(
+            f"   💾 LLM cache: {s.hits} hits, {s.misses} misses ({s.hit_ratio:.0%}), {s.bypassed} uncached calls"
+        )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import re
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.models import ModelQuota
+from src.utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_RE = re.compile(r"retry[_ ]?(?:delay|after)[\"':\s]+(\d+(?:\.\d+)?)\s*s?", re.I)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Reads the server's back-off hint from a Gemini error: the Retry-After header or the RetryInfo delay."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    match = RETRY_DELAY_RE.search(str(getattr(error, "details", None) or error))
+    return float(match.group(1)) if match else None
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    throttled: int = 0
+    errors: int = 0
+    circuit_opens: int = 0
+    wait_seconds: float = 0.0
+
+
+@dataclass(eq=False)
+class Grant:
+    """A model handed out by `ModelScheduler.acquire`. `probe` marks the one half-open probe of a model;
+    only that grant can end the probe, so a stale call finishing meanwhile cannot let a second one in.
+    """
+
+    model: str
+    probe: bool = False
+
+
+class ModelState:
+    """Quota buckets and circuit breaker of one model."""
+
+    def __init__(self, quota: ModelQuota, clock: Callable[[], float]):
+        self.requests = TokenBucket(quota.requests_per_minute / 60, quota.requests_per_minute, clock=clock)
+        self.tokens = TokenBucket(quota.tokens_per_minute / 60, quota.tokens_per_minute, clock=clock)
+        self.max_tokens = quota.tokens_per_minute
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.probe: Grant | None = None
+        self.stats = ModelStats()
+
+    def delay_for(self, tokens: int) -> float:
+        return max(self.requests.delay_for(), self.tokens.delay_for(min(tokens, self.max_tokens)))
+
+    def reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(), self.tokens.reserve(min(tokens, self.max_tokens)))
+
+
+class ModelScheduler:
+    """Routes each Gemini request to the first model (in cost order) that has quota right now.
+
+    Every model has RPM and TPM token buckets and a circuit breaker. A 429 opens the breaker for the
+    server's Retry-After (or an exponential cooldown); repeated errors open it too. After the cooldown a
+    single probe request is let through, which closes the breaker on success. When no model has capacity
+    the request waits for the soonest slot instead of sleeping a fixed time.
+    """
+
+    def __init__(
+        self,
+        quotas: dict[str, ModelQuota],
+        failure_threshold: int = 3,
+        base_cooldown: float = 30.0,
+        max_wait: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not quotas:
+            raise ValueError("Model scheduler needs at least one model")
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_wait = max_wait
+        self._clock = clock
+        self.states = {model: ModelState(quota, clock) for model, quota in quotas.items()}
+
+    @property
+    def models(self) -> list[str]:
+        return list(self.states)
+
+    def _available(self, model: str, now: float) -> bool:
+        state = self.states[model]
+        if state.open_until > now:
+            return False
+        # Breaker cooled down: half-open, one probe at a time.
+        return not (state.open_until and state.probe)
+
+    async def acquire(self, tokens: int, exclude: set[str] | None = None) -> Grant | None:
+        """Reserves quota for a request of about `tokens` tokens and returns a grant for the model to use.
+
+        Returns None if every model is excluded or no slot opens up within `max_wait` seconds.
+        """
+        exclude = exclude or set()
+        waited = 0.0
+        while True:
+            now = self._clock()
+            candidates = [m for m in self.states if m not in exclude]
+            if not candidates:
+                return None
+            # A prompt bigger than a model's whole TPM quota only goes there if no other model can take it.
+            candidates = [m for m in candidates if self.states[m].max_tokens >= tokens] or candidates
+
+            ready = [m for m in candidates if self._available(m, now)]
+            for model in ready:
+                if self.states[model].delay_for(tokens) <= 0:
+                    return self._grant(model, tokens, waited)
+
+            if ready:
+                # Nothing free right now: book the soonest slot and wait for it.
+                model = min(ready, key=lambda m: self.states[m].delay_for(tokens))
+                delay = self.states[model].delay_for(tokens)
+                if waited + delay > self.max_wait:
+                    return None
+                self.states[model].reserve(tokens)
+                await asyncio.sleep(delay)
+                return self._grant(model, tokens, waited + delay, reserved=True)
+
+            reopen = min(self.states[m].open_until for m in candidates)
+            delay = max(reopen - now, 0.05)
+            if waited + delay > self.max_wait:
+                return None
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def _grant(self, model: str, tokens: int, waited: float, reserved: bool = False) -> Grant:
+        state = self.states[model]
+        if not reserved:
+            state.reserve(tokens)
+        grant = Grant(model, probe=bool(state.open_until))
+        if grant.probe:
+            state.probe = grant
+        state.stats.calls += 1
+        state.stats.wait_seconds += waited
+        return grant
+
+    def record_success(self, grant: Grant, estimated_tokens: int, used_tokens: int | None = None) -> None:
+        state = self.states[grant.model]
+        state.failures = 0
+        state.open_until = 0.0
+        state.cooldown = 0.0
+        # The breaker is closed; a probe still in flight no longer matters and cannot clear a later one.
+        state.probe = None
+        if used_tokens and used_tokens > estimated_tokens:
+            # Charge what the call really cost so the TPM bucket does not drift optimistic.
+            state.tokens.reserve(used_tokens - estimated_tokens)
+
+    def record_failure(self, grant: Grant, throttled: bool = False, retry_after: float | None = None) -> None:
+        model = grant.model
+        state = self.states[model]
+        self.release(grant)
+        state.failures += 1
+        if throttled:
+            state.stats.throttled += 1
+        else:
+            state.stats.errors += 1
+
+        if throttled or retry_after is not None or state.failures >= self.failure_threshold:
+            state.cooldown = min(max(state.cooldown * 2, self.base_cooldown), 600.0)
+            duration = retry_after if retry_after is not None else state.cooldown
+            state.open_until = self._clock() + duration
+            state.stats.circuit_opens += 1
+            logger.warning(f"   🔌 {model} paused for {duration:.0f}s")
+
+    def release(self, grant: Grant) -> None:
+        """Ends the grant's half-open probe, e.g. when its call was cancelled. No-op for any other grant."""
+        state = self.states[grant.model]
+        if state.probe is grant:
+            state.probe = None
+
+    def disable(self, model: str) -> None:
+        """Takes a model out of rotation for the rest of the run (e.g. it does not exist for this key)."""
+        self.states[model].open_until = float("inf")
+
+    def log_summary(self) -> None:
+        for model, state in self.states.items():
+            s = state.stats
+            logger.info(
+                f"   🚦 {model}: {s.calls} calls, {s.throttled} throttled, {s.errors} errors, "
+                f"{s.circuit_opens} pauses, {s.wait_seconds:.1f}s waiting for quota"
+            )
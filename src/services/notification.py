@@ -1,16 +1,83 @@
+import asyncio
+import base64
 import logging
+import time
+from dataclasses import dataclass, field
 
-import requests
+import httpx
+
+from src.services.http_client import HttpClient
+from src.utils.stats import percentile
+from src.utils.usage_tracker import current_task
 
 logger = logging.getLogger(__name__)
 
+START_DIGEST = "\x00start"
+
+
+def _header_value(value: str) -> str:
+    """HTTP headers are ASCII; other text (e.g. a task name with å/ä/ö) is RFC 2047 encoded, which ntfy decodes."""
+    if value.isascii():
+        return value
+    return f"=?UTF-8?B?{base64.b64encode(value.encode('utf-8')).decode('ascii')}?="
+
+
+@dataclass
+class Notification:
+    message: str
+    title: str = "Scraper Notification"
+    priority: str = "default"
+    click_url: str | None = None
+    tags: str | None = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class DeliveryStats:
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    coalesced: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    def percentile(self, p: float) -> float:
+        return percentile(self.latencies, p)
+
 
 class NotificationService:
-    def __init__(self, topic: str):
+    """Delivers ntfy notifications from a queue in the background, in order, with retries.
+
+    Match and start notifications are held for `digest_window` seconds and coalesced into one message
+    per task (and one for all task starts), so a run with many hits buzzes the phone once per task.
+    `aclose()` flushes pending digests and waits for the queue to drain.
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        http_client: HttpClient | None = None,
+        server_url: str = "https://ntfy.sh",
+        digest_window: float = 60.0,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        dry_run: bool = False,
+    ):
         self.topic = topic
-        self.base_url = f"https://ntfy.sh/{topic}"
+        self.base_url = f"{server_url.rstrip('/')}/{topic}"
+        self.http_client = http_client or HttpClient()
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Log notifications instead of sending them (used when replaying a cassette).
+        self.dry_run = dry_run
+        self.stats = DeliveryStats()
+        self._queue: asyncio.Queue[Notification | None] = asyncio.Queue()
+        self._worker: asyncio.Task[None] | None = None
+        self._digests: dict[str, list[tuple[str, str, str]]] = {}
+        self._digest_timers: dict[str, asyncio.Task[None]] = {}
+        self._digest_started: dict[str, float] = {}
 
-    def send_notification(
+    async def send_notification(
         self,
         message: str,
         title: str = "Scraper Notification",
@@ -18,36 +85,133 @@ class NotificationService:
         click_url: str | None = None,
         tags: str | None = None,
     ) -> bool:
-        """Sends a notification to the configured ntfy topic."""
-        headers = {"Title": title, "Priority": priority}
+        """Sends a notification to the configured ntfy topic right away, retrying transient failures."""
+        if self.dry_run:
+            logger.info(f"📣 [dry run] {title}: {message}")
+            return True
+
+        headers = {"Title": _header_value(title), "Priority": priority}
         if click_url:
-            headers["Click"] = click_url
+            headers["Click"] = _header_value(click_url)
         if tags:
-            headers["Tags"] = tags
+            headers["Tags"] = _header_value(tags)
 
-        try:
-            response = requests.post(self.base_url, data=message.encode("utf-8"), headers=headers, timeout=10)
-            response.raise_for_status()
-            logger.debug(f"Notification sent to {self.topic}")
-            return True
-        except requests.RequestException as e:
-            logger.error(f"Failed to send notification: {e}")
-            return False
-
-    def notify_start(self, item_name: str) -> None:
-        self.send_notification(message=f"Scraper started for {item_name}!", title="Scraper Online", priority="1")
-
-    def notify_match(self, item_name: str, price: str, url: str) -> None:
-        self.send_notification(
-            message=f"Found: {item_name}\n💰 {price}\n🔗 {url}",
-            title="Deal Found!",
-            click_url=url,
-            tags="loudspeaker,moneybag",
-        )
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.http_client.post(self.base_url, content=message.encode("utf-8"), headers=headers)
+                response.raise_for_status()
+                logger.debug(f"Notification sent to {self.topic}")
+                return True
+            except httpx.HTTPError as e:
+                status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                if attempt == self.max_retries or (status is not None and status < 500 and status != 429):
+                    logger.error(f"Failed to send notification: {e}")
+                    return False
+                self.stats.retries += 1
+                await asyncio.sleep(self.retry_backoff * 2**attempt)
+        return False
+
+    def enqueue(self, notification: Notification) -> None:
+        """Queues a notification for background delivery; never blocks the caller."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._deliver())
+        self._queue.put_nowait(notification)
+
+    async def _deliver(self) -> None:
+        while True:
+            notification = await self._queue.get()
+            try:
+                if notification is None:
+                    return
+                try:
+                    ok = await self.send_notification(
+                        notification.message,
+                        title=notification.title,
+                        priority=notification.priority,
+                        click_url=notification.click_url,
+                        tags=notification.tags,
+                    )
+                except Exception as e:
+                    # One message that cannot be sent must not stop delivery of the ones queued behind it.
+                    logger.error(f"Failed to send notification '{notification.title}': {e}")
+                    ok = False
+                if ok:
+                    self.stats.sent += 1
+                    self.stats.latencies.append(time.monotonic() - notification.enqueued_at)
+                else:
+                    self.stats.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def _add_to_digest(self, key: str, entry: tuple[str, str, str]) -> None:
+        if self.digest_window <= 0:
+            self._digests[key] = [entry]
+            self._flush_digest(key)
+            return
+        if key not in self._digests:
+            self._digests[key] = []
+            self._digest_started[key] = time.monotonic()
+            self._digest_timers[key] = asyncio.create_task(self._flush_after(key))
+        else:
+            self.stats.coalesced += 1
+        self._digests[key].append(entry)
+
+    async def _flush_after(self, key: str) -> None:
+        await asyncio.sleep(self.digest_window)
+        self._digest_timers.pop(key, None)
+        self._flush_digest(key)
+
+    def _flush_digest(self, key: str) -> None:
+        entries = self._digests.pop(key, [])
+        started = self._digest_started.pop(key, time.monotonic())
+        if not entries:
+            return
+        if key == START_DIGEST:
+            names = ", ".join(name for name, _, _ in entries)
+            self.enqueue(Notification(f"Scraper started for {names}!", title="Scraper Online", priority="1"))
+            return
 
-    def notify_error(self, message: str) -> None:
-        """Sends an error notification."""
-        try:
-            requests.post(f"https://ntfy.sh/{self.topic}", data=f"ERROR: {message}".encode(), timeout=10)
-        except Exception as e:
-            logger.error(f"Failed to send error notification: {e}")
+        if len(entries) == 1:
+            item_name, price, url = entries[0]
+            notification = Notification(
+                f"Found: {item_name}\n💰 {price}\n🔗 {url}",
+                title="Deal Found!",
+                click_url=url,
+                tags="loudspeaker,moneybag",
+            )
+        else:
+            lines = "\n".join(f"• {item_name} — {price}\n  🔗 {url}" for item_name, price, url in entries)
+            notification = Notification(lines, title=f"{len(entries)} Deals Found: {key}", tags="loudspeaker,moneybag")
+        # Latency is measured from the first hit of the digest, not from the flush.
+        notification.enqueued_at = started
+        self.enqueue(notification)
+
+    async def notify_start(self, item_name: str) -> None:
+        self._add_to_digest(START_DIGEST, (item_name, "", ""))
+
+    async def notify_match(self, item_name: str, price: str, url: str, task: str | None = None) -> None:
+        self._add_to_digest(task or current_task.get(), (item_name, price, url))
+
+    async def notify_error(self, message: str) -> None:
+        """Sends an error notification without waiting for a digest window."""
+        self.enqueue(Notification(f"ERROR: {message}", title="Scraper Error", priority="high"))
+
+    async def aclose(self) -> None:
+        """Flushes pending digests in the order they were opened and waits until every message is delivered."""
+        for timer in self._digest_timers.values():
+            timer.cancel()
+        self._digest_timers.clear()
+        for key in sorted(self._digests, key=lambda k: self._digest_started.get(k, 0.0)):
+            self._flush_digest(key)
+
+        if self._worker and not self._worker.done():
+            self._queue.put_nowait(None)
+            await self._worker
+        self._worker = None
+
+    def log_summary(self) -> None:
+        s = self.stats
+        logger.info(
+            f"   📣 Notifications: {s.sent} sent, {s.failed} failed, {s.retries} retries, {s.coalesced} coalesced; "
+            f"delivery latency p50 {s.percentile(0.5):.1f}s / p95 {s.percentile(0.95):.1f}s"
+        )
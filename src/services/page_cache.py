@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from src.models import FetchedPage
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry(BaseModel):
+    """Index record for one cached URL. Bodies live in content-addressed blobs."""
+
+    url: str
+    url_class: str
+    fetched_at: float
+    content_hash: str
+    html_hash: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    source: str = "browser"
+
+    @property
+    def revalidatable(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+@dataclass
+class CacheStats:
+    lookups: int = 0
+    hits: int = 0
+    revalidated: int = 0
+
+    @property
+    def misses(self) -> int:
+        return self.lookups - self.hits - self.revalidated
+
+    @property
+    def hit_ratio(self) -> float:
+        return (self.hits + self.revalidated) / self.lookups if self.lookups else 0.0
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _header(headers: dict[str, str], name: str) -> str | None:
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class PageCache:
+    """On-disk page cache under data/, with per-URL-class TTLs and ETag/Last-Modified validators.
+
+    Layout: `index/<sha256(url)>.json` holds a CacheEntry; `blobs/<hh>/<sha256(body)>` holds bodies,
+    so identical pages are stored once.
+    """
+
+    def __init__(
+        self,
+        root: str = "data/page_cache",
+        ttl_hours: dict[str, float] | None = None,
+        max_age_days: float = 30.0,
+    ):
+        self.root = root
+        self.ttl_hours = ttl_hours if ttl_hours is not None else {"search": 1.0, "ad": 72.0}
+        self.max_age_days = max_age_days
+        self.stats = CacheStats()
+        os.makedirs(os.path.join(root, "index"), exist_ok=True)
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.root, "index", f"{_sha256(url)}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _write_blob(self, text: str) -> str:
+        digest = _sha256(text)
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return digest
+
+    def _read_blob(self, digest: str | None) -> str | None:
+        if not digest:
+            return None
+        try:
+            with open(self._blob_path(digest), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _read_entry(self, path: str) -> CacheEntry | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return CacheEntry.model_validate_json(f.read())
+        except Exception:
+            return None
+
+    def _write_entry(self, entry: CacheEntry) -> None:
+        with open(self._index_path(entry.url), "w", encoding="utf-8") as f:
+            f.write(entry.model_dump_json())
+
+    def _to_page(self, entry: CacheEntry) -> FetchedPage | None:
+        content = self._read_blob(entry.content_hash)
+        if content is None:
+            return None
+        return FetchedPage(url=entry.url, content=content, html=self._read_blob(entry.html_hash) or "", source="cache")
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        ttl_seconds = self.ttl_hours.get(entry.url_class, 0.0) * 3600
+        return time.time() - entry.fetched_at < ttl_seconds
+
+    def lookup(self, url: str) -> tuple[FetchedPage | None, CacheEntry | None]:
+        """Returns (page, None) on a fresh hit, or (None, entry) when a stale entry can be revalidated."""
+        self.stats.lookups += 1
+        entry = self._read_entry(self._index_path(url))
+        if entry is None:
+            return None, None
+
+        if self.is_fresh(entry):
+            page = self._to_page(entry)
+            if page is not None:
+                self.stats.hits += 1
+                return page, None
+
+        return None, entry if entry.revalidatable else None
+
+    def mark_revalidated(self, entry: CacheEntry) -> FetchedPage | None:
+        """Extends a stale entry after the origin answered 304 Not Modified."""
+        page = self._to_page(entry)
+        if page is None:
+            return None
+        entry.fetched_at = time.time()
+        self._write_entry(entry)
+        self.stats.revalidated += 1
+        return page
+
+    def put(self, url_class: str, page: FetchedPage) -> None:
+        try:
+            entry = CacheEntry(
+                url=page.url,
+                url_class=url_class,
+                fetched_at=time.time(),
+                content_hash=self._write_blob(page.content),
+                html_hash=self._write_blob(page.html) if page.html else None,
+                etag=_header(page.headers, "etag"),
+                last_modified=_header(page.headers, "last-modified"),
+                source=page.source,
+            )
+            self._write_entry(entry)
+        except Exception as e:
+            logger.warning(f"Could not cache {page.url}: {e}")
+
+    def prune(self) -> int:
+        """Drops entries older than max_age_days and any blobs no longer referenced. Returns entries removed."""
+        cutoff = time.time() - self.max_age_days * 86400
+        index_dir = os.path.join(self.root, "index")
+        referenced: set[str] = set()
+        removed = 0
+
+        for name in os.listdir(index_dir):
+            path = os.path.join(index_dir, name)
+            entry = self._read_entry(path)
+            if entry is None or entry.fetched_at < cutoff:
+                os.remove(path)
+                removed += 1
+                continue
+            referenced.add(entry.content_hash)
+            if entry.html_hash:
+                referenced.add(entry.html_hash)
+
+        blobs_dir = os.path.join(self.root, "blobs")
+        for shard in os.listdir(blobs_dir):
+            for digest in os.listdir(os.path.join(blobs_dir, shard)):
+                if digest not in referenced:
+                    os.remove(os.path.join(blobs_dir, shard, digest))
+
+        return removed
+
+    def log_summary(self) -> None:
+        s = self.stats
+        logger.info(
+            f"   🗄️ Page cache: {s.hits} hits, {s.revalidated} revalidated (304), {s.misses} misses "
+            f"— hit ratio {s.hit_ratio:.0%}"
+        )
@@ -0,0 +1,362 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Iterable
+from typing import TypeVar
+
+from crawl4ai import AsyncWebCrawler  # type: ignore
+
+from src.models import CandidateItem, FetchedPage, PaginationRule, ScrapeTask, SearchPageSource
+from src.services.analysis import GeminiAnalyzer
+from src.services.change_detection import PageDiff, SearchPageChangeDetector
+from src.services.crawler import ContentFetcher
+from src.services.distiller import ContentDistiller
+from src.services.extractors import ExtractedListings, ExtractorRegistry, listings_markdown
+from src.services.notification import NotificationService
+from src.services.presenter import ResultsPresenter
+from src.services.source_scheduler import SourceScheduler
+from src.services.storage import SeenStore
+from src.utils.concurrency import DomainLimiter
+from src.utils.tracing import ERROR, tracer
+from src.utils.urls import ad_key, canonical_url, domain_of, results_page_url
+from src.utils.usage_tracker import current_task
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ScrapePipeline:
+    """Runs scrape tasks end-to-end: search pages, candidate analysis, deep dives and batch verification.
+
+    In concurrent mode tasks, search pages and deep dives are scheduled together and page fetches are
+    bounded by the DomainLimiter. In sequential mode every step is awaited in order, one at a time.
+    """
+
+    def __init__(
+        self,
+        analyzer: GeminiAnalyzer,
+        content_fetcher: ContentFetcher,
+        notification_service: NotificationService,
+        presenter: ResultsPresenter,
+        seen: SeenStore,
+        target_sites: list[str],
+        limiter: DomainLimiter | None = None,
+        concurrent: bool = True,
+        extractors: ExtractorRegistry | None = None,
+        change_detector: SearchPageChangeDetector | None = None,
+        distiller: ContentDistiller | None = None,
+        source_scheduler: SourceScheduler | None = None,
+        pagination: dict[str, PaginationRule] | None = None,
+        max_search_pages: int = 1,
+    ):
+        self.analyzer = analyzer
+        self.content_fetcher = content_fetcher
+        self.notification_service = notification_service
+        self.presenter = presenter
+        self.seen = seen
+        self.target_sites = target_sites
+        self.concurrent = concurrent
+        self.limiter = limiter or DomainLimiter(max_concurrency=1, max_per_domain=1)
+        self.extractors = extractors or ExtractorRegistry()
+        self.change_detector = change_detector
+        self.distiller = distiller or ContentDistiller(enabled=False)
+        self.source_scheduler = source_scheduler
+        self.pagination = pagination or {}
+        self.max_search_pages = max_search_pages
+        # Ad keys already taken on in this run, so each ad is fetched and verified at most once
+        # even when several queries or tracking variants of its URL turn up.
+        self._run_ad_keys: set[str] = set()
+        self.confirmed_hits = 0
+
+    async def _map(self, coros: Iterable[Awaitable[T]]) -> list[T]:
+        """Awaits the coroutines concurrently or one by one, always returning results in input order."""
+        if self.concurrent:
+            return list(await asyncio.gather(*coros))
+        return [await coro for coro in coros]
+
+    async def _fetch(self, crawler: AsyncWebCrawler, url: str) -> str | None:
+        async with self.limiter.slot(url):
+            return await self.content_fetcher.fetch_ad_content(crawler, url)
+
+    async def _fetch_page(self, crawler: AsyncWebCrawler, url: str) -> FetchedPage | None:
+        async with self.limiter.slot(url):
+            return await self.content_fetcher.fetch_page(crawler, url)
+
+    def reset_run_state(self) -> None:
+        """Forgets which ads this run already took on, so a resident process retries failed deep dives."""
+        self._run_ad_keys.clear()
+
+    async def run(self, crawler: AsyncWebCrawler, tasks: list[ScrapeTask]) -> None:
+        await self._map(self.run_task(crawler, task) for task in tasks)
+
+    async def run_task(self, crawler: AsyncWebCrawler, task: ScrapeTask, announce: bool = True) -> None:
+        """Runs one task end to end. `announce` sends the task-start notification first."""
+        logger.info(f"\n⚡ Starting Task: {task.name}")
+        task_token = current_task.set(task.name)
+        try:
+            with tracer.span("task", query=task.search_query):
+                await self._run_task(crawler, task, announce)
+        finally:
+            current_task.reset(task_token)
+
+    async def _run_task(self, crawler: AsyncWebCrawler, task: ScrapeTask, announce: bool) -> None:
+        if announce:
+            await self.notification_service.notify_start(task.name)
+
+        # A. Generate Queries / Direct URLs
+        all_search_urls = self.due_sources(task, await self.search_sources(task))
+
+        # B. Agentic Search Page Analysis (+ C. Deep Dive)
+        per_source = await self._map(self._process_source(crawler, task, source) for source in all_search_urls)
+        ads_to_analyze = [ad for ads in per_source for ad in ads]
+
+        # D. Batch Verify
+        if ads_to_analyze:
+            await self.verify(task, ads_to_analyze)
+        else:
+            # Update status even if no candidates
+            self.presenter.save_results([], task.name, total_scanned=0)
+
+        logger.info(f"✨ Task '{task.name}' finished.")
+
+    async def verify(self, task: ScrapeTask, ads: list[dict[str, str]]) -> set[str] | None:
+        """Verifies fetched ads in batches, notifies matches and saves them.
+
+        Returns the URLs of the ads that got a verdict (the model may leave some out), or None if the call failed.
+        """
+        item_label = task.name if task.search_query.startswith("http") else task.search_query
+        logger.info(f"   🧠 Verifying {len(ads)} candidates for {item_label}...")
+        with tracer.span("verify", ads=len(ads)) as span:
+            results = await self.analyzer.analyze_batch(item_label, ads)
+            span.outcome = "ok" if results is not None else ERROR
+
+        confirmed_hits = []
+        if results:
+            for res in results:
+                if res.found_item:
+                    logger.info(f"      🎉 MATCH! {res.item_name} - {res.price}")
+                    await self.notification_service.notify_match(res.item_name, res.price, res.url)
+                    confirmed_hits.append(res)
+                    self.confirmed_hits += 1
+                else:
+                    logger.info(f"      ❌ Skip: {res.item_name} ({res.reasoning})")
+
+        # Save verified hits (or update scan status)
+        self.presenter.save_results(confirmed_hits, task.name, total_scanned=len(ads))
+        return {res.url for res in results} if results is not None else None
+
+    async def search_sources(self, task: ScrapeTask) -> list[SearchPageSource]:
+        if task.search_query.startswith("http"):
+            logger.info(f"   🔗 Direct URL detected: {task.search_query}")
+            return [SearchPageSource(site_name="Direct", search_url=task.search_query)]
+
+        with tracer.span("search_urls"):
+            queries = [task.search_query]
+            if task.fuzzy_search:
+                variations = await self.analyzer.generate_query_variations(task.search_query)
+                queries.extend([v for v in variations if v not in queries])
+
+            logger.info(f"   🔎 Searching for queries: {', '.join(queries)}")
+
+            per_query = await self._map(self.analyzer.get_search_urls(q, self.target_sites) for q in queries)
+
+        # Variations can resolve to the same search URL; crawl each page once.
+        sources: dict[str, SearchPageSource] = {}
+        for q, batch in zip(queries, per_query, strict=True):
+            for source in batch:
+                sources.setdefault(canonical_url(source.search_url), source.model_copy(update={"query": q}))
+        return list(sources.values())
+
+    @staticmethod
+    def source_key(task: ScrapeTask, source: SearchPageSource) -> str:
+        return SourceScheduler.key(task.name, source.site_name, source.query or source.search_url)
+
+    def due_sources(self, task: ScrapeTask, sources: list[SearchPageSource]) -> list[SearchPageSource]:
+        """Drops sources whose learned revisit interval has not elapsed yet."""
+        if not self.source_scheduler:
+            return sources
+        due = []
+        for source in sources:
+            key = self.source_key(task, source)
+            if self.source_scheduler.due(key):
+                due.append(source)
+            else:
+                self.source_scheduler.skipped()
+                logger.info(
+                    f"   📅 Skipping {source.search_url}: next crawl due in "
+                    f"{self.source_scheduler.next_crawl_in(key):.0f} min"
+                )
+        return due
+
+    async def _process_source(
+        self, crawler: AsyncWebCrawler, task: ScrapeTask, source: SearchPageSource
+    ) -> list[dict[str, str]]:
+        page_diffs: list[PageDiff] = []
+        candidates = await self.walk_results(crawler, task, source, page_diffs)
+        if candidates is None:
+            # Nothing could be read; the source stays due so the next run tries again.
+            return []
+        if not candidates:
+            logger.info("   ℹ️ No candidates found on this page.")
+            new_ads: list[dict[str, str]] = []
+        else:
+            logger.info(f"   ✅ Agent selected {len(candidates)} candidates.")
+
+            # C. Deep Dive
+            ads = await self._map(self._deep_dive(crawler, source, cand) for cand in candidates)
+            new_ads = [ad for ad in ads if ad is not None]
+
+        self.record_source(task, source, len(new_ads))
+        self.save_fingerprints(source, page_diffs, candidates)
+        return new_ads
+
+    def record_source(self, task: ScrapeTask, source: SearchPageSource, new_listings: int) -> None:
+        if self.source_scheduler:
+            self.source_scheduler.record(self.source_key(task, source), new_listings)
+
+    async def walk_results(
+        self, crawler: AsyncWebCrawler, task: ScrapeTask, source: SearchPageSource, page_diffs: list[PageDiff]
+    ) -> list[CandidateItem] | None:
+        """Reads results pages newest first until a page lists no unseen ads.
+
+        Sites without a pagination rule are read one page deep. Returns None if the first page failed.
+        Analysed pages are added to `page_diffs`; see `save_fingerprints`.
+        """
+        rule = self.pagination.get(domain_of(source.search_url))
+        page_count = self.max_search_pages if rule else 1
+        collected: list[CandidateItem] = []
+        walked: set[str] = set()
+        for index in range(page_count):
+            url = results_page_url(source.search_url, rule, index) if rule else source.search_url
+            candidates = await self._read_results_page(crawler, task, source, url, index, page_diffs)
+            if candidates is None:
+                return collected if index else None
+            collected.extend(candidates)
+            if index + 1 == page_count:
+                break
+
+            unseen = set()
+            for cand in candidates:
+                urls = self.ad_urls(source, cand)
+                if urls and not self.is_known(*urls) and urls[0] not in walked:
+                    unseen.add(urls[0])
+            if not unseen:
+                break
+            walked |= unseen
+            logger.info(f"   📄 Page {index + 1} listed {len(unseen)} unseen ads, reading page {index + 2}...")
+        return collected
+
+    async def _read_results_page(
+        self,
+        crawler: AsyncWebCrawler,
+        task: ScrapeTask,
+        source: SearchPageSource,
+        url: str,
+        index: int,
+        page_diffs: list[PageDiff],
+    ) -> list[CandidateItem] | None:
+        logger.info(f"   🌐 Checking: {url}")
+
+        with tracer.span("search_page", url=url, page=index + 1) as span:
+            page = await self._fetch_page(crawler, url)
+            if not page:
+                span.outcome = ERROR
+                return None
+
+            # Structured data first; the LLM only sees pages no extractor recognises.
+            extracted = self.extractors.extract(page, task, source.query)
+            span.outcome = "extracted" if extracted is not None else "llm"
+            if extracted is None:
+                candidates = await self._analyze_search_page(page, task, page_diffs)
+            else:
+                candidates = await self._judge_unmatched(extracted, task)
+            span.attrs["candidates"] = len(candidates or [])
+        return candidates
+
+    async def _analyze_search_page(
+        self, page: FetchedPage, task: ScrapeTask, page_diffs: list[PageDiff]
+    ) -> list[CandidateItem] | None:
+        content = self.distiller.distill(page.content, kind="search").text
+        if not self.change_detector:
+            return await self.analyzer.analyze_search_page(content, task)
+
+        page_diff = self.change_detector.diff(f"{task.name}|{canonical_url(page.url)}", content, page.url)
+        if page_diff.unchanged:
+            logger.info("   🔁 Listings unchanged since last run, skipping analysis.")
+            self.change_detector.record_analysis(page_diff, analysed=True)
+            return []
+        if page_diff.comparable:
+            logger.info(f"   🔁 {len(page_diff.new_blocks)} new listing rows, analysing only those.")
+
+        candidates = await self.analyzer.analyze_search_page(page_diff.content_for_analysis(), task)
+        if candidates is None:
+            # A failed call stores nothing, so the rows are analysed again next run.
+            self.change_detector.record_analysis(page_diff, analysed=False)
+        else:
+            page_diffs.append(page_diff)
+        return candidates
+
+    async def _judge_unmatched(self, extracted: ExtractedListings, task: ScrapeTask) -> list[CandidateItem] | None:
+        """Adds the extracted listings the LLM finds relevant although their titles don't share the query's words."""
+        if not extracted.unmatched:
+            return extracted.candidates
+        logger.info(f"   🧠 {len(extracted.unmatched)} extracted listings without a query-term match, asking the LLM")
+        judged = await self.analyzer.analyze_search_page(listings_markdown(extracted.unmatched), task)
+        if judged is None:
+            return extracted.candidates or None
+        return extracted.candidates + judged
+
+    def save_fingerprints(
+        self, source: SearchPageSource, page_diffs: list[PageDiff], candidates: list[CandidateItem]
+    ) -> None:
+        """Stores the fingerprints of analysed pages once their candidates were handled.
+
+        Rows of candidates that are still neither seen nor fetched (a failed deep dive) are left out, so
+        they are analysed and retried next run instead of being skipped as unchanged.
+        """
+        if not self.change_detector:
+            return
+        unfinished = set()
+        for cand in candidates:
+            urls = self.ad_urls(source, cand)
+            if urls and urls[0] not in self.seen and urls[1] not in self.seen:
+                unfinished.add(ad_key(urls[0]))
+        for page_diff in page_diffs:
+            self.change_detector.record_analysis(page_diff, analysed=True, unfinished=unfinished)
+
+    def ad_urls(self, source: SearchPageSource, cand: CandidateItem) -> tuple[str, str] | None:
+        """The canonical and the as-linked URL of a candidate, or None if it doesn't link to an ad."""
+        fixed_url = self.content_fetcher.fix_relative_url(source.search_url, cand.url)
+        if not self.content_fetcher.is_valid_ad_link(fixed_url):
+            return None
+        return canonical_url(fixed_url), fixed_url
+
+    def is_known(self, full_url: str, fixed_url: str) -> bool:
+        """Whether the ad was seen in an earlier run or already taken on in this one."""
+        # History written before canonicalisation holds raw URLs, so check both forms.
+        return ad_key(full_url) in self._run_ad_keys or full_url in self.seen or fixed_url in self.seen
+
+    async def _deep_dive(
+        self, crawler: AsyncWebCrawler, source: SearchPageSource, cand: CandidateItem
+    ) -> dict[str, str] | None:
+        urls = self.ad_urls(source, cand)
+        if urls is None or self.is_known(*urls):
+            return None
+        self._run_ad_keys.add(ad_key(urls[0]))
+        return await self.fetch_ad(crawler, source, cand, urls[0])
+
+    async def fetch_ad(
+        self, crawler: AsyncWebCrawler, source: SearchPageSource, cand: CandidateItem, full_url: str
+    ) -> dict[str, str] | None:
+        """Fetches an ad page, marks it seen and distills it for verification. Returns None if the fetch failed."""
+        logger.info(f"      🕵️ Deep diving: {cand.title} ({cand.price})")
+
+        with tracer.span("deep_dive", url=full_url) as span:
+            ad_content = await self._fetch(crawler, full_url)
+            if not ad_content:
+                span.outcome = ERROR
+                return None
+
+        self.seen.add(full_url)
+        distilled = self.distiller.distill(ad_content, kind="ad").text
+        return {"site": source.site_name, "url": full_url, "content": distilled}
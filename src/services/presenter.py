@@ -1,80 +1,182 @@
+import html
 import json
 import logging
 import os
+from collections.abc import Iterator
 from datetime import datetime
 from typing import Any
 
 from src.models import ProductCheck
+from src.utils.urls import canonical_url
 
 logger = logging.getLogger(__name__)
 
+PAGE_STYLE = """
+        body { padding: 20px; }
+        .badge { background: #333; color: #fff; padding: 4px 8px; border-radius: 4px; font-size: 0.8em; }
+        .stats {
+            margin-bottom: 2rem;
+            padding: 1rem;
+            background: #f8f9fa;
+            border-radius: 8px;
+            border-left: 4px solid #333;
+        }
+        nav.pages a { margin-right: 0.5rem; }
+"""
+
 
 class ResultsPresenter:
-    def __init__(self, data_dir: str = "data"):
+    """Keeps confirmed hits in an append-only log and renders the Markdown and HTML views once per run.
+
+    Hits are appended to `data/results.jsonl`, deduplicated by canonical URL. The HTML view is sharded
+    into fixed-size pages in chronological order, each linking to its older and newer neighbour. A full
+    page only changes again when the page after it is created, so each render rewrites the index, the
+    last page and any new pages.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = "data",
+        md_path: str = "RESULTS.md",
+        public_dir: str = "public",
+        page_size: int = 100,
+    ):
         self.data_dir = data_dir
-        self.json_path = os.path.join(data_dir, "results.json")
-        self.md_path = "RESULTS.md"
-        self.html_path = "public/index.html"
+        self.log_path = os.path.join(data_dir, "results.jsonl")
+        self.legacy_json_path = os.path.join(data_dir, "results.json")
+        self.md_path = md_path
+        self.public_dir = public_dir
+        self.html_path = os.path.join(public_dir, "index.html")
+        self.pages_dir = os.path.join(public_dir, "pages")
+        self.manifest_path = os.path.join(self.pages_dir, "manifest.json")
+        self.page_size = page_size
+        # Per-task outcome of this run: (new hits, candidates checked).
+        self.scans: dict[str, tuple[int, int]] = {}
 
         os.makedirs(data_dir, exist_ok=True)
-        os.makedirs("public", exist_ok=True)
+        os.makedirs(self.pages_dir, exist_ok=True)
+        self._migrate_legacy_json()
+        self._keys = {canonical_url(entry.get("url", "")) for entry in self._iter_log()}
 
-    def save_results(self, new_hits: list[ProductCheck], task_name: str, total_scanned: int = 0) -> None:
-        # 1. Load existing JSON
-        history = self._load_json()
+    def __len__(self) -> int:
+        return len(self._keys)
 
-        # 2. Append new hits if any
+    def save_results(self, new_hits: list[ProductCheck], task_name: str, total_scanned: int = 0) -> None:
+        """Appends hits not seen before to the results log. Views are rendered by `render()`."""
         timestamp = datetime.now().isoformat()
-        if new_hits:
+        added = 0
+        with open(self.log_path, "a", encoding="utf-8") as f:
             for hit in new_hits:
+                key = canonical_url(hit.url)
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
                 entry = hit.model_dump()
                 entry["task"] = task_name
                 entry["timestamp"] = timestamp
-                history.append(entry)
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                added += 1
 
-        # 3. Save JSON
-        with open(self.json_path, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        prev_added, prev_total = self.scans.get(task_name, (0, 0))
+        self.scans[task_name] = (prev_added + added, prev_total + total_scanned)
+        if added:
+            logger.info(f"💾 Saved {added} new hits to the results log.")
+        else:
+            logger.info("ℹ️ No new hits found for this task.")
 
-        # 4. Generate Views
-        self._generate_markdown(history, last_task=task_name, last_count=len(new_hits), total=total_scanned)
-        self._generate_html(history, last_task=task_name, last_count=len(new_hits), total=total_scanned)
+    def render(self) -> None:
+        """Regenerates RESULTS.md, the HTML index and the HTML pages that changed since the last render."""
+        manifest = self._load_manifest()
+        total = len(self._keys)
+        rendered = manifest.get("rendered", 0)
+        first_dirty_page = rendered // self.page_size if rendered <= total else 0
+        if 0 < rendered < total and rendered % self.page_size == 0:
+            # The previous last page was full; its nav gains a link to the new page after it.
+            first_dirty_page -= 1
+        tail_start = min(first_dirty_page * self.page_size, max(total - self.page_size, 0))
 
-        if new_hits:
-            logger.info(f"💾 Saved {len(new_hits)} new hits to history and updated views.")
-        else:
-            logger.info("ℹ️ No new hits found, but views updated with latest scan timestamp.")
+        tail = list(self._iter_log(start=tail_start))
+        page_count = max((total + self.page_size - 1) // self.page_size, 1)
 
-    def _load_json(self) -> list[dict[str, Any]]:
-        if not os.path.exists(self.json_path):
-            return []
-        try:
-            with open(self.json_path, encoding="utf-8") as f:
-                from typing import cast
+        for page in range(first_dirty_page, page_count):
+            offset = page * self.page_size
+            entries = tail[offset - tail_start : offset - tail_start + self.page_size]
+            self._write_page(page, page_count, entries)
+
+        newest = list(reversed(tail[-self.page_size :]))
+        self._generate_markdown(newest, total)
+        self._generate_html(newest, total, page_count)
 
-                return cast(list[dict[str, Any]], json.load(f))
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"rendered": total, "page_size": self.page_size}, f)
+        logger.info(f"🖼️ Rendered results views ({total} hits, {page_count - first_dirty_page} pages updated)")
+
+    def _iter_log(self, start: int = 0) -> Iterator[dict[str, Any]]:
+        if not os.path.exists(self.log_path):
+            return
+        index = 0
+        with open(self.log_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"⚠️ Skipping corrupt line {line_no} in {self.log_path}")
+                    continue
+                if index >= start:
+                    yield entry
+                index += 1
+
+    def _migrate_legacy_json(self) -> None:
+        """Moves hits from the old results.json list into the log the first time the log is created."""
+        if os.path.exists(self.log_path) or not os.path.exists(self.legacy_json_path):
+            return
+        try:
+            with open(self.legacy_json_path, encoding="utf-8") as f:
+                history = json.load(f)
         except Exception as e:
-            logger.error(f"Failed to load history: {e}")
-            return []
+            logger.error(f"Failed to load legacy results: {e}")
+            return
+
+        seen: set[str] = set()
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            for entry in sorted(history, key=lambda x: x.get("timestamp", "")):
+                key = canonical_url(entry.get("url", ""))
+                if key not in seen:
+                    seen.add(key)
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        logger.info(f"📦 Migrated {len(seen)} results from {self.legacy_json_path}")
 
-    def _generate_markdown(
-        self, history: list[dict[str, Any]], last_task: str = "", last_count: int = 0, total: int = 0
-    ) -> None:
-        # Sort by timestamp desc
-        sorted_history = sorted(history, key=lambda x: x.get("timestamp", ""), reverse=True)
+    def _load_manifest(self) -> dict[str, int]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest: dict[str, int] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        # A changed page size invalidates every page.
+        return manifest if manifest.get("page_size") == self.page_size else {}
+
+    def _status_lines(self) -> list[str]:
+        return [
+            f"{task} completed with {new} new hits (from {total} candidates)."
+            for task, (new, total) in self.scans.items()
+        ]
 
+    def _generate_markdown(self, newest: list[dict[str, Any]], total: int) -> None:
         md_content = "# 🛒 Scraper Results\n\n"
         md_content += f"**Last Scan:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        if last_task:
-            md_content += f"- **Task:** {last_task}\n"
-            md_content += f"- **New Hits:** {last_count}\n"
-            md_content += f"- **Candidates Checked:** {total}\n\n"
+        for line in self._status_lines():
+            md_content += f"- {line}\n"
+        md_content += "\n"
 
         md_content += "## 🏆 Confirmed Hits\n\n"
+        if total > len(newest):
+            md_content += f"Showing the {len(newest)} newest of {total} hits; see `public/` for the full history.\n\n"
         md_content += "| Date | Task | Item | Price | Link | Reasoning |\n"
         md_content += "|---|---|---|---|---|---|\n"
 
-        for item in sorted_history:
+        for item in newest:
             date_str = item.get("timestamp", "")[:10]
             name = item.get("item_name", "N/A")
             price = item.get("price", "N/A")
@@ -87,53 +189,41 @@ class ResultsPresenter:
         with open(self.md_path, "w", encoding="utf-8") as f:
             f.write(md_content)
 
-    def _generate_html(
-        self, history: list[dict[str, Any]], last_task: str = "", last_count: int = 0, total: int = 0
-    ) -> None:
-        sorted_history = sorted(history, key=lambda x: x.get("timestamp", ""), reverse=True)
-
+    @staticmethod
+    def _rows(entries: list[dict[str, Any]]) -> str:
         rows = ""
-        for item in sorted_history:
+        for item in entries:
+            e = {
+                k: html.escape(str(item.get(k, "")))
+                for k in ("timestamp", "task", "item_name", "price", "reasoning", "url")
+            }
             rows += f"""
             <tr>
-                <td>{item.get("timestamp", "")[:16].replace("T", " ")}</td>
-                <td><span class="badge">{item.get("task", "Unknown")}</span></td>
-                <td>{item.get("item_name")}</td>
-                <td><strong>{item.get("price")}</strong></td>
-                <td>{item.get("reasoning")}</td>
-                <td><a href="{item.get("url")}" target="_blank" role="button">Open</a></td>
+                <td>{e["timestamp"][:16].replace("T", " ")}</td>
+                <td><span class="badge">{e["task"] or "Unknown"}</span></td>
+                <td>{e["item_name"]}</td>
+                <td><strong>{e["price"]}</strong></td>
+                <td>{e["reasoning"]}</td>
+                <td><a href="{e["url"]}" target="_blank" role="button">Open</a></td>
             </tr>
             """
+        return rows
 
-        html_content = f"""<!DOCTYPE html>
+    @staticmethod
+    def _document(title: str, header: str, rows: str, nav: str) -> str:
+        return f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Scraper Results</title>
+    <title>{title}</title>
     <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@picocss/pico@1/css/pico.min.css">
-    <style>
-        body {{ padding: 20px; }}
-        .badge {{ background: #333; color: #fff; padding: 4px 8px; border-radius: 4px; font-size: 0.8em; }}
-        .stats {{
-            margin-bottom: 2rem;
-            padding: 1rem;
-            background: #f8f9fa;
-            border-radius: 8px;
-            border-left: 4px solid #333;
-        }}
-    </style>
+    <style>{PAGE_STYLE}    </style>
 </head>
 <body>
     <main class="container">
-        <h1>🛒 Scraper Dashboard</h1>
+        {header}
 
-        <div class="stats">
-            <p><strong>Last Scan:</strong> {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-            <p><strong>Status:</strong> {last_task} completed with {last_count} new hits (from {total} candidates).</p>
-        </div>
-
-        <h2>🏆 Confirmed Hits</h2>
         <figure>
             <table role="grid">
                 <thead>
@@ -151,9 +241,49 @@ class ResultsPresenter:
                 </tbody>
             </table>
         </figure>
+        <nav class="pages">{nav}</nav>
     </main>
 </body>
 </html>
 """
+
+    @staticmethod
+    def _page_nav(page_count: int, prefix: str) -> str:
+        links = [f'<a href="{prefix}page-{n + 1:04d}.html">{n + 1}</a>' for n in reversed(range(page_count))]
+        return "Pages (newest first): " + " ".join(links)
+
+    @staticmethod
+    def _neighbour_nav(page: int, page_count: int) -> str:
+        links = []
+        if page + 1 < page_count:
+            links.append(f'<a href="page-{page + 2:04d}.html">← Newer</a>')
+        if page > 0:
+            links.append(f'<a href="page-{page:04d}.html">Older →</a>')
+        return " ".join(links)
+
+    def _write_page(self, page: int, page_count: int, entries: list[dict[str, Any]]) -> None:
+        header = f'<h1>🛒 Confirmed Hits — page {page + 1}</h1>\n        <p><a href="../index.html">← Dashboard</a></p>'
+        document = self._document(
+            f"Scraper Results — page {page + 1}",
+            header,
+            self._rows(list(reversed(entries))),
+            self._neighbour_nav(page, page_count),
+        )
+        with open(os.path.join(self.pages_dir, f"page-{page + 1:04d}.html"), "w", encoding="utf-8") as f:
+            f.write(document)
+
+    def _generate_html(self, newest: list[dict[str, Any]], total: int, page_count: int) -> None:
+        status = "".join(
+            f"\n            <p><strong>Status:</strong> {html.escape(line)}</p>" for line in self._status_lines()
+        )
+        header = f"""<h1>🛒 Scraper Dashboard</h1>
+
+        <div class="stats">
+            <p><strong>Last Scan:</strong> {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>{status}
+            <p><strong>Total hits:</strong> {total}</p>
+        </div>
+
+        <h2>🏆 Latest Confirmed Hits</h2>"""
+        document = self._document("Scraper Results", header, self._rows(newest), self._page_nav(page_count, "pages/"))
         with open(self.html_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
+            f.write(document)
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+
+from src.models import ReadinessPolicy
+from src.utils.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+MAX_SAMPLES_PER_DOMAIN = 200
+
+
+# Set on <html> by the wait condition once the page is ready; a rendered page without it hit the timeout.
+READY_ATTRIBUTE = "data-scraper-ready"
+
+
+def build_wait_condition(policy: ReadinessPolicy, selector: str | None = None) -> str:
+    """Builds a crawl4ai `wait_for` JS condition that resolves once the page content has settled.
+
+    The page is ready as soon as the domain's selector matches, or once the body text is long enough
+    and has not changed for `stable_ms`. crawl4ai polls the condition every 100 ms and gives up
+    (without failing the crawl) after `wait_for_timeout`. A ready page is marked with READY_ATTRIBUTE,
+    since crawl4ai does not report whether the wait timed out.
+    """
+    return f"""js:() => {{
+        const state = window.__scraperReadiness || (window.__scraperReadiness = {{len: -1, since: Date.now()}});
+        const ready = () => {{
+            document.documentElement.setAttribute({json.dumps(READY_ATTRIBUTE)}, "1");
+            return true;
+        }};
+        const selector = {json.dumps(selector or "")};
+        if (selector && document.querySelector(selector)) return ready();
+        const len = document.body ? document.body.innerText.length : 0;
+        const now = Date.now();
+        if (len !== state.len) {{
+            state.len = len;
+            state.since = now;
+            return false;
+        }}
+        return len >= {policy.min_text_length} && now - state.since >= {policy.stable_ms} && ready();
+    }}"""
+
+
+def wait_timed_out(html: str) -> bool:
+    """Whether a page rendered with the wait condition was returned before it became ready."""
+    return f'{READY_ATTRIBUTE}="1"' not in html
+
+
+class ReadinessTracker:
+    """Records how long each domain actually took to render, and whether the wait hit its timeout.
+
+    Samples are (seconds, timed_out) pairs, persisted across runs for tuning timeouts. Saving merges this
+    process's new samples into the file, so processes sharing it don't drop each other's.
+    """
+
+    def __init__(self, file_path: str = "data/readiness_stats.json"):
+        self.file_path = file_path
+        self.samples: dict[str, list[tuple[float, bool]]] = self._load()
+        self._unsaved: dict[str, list[tuple[float, bool]]] = {}
+
+    def _load(self) -> dict[str, list[tuple[float, bool]]]:
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {
+                domain: [(float(seconds), bool(timed_out)) for seconds, timed_out in samples]
+                for domain, samples in data.get("samples", {}).items()
+            }
+        except Exception as e:
+            logger.warning(f"Could not load readiness stats: {e}")
+            return {}
+
+    def record(self, domain: str, seconds: float, timed_out: bool = False) -> None:
+        sample = (round(seconds, 3), timed_out)
+        self._add(self.samples, domain, [sample])
+        self._unsaved.setdefault(domain, []).append(sample)
+
+    @staticmethod
+    def _add(
+        samples_by_domain: dict[str, list[tuple[float, bool]]], domain: str, new: list[tuple[float, bool]]
+    ) -> None:
+        samples = samples_by_domain.setdefault(domain, [])
+        samples.extend(new)
+        del samples[:-MAX_SAMPLES_PER_DOMAIN]
+
+    def percentiles(self, domain: str) -> tuple[float, float]:
+        """Returns (p50, p95) render time for a domain."""
+        seconds = [s for s, _ in self.samples.get(domain, [])]
+        return percentile(seconds, 0.5), percentile(seconds, 0.95)
+
+    def timeouts(self, domain: str) -> int:
+        """How many of the domain's recorded renders hit the readiness timeout."""
+        return sum(timed_out for _, timed_out in self.samples.get(domain, []))
+
+    def save(self) -> None:
+        samples_by_domain = self._load()
+        for domain, new in self._unsaved.items():
+            self._add(samples_by_domain, domain, new)
+        self.samples = samples_by_domain
+        self._unsaved = {}
+        summary = {}
+        for domain in self.samples:
+            p50, p95 = self.percentiles(domain)
+            summary[domain] = {
+                "count": len(self.samples[domain]),
+                "timeouts": self.timeouts(domain),
+                "p50": round(p50, 3),
+                "p95": round(p95, 3),
+            }
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"summary": summary, "samples": self.samples}, f, indent=2)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            logger.error(f"Error saving readiness stats: {e}")
+
+    def log_summary(self) -> None:
+        for domain in sorted(self.samples):
+            p50, p95 = self.percentiles(domain)
+            logger.info(
+                f"   ⏱️ {domain}: render p50 {p50:.1f}s / p95 {p95:.1f}s over {len(self.samples[domain])} pages, "
+                f"{self.timeouts(domain)} hit the readiness timeout"
+            )
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+import time
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# A source counts as due slightly early, so a daily job isn't skipped for being a few minutes short.
+DUE_SLACK = 0.1
+
+
+class SourceSchedule(BaseModel):
+    """Crawl history of one (task, site, query) source."""
+
+    interval_minutes: float
+    last_crawl: float = 0.0
+    # Smoothed new listings per hour.
+    arrival_rate: float = 0.0
+    crawls: int = 0
+    new_listings: int = 0
+
+
+class SourceScheduler:
+    """Learns how often each search source produces new listings and spaces its crawls accordingly.
+
+    After each crawl the arrival rate (new listings per hour since the previous crawl) is smoothed with
+    weight `smoothing`. The next interval is the time expected to yield `target_new` new listings,
+    clamped to [min_minutes, max_minutes]; a source with no arrivals at all doubles its interval.
+    New sources start at `min_minutes`.
+    """
+
+    def __init__(
+        self,
+        file_path: str = "data/source_schedule.json",
+        min_minutes: float = 30.0,
+        max_minutes: float = 7 * 24 * 60.0,
+        target_new: float = 1.0,
+        smoothing: float = 0.3,
+        enabled: bool = True,
+    ):
+        self.file_path = file_path
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.target_new = target_new
+        self.smoothing = smoothing
+        self.enabled = enabled
+        self.sources: dict[str, SourceSchedule] = self._load()
+        self.run_crawled = 0
+        self.run_skipped = 0
+
+    @staticmethod
+    def key(task_name: str, site: str, query: str) -> str:
+        return f"{task_name}|{site}|{query}"
+
+    def _load(self) -> dict[str, SourceSchedule]:
+        if not os.path.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {key: SourceSchedule.model_validate(entry) for key, entry in data.items()}
+        except Exception as e:
+            logger.warning(f"Could not load source schedule: {e}")
+            return {}
+
+    def due(self, key: str, now: float | None = None) -> bool:
+        source = self.sources.get(key)
+        if not self.enabled or source is None:
+            return True
+        elapsed = (now if now is not None else time.time()) - source.last_crawl
+        return elapsed >= source.interval_minutes * 60 * (1 - DUE_SLACK)
+
+    def next_crawl_in(self, key: str, now: float | None = None) -> float:
+        """Minutes until the source is due again (0 if it is due)."""
+        source = self.sources.get(key)
+        if source is None:
+            return 0.0
+        elapsed = (now if now is not None else time.time()) - source.last_crawl
+        return max(source.interval_minutes - elapsed / 60, 0.0)
+
+    def record(self, key: str, new_listings: int, now: float | None = None) -> None:
+        """Updates the source's arrival rate and interval after a successful crawl."""
+        now = now if now is not None else time.time()
+        source = self.sources.get(key)
+        if source is None:
+            source = self.sources[key] = SourceSchedule(interval_minutes=self.min_minutes)
+            # No previous crawl to measure against: treat the listings as a backlog, not as arrivals.
+            source.last_crawl = now
+            source.crawls = 1
+            self.run_crawled += 1
+            return
+
+        hours = max((now - source.last_crawl) / 3600, 1 / 60)
+        rate = new_listings / hours
+        if source.crawls == 1:
+            source.arrival_rate = rate
+        else:
+            source.arrival_rate = (1 - self.smoothing) * source.arrival_rate + self.smoothing * rate
+        if new_listings == 0 and source.arrival_rate < 1e-3:
+            interval = source.interval_minutes * 2
+        elif source.arrival_rate > 0:
+            interval = self.target_new / source.arrival_rate * 60
+        else:
+            interval = source.interval_minutes
+        source.interval_minutes = min(max(interval, self.min_minutes), self.max_minutes)
+        source.last_crawl = now
+        source.crawls += 1
+        source.new_listings += new_listings
+        self.run_crawled += 1
+
+    def skipped(self) -> None:
+        self.run_skipped += 1
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            with open(self.file_path, "w", encoding="utf-8") as f:
+                json.dump({k: s.model_dump() for k, s in sorted(self.sources.items())}, f, indent=2)
+        except Exception as e:
+            logger.error(f"Error saving source schedule: {e}")
+
+    def log_summary(self) -> None:
+        if not self.enabled:
+            return
+        logger.info(
+            f"   📅 Source schedule: {self.run_crawled} sources crawled, {self.run_skipped} not due "
+            f"({len(self.sources)} tracked)"
+        )
+        for key, s in sorted(self.sources.items(), key=lambda kv: kv[1].interval_minutes):
+            logger.debug(f"   📅 {key}: every {s.interval_minutes:.0f} min, {s.arrival_rate:.2f} new/h")
@@ -1,39 +1,91 @@
 import json
 import logging
 import os
+import sqlite3
 import subprocess
+import time
+from typing import Protocol
 
 logger = logging.getLogger(__name__)
 
 
+class SeenStore(Protocol):
+    """Anything that can answer 'have we seen this URL?' and remember new ones."""
+
+    def __contains__(self, url: object) -> bool: ...
+
+    def add(self, url: str) -> None: ...
+
+
 class HistoryManager:
-    def __init__(self, file_path: str):
+    """Seen-items store backed by SQLite.
+
+    Lookups hit the primary-key index and each new URL is written as it is seen, so neither cost
+    grows with the size of the history. A legacy JSON list is imported on first use.
+    """
+
+    def __init__(self, file_path: str, legacy_json_path: str | None = None):
         self.file_path = file_path
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(file_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_items (url TEXT PRIMARY KEY, first_seen REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.conn.commit()
+        if legacy_json_path and len(self) == 0:
+            self._migrate_from_json(legacy_json_path)
 
-    def load(self) -> list[str]:
-        """Loads the history of seen URLs."""
-        if os.path.exists(self.file_path):
-            try:
-                with open(self.file_path, encoding="utf-8") as f:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        return []
-                    return data
-            except json.JSONDecodeError:
-                logger.warning(f"[WARNING] History file {self.file_path} corrupted. Starting fresh.")
-                return []
-            except Exception as e:
-                logger.error(f"Error loading history: {e}")
-                return []
-        return []
-
-    def save(self, history: list[str]) -> None:
-        """Saves the history of seen URLs."""
+    def _migrate_from_json(self, json_path: str) -> None:
+        """Imports the old seen_items.json list. Original first-seen times are unknown, so 'now' is used."""
+        if not os.path.exists(json_path):
+            return
         try:
-            with open(self.file_path, "w", encoding="utf-8") as f:
-                json.dump(history, f, indent=2)
+            with open(json_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            logger.warning(f"[WARNING] History file {json_path} corrupted. Starting fresh.")
+            return
         except Exception as e:
-            logger.error(f"Error saving history: {e}")
+            logger.error(f"Error loading history: {e}")
+            return
+        if not isinstance(data, list):
+            return
+
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen_items (url, first_seen) VALUES (?, ?)",
+                ((url, now) for url in data if isinstance(url, str)),
+            )
+        logger.info(f"📦 Migrated {len(self)} seen items from {json_path} to {self.file_path}")
+
+    def __contains__(self, url: object) -> bool:
+        row = self.conn.execute("SELECT 1 FROM seen_items WHERE url = ?", (url,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM seen_items").fetchone()[0])
+
+    def add(self, url: str) -> None:
+        """Records a URL as seen, keeping the original first-seen time if it was seen before."""
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO seen_items (url, first_seen) VALUES (?, ?)", (url, time.time()))
+
+    def first_seen(self, url: str) -> float | None:
+        row = self.conn.execute("SELECT first_seen FROM seen_items WHERE url = ?", (url,)).fetchone()
+        return float(row[0]) if row else None
+
+    def expire(self, max_age_days: float) -> int:
+        """Forgets URLs first seen more than `max_age_days` ago. Returns how many were removed."""
+        cutoff = time.time() - max_age_days * 86400
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM seen_items WHERE first_seen < ?", (cutoff,))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self.conn.close()
 
 
 class GitManager:
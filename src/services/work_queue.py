@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    key: str
+    group: str
+    payload: dict[str, Any]
+    attempts: int
+    # Token of the claim that handed the job out; only its holder can complete or fail it.
+    lease: str = ""
+    updated: float = 0.0
+    result: dict[str, Any] | None = None
+
+
+class WorkQueue(Protocol):
+    """Durable job queue shared by a coordinator and its workers.
+
+    `key` makes jobs idempotent: enqueueing a key that is already queued, running or done is a no-op.
+    With `repeat`, a done key is queued again (recurring work such as a search page), but still never
+    twice at the same time.
+    Claimed jobs are leased to a worker; a job whose lease ran out (its worker died) can be claimed again.
+    `complete` and `fail` only touch jobs still held under the lease they were claimed with, and return
+    how many they updated. Calls block while another process holds the queue, so async callers run them
+    in a thread; implementations must be safe to call from several threads.
+    """
+
+    def enqueue(
+        self, kind: str, key: str, payload: dict[str, Any], group: str = "", priority: int = 0, repeat: bool = False
+    ) -> bool: ...
+
+    def claim(
+        self, worker: str, kinds: Sequence[str] | None = None, group: str | None = None, limit: int = 1
+    ) -> list[Job]: ...
+
+    def complete(self, jobs: Sequence[Job], result: dict[str, Any] | None = None) -> int: ...
+
+    def fail(self, jobs: Sequence[Job], error: str) -> int: ...
+
+    def take_results(self, kind: str) -> list[Job]: ...
+
+    def __contains__(self, key: object) -> bool: ...
+
+    def outstanding(self) -> int: ...
+
+    def counts(self) -> dict[str, int]: ...
+
+    def close(self) -> None: ...
+
+
+class SQLiteWorkQueue:
+    """WorkQueue in a SQLite file, shared by the worker processes of one machine.
+
+    Claims run in an immediate transaction, so two processes never take the same job. Failed jobs go
+    back to pending until they used up `max_attempts`; a permanently failed key can be enqueued again.
+    Done jobs keep their key (for idempotency) but drop their payload. The connection is shared by the
+    threads that call in, one statement or transaction at a time.
+    """
+
+    def __init__(self, file_path: str = "data/work_queue.db", lease_seconds: float = 600.0, max_attempts: int = 3):
+        self.file_path = file_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        # Autocommit, with explicit transactions where several statements must be atomic.
+        self.conn = sqlite3.connect(file_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                key TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                grp TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease TEXT,
+                lease_until REAL,
+                error TEXT,
+                result TEXT,
+                updated REAL NOT NULL
+            )"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, id)")
+
+    def enqueue(
+        self, kind: str, key: str, payload: dict[str, Any], group: str = "", priority: int = 0, repeat: bool = False
+    ) -> bool:
+        """Adds a job unless its key is already known. Returns whether a job was (re)queued."""
+        with self._lock:
+            cursor = self.conn.execute(
+                """INSERT INTO jobs (key, kind, grp, priority, payload, status, updated)
+                   VALUES (?, ?, ?, ?, ?, 'pending', ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       payload = excluded.payload, status = 'pending', attempts = 0, error = NULL,
+                       updated = excluded.updated
+                   WHERE jobs.status = 'failed' OR (? AND jobs.status = 'done')""",
+                (key, kind, group, priority, json.dumps(payload, ensure_ascii=False), time.time(), repeat),
+            )
+        return cursor.rowcount > 0
+
+    def claim(
+        self, worker: str, kinds: Sequence[str] | None = None, group: str | None = None, limit: int = 1
+    ) -> list[Job]:
+        """Leases up to `limit` ready jobs to `worker`, lowest priority value first, then oldest first.
+
+        A job whose lease ran out after its last attempt is marked failed rather than handed out again, so a
+        job that crashes or hangs its worker cannot take down one worker after another.
+        """
+        now = time.time()
+        query = (
+            "SELECT id, kind, key, grp, payload, attempts FROM jobs "
+            "WHERE (status = 'pending' OR (status = 'running' AND lease_until < ?))"
+        )
+        params: list[Any] = [now]
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        if group is not None:
+            query += " AND grp = ?"
+            params.append(group)
+        query += " ORDER BY priority, id LIMIT ?"
+        params.append(limit)
+
+        lease = uuid.uuid4().hex
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'lease expired on the last attempt', lease = NULL, "
+                    "lease_until = NULL, updated = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                rows = self.conn.execute(query, params).fetchall()
+                self.conn.executemany(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease = ?, lease_until = ?, "
+                    "attempts = attempts + 1, updated = ? WHERE id = ?",
+                    [(worker, lease, now + self.lease_seconds, now, row[0]) for row in rows],
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [
+            Job(
+                id=row[0],
+                kind=row[1],
+                key=row[2],
+                group=row[3],
+                payload=json.loads(row[4]),
+                attempts=row[5] + 1,
+                lease=lease,
+            )
+            for row in rows
+        ]
+
+    def complete(self, jobs: Sequence[Job], result: dict[str, Any] | None = None) -> int:
+        """Marks the jobs done. Jobs whose lease ran out and went to another worker are left alone."""
+        encoded = json.dumps(result) if result is not None else None
+        return self._release(
+            "UPDATE jobs SET status = 'done', payload = '{}', result = ?, lease = NULL, lease_until = NULL, "
+            "updated = ? WHERE id = ? AND status = 'running' AND lease = ?",
+            [(encoded, time.time(), job.id, job.lease) for job in jobs],
+        )
+
+    def fail(self, jobs: Sequence[Job], error: str) -> int:
+        """Puts the jobs back for another attempt, or marks them failed once they ran out of attempts."""
+        return self._release(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease = NULL, lease_until = NULL, updated = ? "
+            "WHERE id = ? AND status = 'running' AND lease = ?",
+            [(self.max_attempts, error, time.time(), job.id, job.lease) for job in jobs],
+        )
+
+    def _release(self, statement: str, rows: list[tuple[Any, ...]]) -> int:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                updated = sum(self.conn.execute(statement, row).rowcount for row in rows)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return updated
+
+    def take_results(self, kind: str) -> list[Job]:
+        """Returns the done jobs of `kind` that carry a result and clears those results."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, kind, key, grp, attempts, updated, result FROM jobs "
+                    "WHERE kind = ? AND status = 'done' AND result IS NOT NULL ORDER BY updated",
+                    (kind,),
+                ).fetchall()
+                self.conn.executemany("UPDATE jobs SET result = NULL WHERE id = ?", [(row[0],) for row in rows])
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [
+            Job(
+                id=row[0],
+                kind=row[1],
+                key=row[2],
+                group=row[3],
+                payload={},
+                attempts=row[4],
+                updated=row[5],
+                result=json.loads(row[6]),
+            )
+            for row in rows
+        ]
+
+    def __contains__(self, key: object) -> bool:
+        """Whether the queue ever held a job with this key, in any state."""
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM jobs WHERE key = ?", (key,)).fetchone() is not None
+
+    def outstanding(self) -> int:
+        """Jobs that are pending or running, i.e. work that may still produce more jobs."""
+        with self._lock:
+            row = self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()
+        return int(row[0])
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+QUEUE_BACKENDS: dict[str, Callable[..., WorkQueue]] = {"sqlite": SQLiteWorkQueue}
+
+
+def open_queue(backend: str, location: str, lease_seconds: float = 600.0, max_attempts: int = 3) -> WorkQueue:
+    """Opens the named backend at `location` (a file path for SQLite)."""
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown queue backend {backend!r}, expected one of {sorted(QUEUE_BACKENDS)}")
+    return QUEUE_BACKENDS[backend](location, lease_seconds=lease_seconds, max_attempts=max_attempts)
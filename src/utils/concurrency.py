@@ -0,0 +1,28 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from src.utils.urls import domain_of
+
+
+class DomainLimiter:
+    """Bounds in-flight work both globally and per domain."""
+
+    def __init__(self, max_concurrency: int, max_per_domain: int):
+        if max_concurrency < 1 or max_per_domain < 1:
+            raise ValueError("Concurrency limits must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_per_domain = max_per_domain
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._domains: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[None]:
+        """Holds one global slot and one slot for the URL's domain while the block runs."""
+        domain = domain_of(url)
+        if domain not in self._domains:
+            self._domains[domain] = asyncio.Semaphore(self.max_per_domain)
+
+        # Acquire the domain slot first so a busy domain never parks a global slot.
+        async with self._domains[domain], self._global:
+            yield
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.models import RateLimitPolicy
+from src.utils.urls import domain_of
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket with an optional minimum spacing between grants.
+
+    `reserve` books the next slot immediately and returns how long the caller has to wait for it,
+    so concurrent callers are queued in arrival order without holding a lock across the sleep.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        min_interval: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_interval = min_interval
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._next_slot = 0.0
+
+    def _refill(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def _ready_at(self, now: float, cost: float) -> float:
+        ready_at = max(now, self._next_slot)
+        if self._tokens < cost:
+            ready_at = max(ready_at, now + (cost - self._tokens) / self.rate)
+        return ready_at
+
+    def delay_for(self, cost: float = 1.0) -> float:
+        """Returns how long a reservation of `cost` would wait, without consuming anything."""
+        now = self._refill()
+        return self._ready_at(now, cost) - now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Consumes `cost` tokens and returns the delay in seconds before the caller may proceed."""
+        now = self._refill()
+        ready_at = self._ready_at(now, cost)
+        self._tokens -= cost
+        self._next_slot = ready_at + self.min_interval
+        return ready_at - now
+
+
+@dataclass
+class DomainWaitStats:
+    requests: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class DomainRateLimiter:
+    """Paces requests per domain; different domains never wait on each other."""
+
+    def __init__(self, default: RateLimitPolicy | None = None, overrides: dict[str, RateLimitPolicy] | None = None):
+        self.default = default or RateLimitPolicy()
+        self.overrides = overrides or {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self.stats: dict[str, DomainWaitStats] = {}
+
+    def policy_for(self, domain: str) -> RateLimitPolicy:
+        return self.overrides.get(domain, self.default)
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        if domain not in self._buckets:
+            policy = self.policy_for(domain)
+            self._buckets[domain] = TokenBucket(policy.requests_per_second, policy.burst, policy.min_interval)
+        return self._buckets[domain]
+
+    async def acquire(self, url: str) -> float:
+        """Waits until a request to the URL's domain is allowed. Returns the time spent queued."""
+        domain = domain_of(url)
+        wait = self._bucket(domain).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        stats = self.stats.setdefault(domain, DomainWaitStats())
+        stats.requests += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        return wait
+
+    def log_summary(self) -> None:
+        for domain, stats in sorted(self.stats.items()):
+            logger.info(
+                f"   ⏳ {domain}: {stats.requests} requests, "
+                f"queue wait avg {stats.avg_wait:.2f}s / max {stats.max_wait:.2f}s / total {stats.total_wait:.1f}s"
+            )
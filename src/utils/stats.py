@@ -0,0 +1,12 @@
+from collections.abc import Sequence
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    """The `p` quantile (0-1) of the samples, interpolating between the closest ranks; 0.0 when empty."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = p * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
@@ -0,0 +1,29 @@
+import math
+
+# Gemini averages roughly four characters per token for the mixed-language text we send.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting and reporting; not a tokenizer."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def chunk_by_tokens(texts: list[str], budget: int, max_items: int | None = None) -> list[list[int]]:
+    """Groups consecutive texts into chunks of at most `budget` estimated tokens; returns their indices.
+
+    A text larger than the budget gets a chunk of its own rather than being dropped.
+    """
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for i, text in enumerate(texts):
+        cost = estimate_tokens(text)
+        if current and (used + cost > budget or (max_items and len(current) >= max_items)):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
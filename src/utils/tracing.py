@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from itertools import count
+from typing import Any
+
+from src.utils.stats import percentile
+from src.utils.urls import domain_of
+from src.utils.usage_tracker import current_task
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+# The one outcome that marks a failed span; the summary counts these as errors.
+ERROR = "error"
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: int
+    parent_id: int | None
+    task: str
+    start: float
+    duration: float = 0.0
+    outcome: str = "ok"
+    domain: str | None = None
+    url: str | None = None
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+class Tracer:
+    """Collects timed spans for pipeline stages, fetches and LLM calls.
+
+    Spans nest through a contextvar, so concurrent tasks keep separate parents. Each span records the
+    current task, the URL's domain, its duration and an outcome: 'ok', ERROR on an exception or a failed
+    stage, or another label for how a successful stage was served (cache, browser, ...). Spans are kept
+    in memory and exported once at the end of the run.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.spans: list[Span] = []
+        self._ids = count(1)
+        # Offset from the monotonic clock to wall-clock time, so exported timestamps are absolute.
+        self._epoch = time.time() - time.monotonic()
+
+    @contextmanager
+    def span(self, name: str, url: str | None = None, **attrs: Any) -> Iterator[Span]:
+        """Times the enclosed block. Set `.outcome` or add to `.attrs` on the yielded span to annotate it."""
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            span_id=next(self._ids),
+            parent_id=parent.span_id if parent else None,
+            task=current_task.get(),
+            start=time.monotonic(),
+            domain=domain_of(url) if url else (parent.domain if parent else None),
+            url=url,
+            attrs=attrs,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException:
+            span.outcome = ERROR
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.monotonic() - span.start
+            if self.enabled:
+                self.spans.append(span)
+
+    def export_jsonl(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in self.spans:
+                row = asdict(span)
+                row["start"] = round(self._epoch + span.start, 6)
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+    def export_chrome(self, path: str) -> None:
+        """Writes a Chrome trace (chrome://tracing, Perfetto) with one lane per task."""
+        lanes: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in self.spans:
+            tid = lanes.setdefault(span.task, len(lanes) + 1)
+            args = {"outcome": span.outcome, "domain": span.domain, "url": span.url, **span.attrs}
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.name.split(".")[0],
+                    "ph": "X",
+                    "ts": round((self._epoch + span.start) * 1e6),
+                    "dur": round(span.duration * 1e6),
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {k: v for k, v in args.items() if v is not None},
+                }
+            )
+        for task, tid in lanes.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": task}})
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def summary(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Count, error count, p50, p95 and total seconds per stage and per (stage, domain)."""
+        groups: dict[str, dict[str, list[Span]]] = {"stage": {}, "domain": {}}
+        for span in self.spans:
+            groups["stage"].setdefault(span.name, []).append(span)
+            if span.domain:
+                groups["domain"].setdefault(f"{span.name} @ {span.domain}", []).append(span)
+
+        result: dict[str, dict[str, dict[str, float]]] = {}
+        for kind, by_key in groups.items():
+            result[kind] = {}
+            for key, spans in sorted(by_key.items()):
+                durations = [s.duration for s in spans]
+                result[kind][key] = {
+                    "count": len(spans),
+                    "errors": sum(1 for s in spans if s.outcome == ERROR),
+                    "p50": percentile(durations, 0.5),
+                    "p95": percentile(durations, 0.95),
+                    "total": sum(durations),
+                }
+        return result
+
+    def log_summary(self) -> None:
+        if not self.spans:
+            return
+        summary = self.summary()
+        for kind, title in (("stage", "Stage"), ("domain", "Stage @ domain")):
+            logger.info(f"   🧭 {title:<40} {'count':>6} {'errors':>6} {'p50':>8} {'p95':>8} {'total':>9}")
+            for key, row in summary[kind].items():
+                logger.info(
+                    f"   🧭 {key:<40} {row['count']:>6.0f} {row['errors']:>6.0f} "
+                    f"{row['p50']:>7.2f}s {row['p95']:>7.2f}s {row['total']:>8.1f}s"
+                )
+
+
+# Process-wide tracer used by the pipeline, fetcher and analyzer.
+tracer = Tracer()
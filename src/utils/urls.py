@@ -0,0 +1,126 @@
+import re
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from src.models import PaginationRule
+
+# Query parameters that only carry tracking/session state and never change which ad is shown.
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "ref",
+    "referrer",
+    "searchid",
+    "search_id",
+    "_trksid",
+    "_trkparms",
+    "_from",
+    "hash",
+    "amdata",
+    "campid",
+    "customid",
+    "toolid",
+    "mkevt",
+    "mkcid",
+    "mkrid",
+}
+
+
+@dataclass(frozen=True)
+class MarketplaceRule:
+    """How to canonicalise ad URLs of one marketplace."""
+
+    host: str
+    id_pattern: str | None = None
+    # Rebuilds the path from the id_pattern match, e.g. "/itm/{0}". None keeps the original path.
+    path_template: str | None = None
+    # Query parameters that identify the ad. None keeps every non-tracking parameter.
+    # Only applied to ad URLs (where id_pattern matches), never to search pages.
+    keep_params: frozenset[str] | None = None
+
+
+MARKETPLACE_RULES: dict[str, MarketplaceRule] = {
+    "blocket.se": MarketplaceRule("www.blocket.se", r"/(?:item|annons/[^?#]*?)/(\d{5,})", keep_params=frozenset()),
+    "tradera.com": MarketplaceRule(
+        "www.tradera.com", r"/item/(\d+)/(\d+)", path_template="/item/{0}/{1}/", keep_params=frozenset()
+    ),
+    "kleinanzeigen.de": MarketplaceRule(
+        "www.kleinanzeigen.de", r"/s-anzeige/(?:[^/]+/)?(\d+)-", keep_params=frozenset()
+    ),
+    "ebay.de": MarketplaceRule(
+        "www.ebay.de", r"/itm/(?:[^/]+/)?(\d+)", path_template="/itm/{0}", keep_params=frozenset()
+    ),
+    "dba.dk": MarketplaceRule("www.dba.dk", r"id-(\d+)", keep_params=frozenset()),
+    "finn.no": MarketplaceRule("www.finn.no", r"(?:finnkode=|/item/)(\d+)", keep_params=frozenset({"finnkode"})),
+    "hifitorget.se": MarketplaceRule("hifitorget.se", r"[?&]id=(\d+)"),
+    "hifishark.com": MarketplaceRule("www.hifishark.com"),
+}
+
+
+def domain_of(url: str) -> str:
+    """Returns the registrable host of a URL, lowercased and without a leading 'www.'."""
+    host = urlparse(url).hostname or ""
+    return host.removeprefix("www.")
+
+
+def canonical_url(url: str) -> str:
+    """Normalises an absolute URL so every variant of the same ad maps to one string.
+
+    Forces https, the marketplace's preferred host, drops fragments and tracking parameters, sorts the
+    remaining query and, for marketplaces with a stable ad-ID path, strips slugs from the path. URLs with
+    an explicit port (local stand-ins) keep their scheme and port.
+    """
+    parsed = urlparse(url.strip())
+    if not parsed.netloc:
+        return url
+
+    domain = domain_of(url)
+    rule = MARKETPLACE_RULES.get(domain)
+    host = rule.host if rule else (parsed.hostname or "")
+    scheme = "https"
+    if parsed.port is not None:
+        scheme, host = parsed.scheme, f"{host}:{parsed.port}"
+
+    params = [
+        (k, v)
+        for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    ]
+
+    path = parsed.path or "/"
+    match = re.search(rule.id_pattern, url) if rule and rule.id_pattern else None
+    if rule and match:
+        if rule.path_template:
+            path = rule.path_template.format(*match.groups())
+        if rule.keep_params is not None:
+            params = [(k, v) for k, v in params if k in rule.keep_params]
+
+    return urlunparse((scheme, host, path, "", urlencode(sorted(params)), ""))
+
+
+def results_page_url(url: str, rule: PaginationRule, index: int) -> str:
+    """The `index`-th (0-based) results page of a search URL, sorted newest first according to `rule`."""
+    parsed = urlparse(url)
+    overrides = dict(rule.sort_params)
+    if index > 0:
+        overrides[rule.page_param] = str(rule.first_page + index)
+    params = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k not in overrides]
+    return urlunparse(parsed._replace(query=urlencode(params + list(overrides.items()))))
+
+
+def ad_id(url: str) -> str | None:
+    """Extracts the marketplace's ad ID from a URL, if the marketplace has a known ID format."""
+    rule = MARKETPLACE_RULES.get(domain_of(url))
+    if not rule or not rule.id_pattern:
+        return None
+    match = re.search(rule.id_pattern, url)
+    return match.group(match.lastindex or 0) if match else None
+
+
+def ad_key(url: str) -> str:
+    """A dedup key that is identical for every URL of the same ad: 'domain:id' or the canonical URL."""
+    identifier = ad_id(url)
+    return f"{domain_of(url)}:{identifier}" if identifier else canonical_url(url)
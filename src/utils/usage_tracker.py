@@ -1,42 +1,143 @@
+import atexit
 import json
+import logging
 import os
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
 USAGE_FILE = "data/usage_metrics.json"
+USAGE_DETAIL_FILE = "data/usage_detail.jsonl"
+
+# Name of the scrape task the current coroutine works for; set by the pipeline, read when usage is recorded.
+current_task: ContextVar[str] = ContextVar("current_task", default="-")
+
+
+@dataclass
+class UsageBucket:
+    calls: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.calls if self.calls else 0.0
 
 
 class UsageTracker:
+    """Buffers LLM usage in memory, keyed by day, model, call site, task and outcome.
+
+    Buffered usage is appended to `detail_file` (one JSON line per bucket) every `flush_interval` seconds
+    and at exit. If `rollup_file` is set, it also keeps the per-day, per-model totals there.
+    """
+
+    def __init__(
+        self,
+        detail_file: str = USAGE_DETAIL_FILE,
+        rollup_file: str | None = USAGE_FILE,
+        flush_interval: float = 60.0,
+    ):
+        self.detail_file = detail_file
+        self.rollup_file = rollup_file
+        self.flush_interval = flush_interval
+        self._buffer: dict[tuple[str, str, str, str, str], UsageBucket] = {}
+        self._totals: dict[tuple[str, str], UsageBucket] = {}
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(
+        self,
+        model: str,
+        call_site: str,
+        outcome: str,
+        latency: float,
+        tokens_in: int = 0,
+        tokens_out: int = 0,
+    ) -> None:
+        """Records one model call. `outcome` is 'ok', 'invalid', 'throttled', 'not_found' or 'error'."""
+        day = datetime.now().strftime("%Y-%m-%d")
+        for bucket in (
+            self._buffer.setdefault((day, model, call_site, current_task.get(), outcome), UsageBucket()),
+            self._totals.setdefault((call_site, outcome), UsageBucket()),
+        ):
+            bucket.calls += 1
+            bucket.tokens_in += tokens_in
+            bucket.tokens_out += tokens_out
+            bucket.latency_total += latency
+            bucket.latency_max = max(bucket.latency_max, latency)
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
     @staticmethod
-    def log_use(model: str, tokens_in: int = 0, tokens_out: int = 0, calls: int = 1) -> None:
-        """
-        Logs LLM usage in a model-agnostic way.
-        """
-        os.makedirs("data", exist_ok=True)
-        today = datetime.now().strftime("%Y-%m-%d")
+    def tokens_from(response: Any) -> tuple[int, int]:
+        """Reads (input, output) token counts from a Gemini response's usage metadata."""
+        usage = getattr(response, "usage_metadata", None)
+        tokens_in = getattr(usage, "prompt_token_count", None) or 0
+        tokens_out = getattr(usage, "candidates_token_count", None) or 0
+        if not tokens_out:
+            total = getattr(usage, "total_token_count", None) or 0
+            tokens_out = max(total - tokens_in, 0)
+        return tokens_in, tokens_out
+
+    def flush(self) -> None:
+        """Writes buffered usage out and clears the buffer. Cheap no-op when nothing was recorded."""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        buffer, self._buffer = self._buffer, {}
+
+        try:
+            os.makedirs(os.path.dirname(self.detail_file) or ".", exist_ok=True)
+            flushed_at = datetime.now().isoformat(timespec="seconds")
+            with open(self.detail_file, "a") as f:
+                for (day, model, call_site, task, outcome), bucket in buffer.items():
+                    row = {"day": day, "model": model, "call_site": call_site, "task": task, "outcome": outcome}
+                    row.update(asdict(bucket), flushed_at=flushed_at)
+                    f.write(json.dumps(row) + "\n")
+            if self.rollup_file:
+                self._update_rollup(self.rollup_file, buffer)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write usage metrics: {e}")
 
+    @staticmethod
+    def _update_rollup(path: str, buffer: dict[tuple[str, str, str, str, str], UsageBucket]) -> None:
         data: dict[str, list[dict[str, Any]]] = {}
-        if os.path.exists(USAGE_FILE):
+        if os.path.exists(path):
             try:
-                with open(USAGE_FILE) as f:
+                with open(path) as f:
                     data = json.load(f)
-            except Exception:
+            except (OSError, json.JSONDecodeError):
                 data = {}
 
-        if today not in data:
-            data[today] = []
-
-        found = False
-        for entry in data[today]:
-            if entry["model"] == model:
-                entry["calls"] += calls
-                entry["tokens_in"] += tokens_in
-                entry["tokens_out"] += tokens_out
-                found = True
-                break
+        for (day, model, _, _, outcome), bucket in buffer.items():
+            entries = data.setdefault(day, [])
+            entry = next((e for e in entries if e["model"] == model), None)
+            if entry is None:
+                entry = {"model": model, "calls": 0, "tokens_in": 0, "tokens_out": 0}
+                entries.append(entry)
+            entry["calls"] += bucket.calls
+            entry["tokens_in"] += bucket.tokens_in
+            entry["tokens_out"] += bucket.tokens_out
+            if outcome != "ok":
+                entry["failures"] = entry.get("failures", 0) + bucket.calls
 
-        if not found:
-            data[today].append({"model": model, "calls": calls, "tokens_in": tokens_in, "tokens_out": tokens_out})
-
-        with open(USAGE_FILE, "w") as f:
+        with open(path, "w") as f:
             json.dump(data, f, indent=2)
+
+    def log_summary(self, hits: int = 0) -> None:
+        tokens = 0
+        for (call_site, outcome), b in sorted(self._totals.items()):
+            tokens += b.tokens_in + b.tokens_out
+            logger.info(
+                f"   📊 {call_site} [{outcome}]: {b.calls} calls, {b.tokens_in} in / {b.tokens_out} out tokens, "
+                f"latency avg {b.latency_avg:.1f}s / max {b.latency_max:.1f}s"
+            )
+        if hits:
+            logger.info(f"   📊 {tokens} tokens for {hits} confirmed hits ({tokens // hits} tokens per hit)")
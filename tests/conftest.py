@@ -0,0 +1,98 @@
+"""Fakes shared by the pipeline and work-queue tests."""
+
+import asyncio
+from typing import Any, cast
+
+from src.models import CandidateItem, FetchedPage, ProductCheck, ScrapeTask, SearchPageSource
+from src.services.crawler import ContentFetcher
+from src.services.pipeline import ScrapePipeline
+from src.utils.urls import domain_of
+
+
+class FakeAnalyzer:
+    """Lists the same ads on every search page (as with fuzzy variations) and confirms every ad it verifies."""
+
+    def __init__(self, listed: list[str] | None = None) -> None:
+        self.listed = listed or ["/item/1", "/item/2"]
+        self.batches: list[int] = []
+
+    async def generate_query_variations(self, query: str) -> list[str]:
+        return [query, f"{query} alt"]
+
+    async def get_search_urls(self, item_name: str, target_sites: list[str]) -> list[SearchPageSource]:
+        q = item_name.replace(" ", "+")
+        return [SearchPageSource(site_name=s, search_url=f"https://www.{s}/search?q={q}") for s in target_sites]
+
+    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem]:
+        return [
+            CandidateItem(
+                url=url, title=f"Ad {url.rsplit('/', 1)[1]}", price="100 kr", reasoning="", confidence_score=90
+            )
+            for url in self.listed
+        ]
+
+    async def analyze_batch(self, item_name: str, ads: list[dict[str, str]]) -> list[ProductCheck]:
+        self.batches.append(len(ads))
+        return [
+            ProductCheck(url=ad["url"], found_item=True, item_name=item_name, price="100 kr", reasoning="ok")
+            for ad in ads
+        ]
+
+
+class FakeFetcher(ContentFetcher):
+    """Serves every page instantly, recording fetches and the peak number in flight per domain."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.in_flight: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.fetched: list[str] = []
+
+    async def fetch_page(self, crawler: Any, url: str) -> FetchedPage | None:
+        domain = domain_of(url)
+        self.in_flight[domain] = self.in_flight.get(domain, 0) + 1
+        self.peak[domain] = max(self.peak.get(domain, 0), self.in_flight[domain])
+        await asyncio.sleep(0.01)
+        self.in_flight[domain] -= 1
+        self.fetched.append(url)
+        return FetchedPage(url=url, content=f"content of {url}")
+
+
+class FakeNotifier:
+    def __init__(self) -> None:
+        self.matches: list[str] = []
+
+    async def notify_start(self, item_name: str) -> None:
+        pass
+
+    async def notify_match(self, item_name: str, price: str, url: str) -> None:
+        self.matches.append(url)
+
+
+class FakePresenter:
+    def __init__(self) -> None:
+        self.saved: dict[str, list[str]] = {}
+
+    def save_results(self, new_hits: list[ProductCheck], task_name: str, total_scanned: int = 0) -> None:
+        self.saved[task_name] = [hit.url for hit in new_hits]
+
+
+def make_pipeline(
+    analyzer: FakeAnalyzer,
+    fetcher: ContentFetcher | None = None,
+    notifier: FakeNotifier | None = None,
+    presenter: FakePresenter | None = None,
+    seen: set[str] | None = None,
+    target_sites: list[str] | None = None,
+    **kwargs: Any,
+) -> ScrapePipeline:
+    """A pipeline wired to the fakes; the remaining keyword arguments go to ScrapePipeline."""
+    return ScrapePipeline(
+        analyzer=cast(Any, analyzer),
+        content_fetcher=fetcher or FakeFetcher(),
+        notification_service=cast(Any, notifier or FakeNotifier()),
+        presenter=cast(Any, presenter or FakePresenter()),
+        seen=seen if seen is not None else set(),
+        target_sites=target_sites or ["blocket.se", "tradera.com"],
+        **kwargs,
+    )
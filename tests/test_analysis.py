@@ -0,0 +1,139 @@
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, cast
+
+import pytest
+
+from src.models import BatchProductCheck, ProductCheck, QueryVariations
+from src.services.analysis import GeminiAnalyzer
+from src.utils.tokens import chunk_by_tokens
+from src.utils.usage_tracker import UsageTracker
+
+
+class ScriptedAnalyzer(GeminiAnalyzer):
+    """Answers batch prompts from a script instead of Gemini; records each prompt."""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__("test-key", **kwargs)
+        self.prompts: list[str] = []
+        self.fail_first_with: str | None = None
+        self.drop: set[str] = set()
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_content_safe(
+        self, prompt: str, schema: Any, call_type: str = "default", bypass_cache: bool = False
+    ) -> Any:
+        async with self._call_slots:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+        self.prompts.append(prompt)
+        if self.fail_first_with and self.fail_first_with in prompt:
+            self.fail_first_with = None
+            return None
+        urls = [line[5:] for line in prompt.splitlines() if line.startswith("URL: ")]
+        results = [
+            ProductCheck(url=u, found_item=True, item_name="x", price="1 kr", reasoning="")
+            for u in urls
+            if u not in self.drop
+        ]
+        results.append(ProductCheck(url="https//invented/1", found_item=True, item_name="x", price="", reasoning=""))
+        return BatchProductCheck(results=results)
+
+
+def _ads(n: int) -> list[dict[str, str]]:
+    return [
+        {"site": "blocket.se", "url": f"https://www.blocket.se/item/{i}?a=b", "content": "x" * 4000} for i in range(n)
+    ]
+
+
+def test_chunk_by_tokens_respects_budget_and_item_cap() -> None:
+    assert chunk_by_tokens(["a" * 400] * 5, budget=250) == [[0, 1], [2, 3], [4]]
+    assert chunk_by_tokens(["a"] * 5, budget=1000, max_items=2) == [[0, 1], [2, 3], [4]]
+    assert chunk_by_tokens(["a" * 4000], budget=10) == [[0]]
+
+
+@pytest.mark.asyncio
+async def test_batch_is_chunked_merged_by_original_url_and_ignores_hallucinations() -> None:
+    analyzer = ScriptedAnalyzer(batch_token_budget=2500, max_concurrent_calls=2)
+    ads = _ads(5)
+
+    results = await analyzer.analyze_batch("xtz", ads)
+
+    assert len(analyzer.prompts) == 3
+    assert analyzer.peak == 2
+    assert results is not None
+    assert [r.url for r in results] == [ad["url"] for ad in ads]
+
+
+@pytest.mark.asyncio
+async def test_failed_chunks_and_dropped_ads_are_retried() -> None:
+    analyzer = ScriptedAnalyzer(batch_token_budget=2500)
+    ads = _ads(4)
+    analyzer.fail_first_with = "item/0"
+    analyzer.drop = {"https//www.blocket.se/item/3?ab"}
+
+    results = await analyzer.analyze_batch("xtz", ads)
+
+    # Two chunks, then the failed pair and the dropped ad re-chunked under the same budget.
+    assert len(analyzer.prompts) == 4
+    assert results is not None
+    assert [r.url for r in results] == [ad["url"] for ad in ads[:3]]
+
+
+class FakeModels:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def generate_content(self, model: str, contents: str, config: Any) -> Any:
+        self.calls.append(model)
+        if model == "gemini-2.0-flash":
+            raise Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '40s'}")
+        return SimpleNamespace(parsed=QueryVariations(variations=["a"]), usage_metadata=None)
+
+
+@pytest.mark.asyncio
+async def test_throttled_model_is_skipped_without_fixed_sleeps(tmp_path: Path) -> None:
+    usage = UsageTracker(str(tmp_path / "usage.jsonl"), rollup_file=None)
+    analyzer = GeminiAnalyzer("test-key", usage=usage)
+    models = FakeModels()
+    analyzer.client = cast(Any, SimpleNamespace(aio=SimpleNamespace(models=models)))
+
+    started = time.monotonic()
+    first = await analyzer.generate_content_safe("p1", QueryVariations)
+    second = await analyzer.generate_content_safe("p2", QueryVariations)
+
+    assert first and second
+    # The 429 pauses gemini-2.0-flash, so the second call goes straight to the next model.
+    assert models.calls == ["gemini-2.0-flash", "gemini-1.5-flash", "gemini-1.5-flash"]
+    assert time.monotonic() - started < 1.0
+    assert [outcome for _, outcome in usage._totals] == ["throttled", "ok"]
+
+
+class HangingModels:
+    async def generate_content(self, model: str, contents: str, config: Any) -> Any:
+        await asyncio.sleep(60)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_does_not_leave_the_model_half_open(tmp_path: Path) -> None:
+    analyzer = GeminiAnalyzer("test-key", usage=UsageTracker(str(tmp_path / "usage.jsonl"), rollup_file=None))
+    analyzer.client = cast(Any, SimpleNamespace(aio=SimpleNamespace(models=HangingModels())))
+    # The cheapest model's breaker has cooled down, so the next call is its half-open probe.
+    state = analyzer.scheduler.states["gemini-2.0-flash"]
+    state.open_until = 1.0
+
+    call = asyncio.create_task(analyzer.generate_content_safe("p", QueryVariations, bypass_cache=True))
+    await asyncio.sleep(0.01)
+    assert state.probe is not None
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await call
+
+    assert state.probe is None
+    grant = await analyzer.scheduler.acquire(100)
+    assert grant is not None and grant.model == "gemini-2.0-flash" and grant.probe
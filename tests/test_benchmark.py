@@ -0,0 +1,27 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from benchmarks.run_benchmark import Workload, compare, run_benchmark
+
+
+def test_offline_run_measures_the_whole_pipeline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    workload = Workload(tasks=1, listings=4, latency_ms=0, llm_latency_ms=0, hit_every=2)
+
+    metrics = asyncio.run(run_benchmark(workload))
+
+    # One search page and its four ads; every second ad is a hit.
+    assert metrics["pages"] == 5
+    assert metrics["hits"] == 2
+    assert metrics["llm_calls_by_schema"]["BatchProductCheck"] == 1
+    assert metrics["llm_calls_per_hit"] == metrics["llm_calls"] / 2
+    assert metrics["peak_rss_mb"] > 0
+
+
+def test_compare_flags_regressions_beyond_tolerance() -> None:
+    previous = {"commit": "abc", "timestamp": "t", "metrics": {"pages_per_min": 100.0, "wall_clock_s": 10.0}}
+    current = {"metrics": {"pages_per_min": 80.0, "wall_clock_s": 10.5}}
+
+    assert compare(previous, current, tolerance=0.1) == ["pages_per_min"]
@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from src.services.browser_pool import BrowserPool
+
+
+class FakeManager:
+    def __init__(self) -> None:
+        self.killed: list[str] = []
+
+    async def kill_session(self, session_id: str) -> None:
+        self.killed.append(session_id)
+
+
+@pytest.mark.asyncio
+async def test_pool_bounds_concurrency_and_recycles_tabs() -> None:
+    manager = FakeManager()
+    crawler: Any = SimpleNamespace(crawler_strategy=SimpleNamespace(browser_manager=manager))
+    pool = BrowserPool(size=2, pages_per_tab=3)
+
+    async def render() -> None:
+        async with pool.tab(crawler):
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(render() for _ in range(6)))
+
+    assert pool.stats.pages == 6
+    assert pool.stats.peak_busy == 2
+    assert sorted(manager.killed) == ["tab-0", "tab-1"]
+    assert 0 < pool.stats.utilisation <= 1
@@ -0,0 +1,79 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from src.models import FetchedPage, ModelQuota, QueryVariations
+from src.services.analysis import GeminiAnalyzer
+from src.services.cassette import Cassette
+from src.services.model_scheduler import ModelScheduler
+from src.utils.usage_tracker import UsageTracker
+
+
+class CountingModels:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def generate_content(self, model: str, contents: str, config: dict[str, Any]) -> Any:
+        self.calls += 1
+        return type("Response", (), {"parsed": QueryVariations(variations=[f"v{self.calls}"]), "usage_metadata": None})
+
+
+class CountingClient:
+    def __init__(self) -> None:
+        self.models = CountingModels()
+        self.aio = self
+
+
+def _analyzer(tmp_path: Path, client: CountingClient, cassette: Cassette) -> GeminiAnalyzer:
+    return GeminiAnalyzer(
+        "test-key",
+        client=client,
+        cassette=cassette,
+        scheduler=ModelScheduler({"m": ModelQuota()}),
+        usage=UsageTracker(str(tmp_path / "usage.jsonl"), rollup_file=None),
+    )
+
+
+def test_pages_replay_in_recorded_order_and_misses_return_none(tmp_path: Path) -> None:
+    path = str(tmp_path / "run.json.gz")
+    recorder = Cassette(path, mode="record")
+    recorder.record_page("https://a/1", FetchedPage(url="https://a/1", content="first"))
+    recorder.record_page("https://a/1", FetchedPage(url="https://a/1", content="second"))
+    recorder.record_page("https://a/2", None)
+    recorder.save()
+
+    with gzip.open(path, "rt") as f:
+        assert json.load(f)["version"] == 1
+
+    player = Cassette(path, mode="replay")
+    assert [p.content if p else None for p in (player.replay_page("https://a/1") for _ in range(3))] == [
+        "first",
+        "second",
+        "second",
+    ]
+    assert player.replay_page("https://a/2") is None
+    assert player.replay_page("https://a/3") is None
+    assert (player.stats.replayed, player.stats.misses) == (4, 1)
+
+
+def test_replay_without_a_recording_fails_loudly(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "missing.json.gz"), mode="replay")
+
+
+@pytest.mark.asyncio
+async def test_replayed_llm_calls_never_reach_the_model(tmp_path: Path) -> None:
+    path = str(tmp_path / "run.json.gz")
+    recording = Cassette(path, mode="record")
+    live = CountingClient()
+    assert await _analyzer(tmp_path, live, recording).generate_query_variations("xtz") == ["v1"]
+    recording.save()
+
+    offline = CountingClient()
+    replayed = await _analyzer(tmp_path, offline, Cassette(path, mode="replay")).generate_query_variations("xtz")
+
+    assert replayed == ["v1"]
+    assert offline.models.calls == 0
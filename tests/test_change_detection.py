@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from src.services.change_detection import SearchPageChangeDetector, listing_blocks
+from src.utils.urls import ad_key
+
+HEADER = "# Search results\n\n[Home](/) [Login](/login)\n\n"
+
+
+def _page(*ads: tuple[int, str]) -> str:
+    rows = [f"[Ad {n}](/item/{n})\n{price} kr · 3 min sedan" for n, price in ads]
+    return HEADER + "\n\n".join(rows) + "\n\nFooter © 2026"
+
+
+def test_listing_blocks_ignore_navigation_and_footer() -> None:
+    blocks = listing_blocks(_page((1, "100"), (2, "200")))
+    assert len(blocks) == 2
+    assert all("/item/" in b for b in blocks)
+
+
+def test_first_visit_sends_whole_page(tmp_path: Path) -> None:
+    detector = SearchPageChangeDetector(str(tmp_path / "fp.db"))
+    content = _page((1, "100"), (2, "200"), (3, "300"))
+    diff = detector.diff("task|url", content)
+    assert not diff.comparable
+    assert diff.content_for_analysis() == content
+
+
+def test_unchanged_page_is_skipped_despite_relative_times(tmp_path: Path) -> None:
+    detector = SearchPageChangeDetector(str(tmp_path / "fp.db"))
+    detector.record_analysis(detector.diff("k", _page((1, "100"), (2, "200"), (3, "300"))), analysed=True)
+
+    later = _page((1, "100"), (2, "200"), (3, "300")).replace("3 min", "2 timmar")
+    diff = detector.diff("k", later)
+    assert diff.unchanged
+    detector.record_analysis(diff, analysed=True)
+    assert detector.stats.skipped == 1
+    assert detector.stats.tokens_saved > 0
+
+
+def test_changed_page_sends_only_new_rows(tmp_path: Path) -> None:
+    path = str(tmp_path / "fp.db")
+    detector = SearchPageChangeDetector(path)
+    detector.record_analysis(detector.diff("k", _page((1, "100"), (2, "200"), (3, "300"))), analysed=True)
+    detector.close()
+
+    # Fingerprints survive a restart; a repriced ad counts as new.
+    detector = SearchPageChangeDetector(path)
+    diff = detector.diff("k", _page((4, "400"), (1, "100"), (2, "150"), (3, "300")))
+    sent = diff.content_for_analysis()
+    assert "/item/4" in sent and "/item/2" in sent
+    assert "/item/1" not in sent and "/item/3" not in sent
+
+
+def test_failed_analysis_keeps_previous_fingerprints(tmp_path: Path) -> None:
+    detector = SearchPageChangeDetector(str(tmp_path / "fp.db"))
+    detector.record_analysis(detector.diff("k", _page((1, "100"), (2, "200"), (3, "300"))), analysed=True)
+    detector.record_analysis(detector.diff("k", _page((4, "400"), (1, "100"), (2, "200"))), analysed=False)
+
+    assert detector.diff("k", _page((4, "400"), (1, "100"), (2, "200"))).new_blocks
+
+
+def test_only_rows_of_unfinished_ads_are_left_out(tmp_path: Path) -> None:
+    detector = SearchPageChangeDetector(str(tmp_path / "fp.db"))
+    content = _page((1, "100"), (12, "200"), (3, "300"))
+    diff = detector.diff("k", content, "https://www.blocket.se/search?q=xtz")
+    detector.record_analysis(diff, analysed=True, unfinished={ad_key("https://www.blocket.se/item/1")})
+
+    # Ad 12's row is not held back just because its link contains "/item/1".
+    sent = detector.diff("k", content).content_for_analysis()
+    assert "/item/1)" in sent and "/item/12" not in sent
@@ -0,0 +1,129 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, cast
+
+import httpx
+import pytest
+
+from src.models import RateLimitPolicy
+from src.services.crawler import ContentFetcher
+from src.services.fetch_tiers import TierMemory
+from src.services.http_client import HttpClient
+from src.services.page_cache import PageCache
+from src.services.readiness import ReadinessTracker
+from src.utils.rate_limiter import DomainRateLimiter
+
+LISTING = "<html><body><h1>Ads</h1>" + "".join(f"<a href='/item/{n}'>Ad {n} 100 kr</a><p>x</p>" for n in range(40))
+SPA_SHELL = "<html><body><div id='app'>Loading...</div></body></html>"
+
+
+class FakeHttp:
+    def __init__(self, pages: dict[str, str]) -> None:
+        self.pages = pages
+        self.calls: list[str] = []
+        self.conditional_calls: list[str] = []
+
+    def _response(self, url: str) -> httpx.Response:
+        etag = f'"{hash(self.pages[url])}"'
+        return httpx.Response(200, text=self.pages[url], headers={"ETag": etag}, request=httpx.Request("GET", url))
+
+    async def get(self, url: str, headers: dict[str, str] | None = None, **kwargs: Any) -> httpx.Response:
+        self.calls.append(url)
+        return self._response(url)
+
+    async def conditional_get(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        self.conditional_calls.append(url)
+        resp = self._response(url)
+        if (headers or {}).get("If-None-Match") == resp.headers["ETag"]:
+            return httpx.Response(304, request=resp.request)
+        return resp
+
+
+class FakeCrawler:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def arun(self, url: str, config: Any) -> Any:
+        self.calls.append(url)
+        return SimpleNamespace(markdown="rendered " * 100, html="<html></html>", response_headers={})
+
+
+def _fetcher(
+    tmp_path: Path, pages: dict[str, str], page_cache: PageCache | None = None
+) -> tuple[ContentFetcher, FakeHttp]:
+    http = FakeHttp(pages)
+    fetcher = ContentFetcher(
+        page_cache=page_cache,
+        rate_limiter=DomainRateLimiter(RateLimitPolicy(requests_per_second=1000, burst=100, min_interval=0)),
+        readiness_tracker=ReadinessTracker(str(tmp_path / "readiness.json")),
+        http_client=cast(HttpClient, http),
+        tier_memory=TierMemory(str(tmp_path / "tiers.json"), failures_to_escalate=2),
+    )
+    return fetcher, http
+
+
+@pytest.mark.asyncio
+async def test_server_rendered_page_skips_browser(tmp_path: Path) -> None:
+    fetcher, _ = _fetcher(tmp_path, {"https://hifitorget.se/list": LISTING})
+    crawler = FakeCrawler()
+
+    page = await fetcher.fetch_page(crawler, "https://hifitorget.se/list")
+
+    assert page is not None and page.source == "http" and "Ad 39" in page.content
+    assert crawler.calls == []
+
+
+@pytest.mark.asyncio
+async def test_spa_escalates_and_is_remembered(tmp_path: Path) -> None:
+    urls = [f"https://spa.example/item/{n}" for n in range(3)]
+    fetcher, http = _fetcher(tmp_path, dict.fromkeys(urls, SPA_SHELL))
+    crawler = FakeCrawler()
+
+    for url in urls:
+        page = await fetcher.fetch_page(crawler, url)
+        assert page is not None and page.source == "browser"
+
+    # After two failed static attempts the third fetch goes straight to the browser.
+    assert http.calls == urls[:2]
+    assert crawler.calls == urls
+    assert fetcher.tier_memory.needs_browser("spa.example")
+
+
+@pytest.mark.asyncio
+async def test_stale_page_is_revalidated_and_a_changed_body_is_stored_without_refetching(tmp_path: Path) -> None:
+    url = "https://hifitorget.se/list"
+    cache = PageCache(root=str(tmp_path / "cache"), ttl_hours={"search": 0.0})
+    fetcher, http = _fetcher(tmp_path, {url: LISTING}, page_cache=cache)
+    crawler = FakeCrawler()
+    await fetcher.fetch_page(crawler, url)
+
+    unchanged = await fetcher.fetch_page(crawler, url)
+    assert unchanged is not None and unchanged.source == "cache" and cache.stats.revalidated == 1
+
+    http.pages[url] = LISTING.replace("Ad 39", "Ad 99")
+    changed = await fetcher.fetch_page(crawler, url)
+
+    assert changed is not None and changed.source == "http" and "Ad 99" in changed.content
+    # The 200 answer to the conditional GET was the fetch: no second request, and the cache holds the new body.
+    assert http.calls == [url] and http.conditional_calls == [url, url]
+    cached, stale = cache.lookup(url)
+    assert cached is None and stale is not None and stale.etag == http._response(url).headers["ETag"]
+    assert crawler.calls == []
+
+
+def test_tier_memory_saves_merge_outcomes_of_processes_sharing_the_file(tmp_path: Path) -> None:
+    path = str(tmp_path / "tiers.json")
+    first, second = TierMemory(path), TierMemory(path)
+    first.record("a.example", static_ok=True)
+    second.record("b.example", static_ok=False)
+    second.record("a.example", static_ok=False)
+
+    first.save()
+    second.save()
+
+    merged = TierMemory(path).domains
+    assert merged["a.example"].recent == [True, False]
+    assert merged["b.example"].escalations == 1
+    # Saving again adds nothing twice.
+    second.save()
+    assert TierMemory(path).domains["a.example"].recent == [True, False]
@@ -0,0 +1,92 @@
+import asyncio
+import random
+from typing import Any, cast
+
+import pytest
+
+from src.models import ScrapeTask
+from src.services.daemon import ScrapeDaemon
+
+
+class FakePipeline:
+    def __init__(self, concurrent: bool = True) -> None:
+        self.concurrent = concurrent
+        self.polled: list[str] = []
+        self.resets = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.errors: list[str] = []
+        self.announced: list[str] = []
+        self.notification_service = self
+
+    async def run_task(self, crawler: Any, task: ScrapeTask, announce: bool = True) -> None:
+        if announce:
+            self.announced.append(task.name)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        self.polled.append(task.name)
+        if task.name == "broken":
+            raise RuntimeError("boom")
+
+    def reset_run_state(self) -> None:
+        self.resets += 1
+
+    async def notify_error(self, message: str) -> None:
+        self.errors.append(message)
+
+
+def _task(name: str, seconds: float) -> ScrapeTask:
+    return ScrapeTask(name=name, search_query=name, poll_minutes=seconds / 60)
+
+
+async def _run_for(daemon: ScrapeDaemon, seconds: float) -> None:
+    runner = asyncio.create_task(daemon.run(cast(Any, None)))
+    await asyncio.sleep(seconds)
+    daemon.stop()
+    await asyncio.wait_for(runner, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_tasks_poll_on_their_own_intervals_and_failures_are_survived() -> None:
+    pipeline = FakePipeline()
+    idle: list[int] = []
+    daemon = ScrapeDaemon(
+        cast(Any, pipeline),
+        [_task("fast", 0.05), _task("slow", 0.5), _task("broken", 0.05)],
+        jitter=0.1,
+        on_idle=lambda: idle.append(1),
+        rng=random.Random(1),
+    )
+
+    await _run_for(daemon, 0.6)
+
+    assert daemon.polls["fast"] >= 5
+    # Each task is announced once per daemon session, not on every poll.
+    assert sorted(pipeline.announced) == ["broken", "fast", "slow"]
+    assert 1 <= daemon.polls["slow"] <= 2
+    assert abs(daemon.polls["broken"] - daemon.polls["fast"]) <= 2
+    assert daemon.failures == daemon.polls["broken"]
+    assert pipeline.errors and "boom" in pipeline.errors[0]
+    assert idle and pipeline.resets == len(idle)
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_running_polls_and_sequential_mode_polls_one_at_a_time() -> None:
+    pipeline = FakePipeline(concurrent=False)
+    daemon = ScrapeDaemon(cast(Any, pipeline), [_task("a", 0.02), _task("b", 0.02)], jitter=0.0)
+
+    await _run_for(daemon, 0.1)
+
+    assert pipeline.peak == 1
+    assert pipeline.in_flight == 0
+    assert len(pipeline.polled) == sum(daemon.polls.values())
+
+
+def test_interval_uses_task_override_and_stays_within_jitter() -> None:
+    daemon = ScrapeDaemon(cast(Any, FakePipeline()), [], default_minutes=10, jitter=0.2, rng=random.Random(0))
+    intervals = [daemon.interval_for(ScrapeTask(name="t", search_query="q")) for _ in range(50)]
+
+    assert all(480 <= s <= 720 for s in intervals)
+    assert 54 <= daemon.interval_for(_task("own", 60)) <= 72
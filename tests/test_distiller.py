@@ -0,0 +1,61 @@
+from src.services.distiller import ContentDistiller
+
+SEARCH_PAGE = """
+[Hem](/) [Köp](/buy) [Sälj](/sell) [Logga in](/login)
+
+Vi använder cookies för att ge dig en bättre upplevelse. [Acceptera](/ok)
+
+# 124 annonser
+
+[XTZ Sub 10 subwoofer](/item/111)
+2 500 kr · Stockholm
+
+[Spara](/save)
+
+[XTZ 99 W12 subwoofer](/item/222)
+4 000 kr · Göteborg
+
+[Spara](/save)
+
+[Yamaha NS-SW300](/item/333)
+1 800 kr · Malmö
+
+[Om oss](/about) [Kundservice](/help) [Jobb](/jobs)
+
+© 2026 Marketplace AB
+"""
+
+
+def test_search_page_keeps_listings_and_drops_boilerplate() -> None:
+    result = ContentDistiller().distill(SEARCH_PAGE, kind="search")
+
+    for url in ("/item/111", "/item/222", "/item/333"):
+        assert url in result.text
+    for noise in ("cookies", "Logga in", "© 2026", "Kundservice"):
+        assert noise not in result.text
+    # The repeated "Spara" row is kept once.
+    assert result.text.count("[Spara]") == 1
+    assert result.tokens_out < result.tokens_in
+
+
+def test_ad_budget_cuts_at_blocks_but_keeps_the_price() -> None:
+    description = "\n\n".join(f"Paragraph {n} " + "lorem ipsum " * 40 for n in range(20))
+    ad = f"# XTZ Sub 10\n\n[Annonser](/ads) [Hem](/) [Sök](/s)\n\n{description}\n\nPris: 2 500 kr"
+
+    result = ContentDistiller(ad_budget=300).distill(ad, kind="ad")
+
+    assert result.text.startswith("# XTZ Sub 10")
+    assert "2 500 kr" in result.text
+    assert "Paragraph 19" not in result.text
+    assert result.tokens_out < 400
+
+
+def test_raw_html_fallback_is_stripped_of_scripts() -> None:
+    html = "<html><script>var tracking = 1;</script><h1>XTZ</h1><p>Pris 100 kr</p></html>"
+    result = ContentDistiller().distill(html, kind="ad")
+    assert "tracking" not in result.text
+    assert "XTZ" in result.text and "<p>" not in result.text
+
+
+def test_disabled_distiller_passes_content_through() -> None:
+    assert ContentDistiller(enabled=False).distill(SEARCH_PAGE).text == SEARCH_PAGE
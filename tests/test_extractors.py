@@ -0,0 +1,107 @@
+import json
+
+from src.models import FetchedPage, ScrapeTask
+from src.services.extractors import ExtractorRegistry, parse_price, price_currency
+
+TASK = ScrapeTask(name="Bull", search_query="bronze bull sculpture", max_price=2000)
+
+
+def _page(url: str, html: str = "", content: str = "") -> FetchedPage:
+    return FetchedPage(url=url, html=html, content=content)
+
+
+def test_parse_price_formats() -> None:
+    assert parse_price("1 500 kr") == 1500
+    assert parse_price("1.500,00 €") == 1500
+    assert parse_price("1,500.00 EUR") == 1500
+    assert parse_price("12.5") == 12.5
+    assert parse_price("Free") is None
+
+
+def test_price_currency() -> None:
+    assert price_currency("1500 SEK") == "SEK"
+    assert price_currency("95 €") == "EUR"
+    assert price_currency("1 500 kr") is None
+
+
+def test_max_price_only_filters_prices_in_the_task_currency() -> None:
+    ld = {
+        "@type": "ItemList",
+        "itemListElement": [
+            {"name": "Bronze bull sculpture", "url": "/item/1/1", "offers": {"price": 2500, "priceCurrency": "SEK"}},
+            {"name": "Bronze bull sculpture", "url": "/item/1/2", "offers": {"price": 2500, "priceCurrency": "EUR"}},
+            {"name": "Bronze bull sculpture", "url": "/item/1/3", "offers": {"price": 2500}},
+        ],
+    }
+    html = f'<script type="application/ld+json">{json.dumps(ld)}</script>'
+
+    extracted = ExtractorRegistry().extract(_page("https://www.tradera.com/search?q=bull", html=html), TASK)
+
+    # 2500 SEK is over the 2000 SEK budget; 2500 EUR is not comparable, so it is kept for the LLM to judge.
+    assert extracted is not None
+    assert [c.price for c in extracted.candidates] == ["2500 EUR"]
+
+
+def test_json_ld_item_list_is_filtered_by_price_and_relevance() -> None:
+    ld = {
+        "@type": "ItemList",
+        "itemListElement": [
+            {
+                "@type": "ListItem",
+                "item": {
+                    "@type": "Product",
+                    "name": "Bronze bull sculpture",
+                    "url": "/item/12/345",
+                    "offers": {"price": "1500", "priceCurrency": "SEK"},
+                },
+            },
+            {
+                "@type": "ListItem",
+                "item": {"name": "Bull sculpture XL", "url": "/item/12/346", "offers": {"price": 9000}},
+            },
+            {"@type": "ListItem", "item": {"name": "Garden chair", "url": "/item/12/347", "offers": {"price": 100}}},
+        ],
+    }
+    html = f'<script type="application/ld+json">{json.dumps(ld)}</script>'
+    registry = ExtractorRegistry()
+
+    extracted = registry.extract(_page("https://www.tradera.com/search?q=bull", html=html), TASK)
+
+    assert extracted is not None
+    assert [(c.url, c.price) for c in extracted.candidates] == [("https://www.tradera.com/item/12/345", "1500 SEK")]
+    # Within budget but without a query-term match: left for the LLM to judge, not dropped.
+    assert [listing.title for listing in extracted.unmatched] == ["Garden chair"]
+    assert registry.stats["tradera.com"].by_extractor == {"json-ld": 1}
+
+
+def test_next_data_payload() -> None:
+    data = {
+        "props": {
+            "pageProps": {
+                "ads": [
+                    {
+                        "heading": "Bull sculpture bronze",
+                        "url": "/annons/x/123456",
+                        "price": {"amount": 800, "currency": "SEK"},
+                    }
+                ]
+            }
+        }
+    }
+    html = f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script>'
+
+    extracted = ExtractorRegistry().extract(_page("https://www.blocket.se/search", html=html), TASK)
+
+    assert extracted is not None and extracted.candidates[0].price == "800 SEK"
+
+
+def test_unknown_layout_falls_back_and_is_counted() -> None:
+    registry = ExtractorRegistry()
+    assert registry.extract(_page("https://hifitorget.se/s", content="Nothing to see here"), TASK) is None
+    assert registry.stats["hifitorget.se"].fallbacks == 1
+
+
+def test_markdown_listing_rows() -> None:
+    content = "[Bronze bull sculpture](/index.php?mod=ad&id=991)\n1 200 kr\n[Om oss](/about)"
+    extracted = ExtractorRegistry().extract(_page("https://hifitorget.se/s", content=content), TASK)
+    assert extracted is not None and extracted.candidates[0].url == "https://hifitorget.se/index.php?mod=ad&id=991"
@@ -0,0 +1,56 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+from src.services.http_client import HttpClient
+
+
+@pytest.mark.asyncio
+async def test_requests_are_limited_per_host_not_globally() -> None:
+    in_flight: Counter[str] = Counter()
+    peak: Counter[str] = Counter()
+    peak_total = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal peak_total
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        peak_total = max(peak_total, sum(in_flight.values()))
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, text="ok")
+
+    async with HttpClient(max_connections_per_host=2, http2=False, transport=httpx.MockTransport(handler)) as client:
+        await asyncio.gather(*(client.get(f"https://{host}/item/{n}") for host in ("a.se", "b.se") for n in range(6)))
+
+    assert peak == {"a.se": 2, "b.se": 2}
+    assert peak_total == 4
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_reads_the_body_only_for_a_200() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="new listing", headers={"ETag": '"v2"'})
+
+    async with HttpClient(http2=False, transport=httpx.MockTransport(handler)) as client:
+        unchanged = await client.conditional_get("https://a.se/s", headers={"If-None-Match": '"v1"'})
+        changed = await client.conditional_get("https://a.se/s", headers={"If-None-Match": '"v0"'})
+
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200 and changed.text == "new listing" and changed.headers["ETag"] == '"v2"'
+
+
+@pytest.mark.asyncio
+async def test_closed_client_refuses_requests() -> None:
+    client = HttpClient(http2=False, transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    assert (await client.get("https://a.se/")).status_code == 200
+
+    await client.aclose()
+
+    with pytest.raises(RuntimeError):
+        await client.get("https://a.se/")
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from src.models import QueryVariations
+from src.services.llm_cache import LLMCache
+
+
+def test_hit_after_put_ignores_whitespace_and_respects_call_type(tmp_path: Path) -> None:
+    cache = LLMCache(str(tmp_path / "llm.db"), ttl_hours={"query_variations": 1.0})
+    models = ["gemini-2.0-flash", "gemini-1.5-flash"]
+    result = QueryVariations(variations=["xtz sub", "xtz subwoofer"])
+
+    assert cache.get("find  xtz\n", QueryVariations, models, "query_variations") is None
+    cache.put("find  xtz\n", QueryVariations, "gemini-1.5-flash", "query_variations", result)
+
+    assert cache.get("find xtz", QueryVariations, models, "query_variations") == result
+    # Uncached call types never hit, even for the same prompt.
+    assert cache.get("find xtz", QueryVariations, models, "batch") is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.bypassed) == (1, 1, 1)
+
+
+def test_expired_entries_miss(tmp_path: Path) -> None:
+    cache = LLMCache(str(tmp_path / "llm.db"), ttl_hours={"search_page": 1.0})
+    cache.put("p", QueryVariations, "m", "search_page", QueryVariations(variations=[]))
+    cache.conn.execute("UPDATE llm_cache SET created = created - 7200")
+
+    assert cache.get("p", QueryVariations, ["m"], "search_page") is None
+    assert cache.prune() == 1
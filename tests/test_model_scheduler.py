@@ -0,0 +1,100 @@
+import pytest
+
+from src.models import ModelQuota
+from src.services.model_scheduler import ModelScheduler, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _model(scheduler: ModelScheduler, tokens: int) -> str | None:
+    grant = await scheduler.acquire(tokens)
+    return grant.model if grant else None
+
+
+def _scheduler(clock: FakeClock, max_wait: float = 120.0) -> ModelScheduler:
+    quotas = {
+        "cheap": ModelQuota(requests_per_minute=2, tokens_per_minute=10_000),
+        "pricey": ModelQuota(requests_per_minute=60, tokens_per_minute=100_000),
+    }
+    return ModelScheduler(quotas, clock=clock, max_wait=max_wait)
+
+
+@pytest.mark.asyncio
+async def test_routes_to_cheapest_model_with_capacity() -> None:
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+
+    assert [await _model(scheduler, 100) for _ in range(3)] == ["cheap", "cheap", "pricey"]
+    # Requests beyond the cheap model's remaining or total TPM go to the next model.
+    clock.now += 60
+    assert await _model(scheduler, 6_000) == "cheap"
+    assert await _model(scheduler, 6_000) == "pricey"
+    assert await _model(scheduler, 20_000) == "pricey"
+
+
+@pytest.mark.asyncio
+async def test_throttled_model_is_paused_for_retry_after_then_probed() -> None:
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+
+    first = await scheduler.acquire(100)
+    assert first is not None and first.model == "cheap"
+    scheduler.record_failure(first, throttled=True, retry_after=30)
+    assert await _model(scheduler, 100) == "pricey"
+
+    clock.now += 31
+    probe = await scheduler.acquire(100)
+    assert probe is not None and probe.model == "cheap" and probe.probe
+    # Half-open: only one probe until it reports back.
+    assert await _model(scheduler, 100) == "pricey"
+    scheduler.record_success(probe, 100)
+    clock.now += 60
+    assert await _model(scheduler, 100) == "cheap"
+
+
+@pytest.mark.asyncio
+async def test_a_stale_call_finishing_during_the_probe_does_not_let_a_second_probe_in() -> None:
+    clock = FakeClock()
+    roomy = ModelQuota(requests_per_minute=600, tokens_per_minute=1_000_000)
+    scheduler = ModelScheduler({"cheap": roomy, "pricey": roomy}, clock=clock)
+    stale = await scheduler.acquire(100)
+    tripping = await scheduler.acquire(100)
+    assert stale is not None and tripping is not None
+    scheduler.record_failure(tripping, throttled=True, retry_after=30)
+
+    clock.now += 31
+    probe = await scheduler.acquire(100)
+    assert probe is not None and probe.model == "cheap" and probe.probe
+    # The call that was in flight when the breaker opened fails with an ordinary error, or is cancelled.
+    scheduler.record_failure(stale)
+    scheduler.release(stale)
+
+    assert await _model(scheduler, 100) == "pricey"
+    scheduler.release(probe)
+    assert await _model(scheduler, 100) == "cheap"
+
+
+@pytest.mark.asyncio
+async def test_gives_up_when_everything_is_excluded_or_disabled() -> None:
+    scheduler = _scheduler(FakeClock(), max_wait=1.0)
+    scheduler.disable("pricey")
+    assert await scheduler.acquire(100, exclude={"cheap"}) is None
+
+
+def test_retry_after_from_header_or_retry_info() -> None:
+    class Response:
+        headers = {"retry-after": "12"}
+
+    header_error = Exception("429")
+    header_error.response = Response()  # type: ignore[attr-defined]
+    assert retry_after_seconds(header_error) == 12.0
+
+    body_error = Exception("429 RESOURCE_EXHAUSTED {'@type': 'RetryInfo', 'retryDelay': '37s'}")
+    assert retry_after_seconds(body_error) == 37.0
+    assert retry_after_seconds(Exception("500 internal")) is None
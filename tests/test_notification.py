@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import time
+from collections.abc import AsyncIterator
+from typing import Any, cast
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.services.http_client import HttpClient
+from src.services.notification import NotificationService
+
+
+class StandInNtfy:
+    """Minimal local HTTP server that records ntfy POSTs; the first `fail_first` requests get a 503."""
+
+    def __init__(self, fail_first: int = 0) -> None:
+        self.fail_first = fail_first
+        self.received: list[tuple[str, str, float]] = []
+        self.server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self.server
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            headers = dict(line.split(": ", 1) for line in head.decode().split("\r\n")[1:] if ": " in line)
+            lowered = {k.lower(): v for k, v in headers.items()}
+            body = await reader.readexactly(int(lowered.get("content-length", "0")))
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+            else:
+                self.received.append((lowered.get("title", ""), body.decode(), time.monotonic()))
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}")
+            await writer.drain()
+        writer.close()
+
+    async def __aenter__(self) -> "StandInNtfy":
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        assert self.server
+        self.server.close()
+
+
+@pytest_asyncio.fixture
+async def client() -> AsyncIterator[HttpClient]:
+    async with HttpClient(http2=False) as http_client:
+        yield http_client
+
+
+@pytest.mark.asyncio
+async def test_hits_are_coalesced_per_task_and_flushed_in_order(client: HttpClient) -> None:
+    async with StandInNtfy() as ntfy:
+        service = NotificationService("topic", http_client=client, server_url=ntfy.url, digest_window=30)
+        await service.notify_start("XTZ")
+        await service.notify_start("Yamaha")
+        for n in range(3):
+            await service.notify_match(f"XTZ {n}", "100 kr", f"https://x/{n}", task="XTZ")
+        await service.notify_match("NS-SW300", "900 kr", "https://y/1", task="Yamaha")
+        assert ntfy.received == []
+
+        await service.aclose()
+
+    assert [title for title, _, _ in ntfy.received] == ["Scraper Online", "3 Deals Found: XTZ", "Deal Found!"]
+    assert "XTZ, Yamaha" in ntfy.received[0][1]
+    assert service.stats.coalesced == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_deliveries_are_retried_with_backoff(client: HttpClient) -> None:
+    async with StandInNtfy(fail_first=2) as ntfy:
+        service = NotificationService(
+            "topic", http_client=client, server_url=ntfy.url, digest_window=0, retry_backoff=0.01
+        )
+        started = time.monotonic()
+        await service.notify_match("XTZ", "100 kr", "https://x/1", task="XTZ")
+        # Enqueuing does not wait for the round-trip.
+        assert time.monotonic() - started < 0.05
+        await service.aclose()
+
+    assert len(ntfy.received) == 1
+    assert (service.stats.sent, service.stats.retries) == (1, 2)
+    assert service.stats.percentile(0.5) > 0
+
+
+@pytest.mark.asyncio
+async def test_non_ascii_task_names_are_encoded_in_the_title(client: HttpClient) -> None:
+    async with StandInNtfy() as ntfy:
+        service = NotificationService("topic", http_client=client, server_url=ntfy.url, digest_window=30)
+        for n in range(2):
+            await service.notify_match(f"Högtalare {n}", "100 kr", f"https://x/{n}", task="Köp åäö")
+        await service.aclose()
+
+    [(title, body, _)] = ntfy.received
+    assert title == "=?UTF-8?B?" + base64.b64encode("2 Deals Found: Köp åäö".encode()).decode() + "?="
+    assert "Högtalare 1" in body
+    assert (service.stats.sent, service.stats.failed) == (1, 0)
+
+
+class BrokenOnceHttp:
+    def __init__(self) -> None:
+        self.posts = 0
+
+    async def post(self, url: str, content: bytes, headers: dict[str, str] | None = None) -> httpx.Response:
+        self.posts += 1
+        if self.posts == 1:
+            raise ValueError("cannot build request")
+        return httpx.Response(200, request=httpx.Request("POST", url))
+
+
+@pytest.mark.asyncio
+async def test_a_message_that_cannot_be_sent_does_not_stop_delivery() -> None:
+    http = BrokenOnceHttp()
+    service = NotificationService("topic", http_client=cast(Any, http), digest_window=0)
+    await service.notify_error("first")
+    await service.notify_error("second")
+    await service.aclose()
+
+    assert http.posts == 2
+    assert (service.stats.sent, service.stats.failed) == (1, 1)
@@ -0,0 +1,34 @@
+import time
+from pathlib import Path
+
+from src.models import FetchedPage
+from src.services.page_cache import PageCache
+
+
+def test_fresh_hit_and_identical_bodies_share_a_blob(tmp_path: Path) -> None:
+    cache = PageCache(root=str(tmp_path), ttl_hours={"ad": 24.0})
+    cache.put("ad", FetchedPage(url="https://a.se/item/1", content="same body"))
+    cache.put("ad", FetchedPage(url="https://a.se/item/2", content="same body"))
+
+    page, stale = cache.lookup("https://a.se/item/1")
+    assert page is not None and page.content == "same body" and page.source == "cache"
+    assert stale is None
+    assert cache.prune() == 0
+    assert cache.stats.hit_ratio == 1.0
+
+
+def test_stale_entry_is_offered_for_revalidation_only_with_validators(tmp_path: Path) -> None:
+    cache = PageCache(root=str(tmp_path), ttl_hours={"search": 0.0})
+    cache.put("search", FetchedPage(url="https://a.se/s?q=1", content="list", headers={"ETag": '"v1"'}))
+    cache.put("search", FetchedPage(url="https://a.se/s?q=2", content="list"))
+
+    page, stale = cache.lookup("https://a.se/s?q=1")
+    assert page is None and stale is not None and stale.etag == '"v1"'
+    assert cache.lookup("https://a.se/s?q=2") == (None, None)
+
+    before = stale.fetched_at
+    time.sleep(0.01)
+    revalidated = cache.mark_revalidated(stale)
+    assert revalidated is not None and revalidated.content == "list"
+    assert stale.fetched_at > before
+    assert cache.stats.misses == 1 and cache.stats.revalidated == 1
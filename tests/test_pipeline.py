@@ -0,0 +1,223 @@
+import json
+import re
+from pathlib import Path
+from typing import Any
+
+import pytest
+from conftest import FakeAnalyzer, FakeFetcher, FakeNotifier, FakePresenter, make_pipeline
+
+from src.models import CandidateItem, FetchedPage, PaginationRule, ScrapeTask
+from src.services.change_detection import SearchPageChangeDetector
+from src.services.pipeline import ScrapePipeline
+from src.services.source_scheduler import SourceScheduler
+from src.utils.concurrency import DomainLimiter
+from src.utils.urls import canonical_url
+
+
+async def _run(concurrent: bool) -> tuple[ScrapePipeline, FakeFetcher, FakeNotifier, FakePresenter]:
+    fetcher = FakeFetcher()
+    notifier = FakeNotifier()
+    presenter = FakePresenter()
+    pipeline = make_pipeline(
+        FakeAnalyzer(),
+        fetcher,
+        notifier,
+        presenter,
+        limiter=DomainLimiter(max_concurrency=4, max_per_domain=1),
+        concurrent=concurrent,
+    )
+    tasks = [ScrapeTask(name="Sub", search_query="xtz sub", fuzzy_search=True)]
+    await pipeline.run(None, tasks)
+    return pipeline, fetcher, notifier, presenter
+
+
+@pytest.mark.asyncio
+async def test_concurrent_matches_sequential() -> None:
+    seq_pipeline, seq_fetcher, seq_notifier, seq_presenter = await _run(concurrent=False)
+    con_pipeline, con_fetcher, con_notifier, con_presenter = await _run(concurrent=True)
+
+    assert con_pipeline.seen == seq_pipeline.seen
+    assert sorted(con_notifier.matches) == sorted(seq_notifier.matches)
+    assert {k: sorted(v) for k, v in con_presenter.saved.items()} == {
+        k: sorted(v) for k, v in seq_presenter.saved.items()
+    }
+    # Each ad is deep-dived once even though four search pages list it.
+    assert len(con_fetcher.fetched) == len(seq_fetcher.fetched) == 4 + 4
+
+
+@pytest.mark.asyncio
+async def test_per_domain_limit_is_respected() -> None:
+    _, fetcher, _, _ = await _run(concurrent=True)
+    assert max(fetcher.peak.values()) == 1
+
+
+@pytest.mark.asyncio
+async def test_sources_not_due_are_skipped_and_crawled_sources_are_recorded(tmp_path: Path) -> None:
+    scheduler = SourceScheduler(str(tmp_path / "schedule.json"))
+    # tradera.com was crawled moments ago for the main query.
+    scheduler.record(SourceScheduler.key("Sub", "tradera.com", "xtz sub"), new_listings=0)
+    fetcher = FakeFetcher()
+    pipeline = make_pipeline(FakeAnalyzer(), fetcher, source_scheduler=scheduler)
+
+    await pipeline.run(None, [ScrapeTask(name="Sub", search_query="xtz sub", fuzzy_search=True)])
+
+    assert "https://www.tradera.com/search?q=xtz+sub" not in fetcher.fetched
+    assert scheduler.run_skipped == 1
+    # The setup crawl above plus the three sources that were due.
+    assert scheduler.run_crawled == 1 + 3
+
+
+class PagedAnalyzer(FakeAnalyzer):
+    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem]:
+        # Results page n lists ads n1 and n2.
+        page = int(content.rsplit("page=", 1)[1]) if "page=" in content else 1
+        return [
+            CandidateItem(
+                url=f"/item/{page}{i}", title=f"Ad {page}{i}", price="1 kr", reasoning="", confidence_score=90
+            )
+            for i in (1, 2)
+        ]
+
+
+async def _walk(seen: set[str], max_pages: int) -> FakeFetcher:
+    fetcher = FakeFetcher()
+    pipeline = make_pipeline(
+        PagedAnalyzer(),
+        fetcher,
+        seen=seen,
+        target_sites=["blocket.se"],
+        pagination={"blocket.se": PaginationRule(page_param="page", sort_params={"sort": "PUBLISHED_DESC"})},
+        max_search_pages=max_pages,
+    )
+    await pipeline.run(None, [ScrapeTask(name="Sub", search_query="xtz")])
+    return fetcher
+
+
+@pytest.mark.asyncio
+async def test_results_are_paged_until_a_page_lists_only_seen_ads() -> None:
+    seen = {canonical_url(f"https://www.blocket.se/item/2{i}") for i in (1, 2)}
+    fetcher = await _walk(seen, max_pages=5)
+
+    search_pages = [url for url in fetcher.fetched if "search" in url]
+    assert search_pages == [
+        "https://www.blocket.se/search?q=xtz&sort=PUBLISHED_DESC",
+        "https://www.blocket.se/search?q=xtz&sort=PUBLISHED_DESC&page=2",
+    ]
+    assert sorted(url for url in fetcher.fetched if "/item/" in url) == [
+        canonical_url("https://www.blocket.se/item/11"),
+        canonical_url("https://www.blocket.se/item/12"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_paging_stops_at_the_page_limit() -> None:
+    fetcher = await _walk(set(), max_pages=3)
+
+    assert len([url for url in fetcher.fetched if "search" in url]) == 3
+    assert len([url for url in fetcher.fetched if "/item/" in url]) == 6
+
+
+class ListingAnalyzer(FakeAnalyzer):
+    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem]:
+        # Only the rows it is shown, as with a diffed page.
+        return [
+            CandidateItem(url=url, title=url, price="100 kr", reasoning="", confidence_score=90)
+            for url in re.findall(r"\]\((/item/\d+)\)", content)
+        ]
+
+
+class FlakyFetcher(FakeFetcher):
+    def __init__(self, failing: set[str]) -> None:
+        super().__init__()
+        self.failing = failing
+
+    async def fetch_page(self, crawler: Any, url: str) -> FetchedPage | None:
+        if "/search" in url:
+            rows = [f"[Ad {n}](/item/{n})\n{n}00 kr" for n in (1, 2, 3)]
+            return FetchedPage(url=url, content="# Results\n\n" + "\n\n".join(rows))
+        if any(url.endswith(path) for path in self.failing):
+            return None
+        return await super().fetch_page(crawler, url)
+
+
+@pytest.mark.asyncio
+async def test_ad_whose_deep_dive_failed_is_retried_on_an_unchanged_page(tmp_path: Path) -> None:
+    detector = SearchPageChangeDetector(str(tmp_path / "fp.db"))
+    seen: set[str] = set()
+
+    async def run(fetcher: FlakyFetcher) -> None:
+        pipeline = make_pipeline(
+            ListingAnalyzer(), fetcher, seen=seen, target_sites=["blocket.se"], change_detector=detector
+        )
+        await pipeline.run(None, [ScrapeTask(name="Sub", search_query="xtz")])
+
+    await run(FlakyFetcher(failing={"/item/2"}))
+    assert len(seen) == 2
+
+    retry = FlakyFetcher(failing=set())
+    await run(retry)
+    # The page is unchanged, but the row of the failed ad is analysed again and its ad fetched.
+    assert [url for url in retry.fetched if "/item/" in url] == [canonical_url("https://www.blocket.se/item/2")]
+    assert len(seen) == 3
+
+
+class RewritingAnalyzer(ListingAnalyzer):
+    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem]:
+        # The LLM hands back absolute links with tracking added, not the page's relative ones.
+        candidates = await super().analyze_search_page(content, task) or []
+        for cand in candidates:
+            cand.url = f"https://blocket.se{cand.url}?utm_source=search"
+        return candidates
+
+
+@pytest.mark.asyncio
+async def test_failed_ad_is_retried_when_its_link_was_rewritten(tmp_path: Path) -> None:
+    detector = SearchPageChangeDetector(str(tmp_path / "fp.db"))
+    seen: set[str] = set()
+
+    async def run(fetcher: FlakyFetcher) -> None:
+        pipeline = make_pipeline(
+            RewritingAnalyzer(), fetcher, seen=seen, target_sites=["blocket.se"], change_detector=detector
+        )
+        await pipeline.run(None, [ScrapeTask(name="Sub", search_query="xtz")])
+
+    await run(FlakyFetcher(failing={"/item/2"}))
+    retry = FlakyFetcher(failing=set())
+    await run(retry)
+    assert [url for url in retry.fetched if "/item/" in url] == [canonical_url("https://www.blocket.se/item/2")]
+
+
+class SynonymAnalyzer(FakeAnalyzer):
+    def __init__(self) -> None:
+        super().__init__()
+        self.prompts: list[str] = []
+
+    async def analyze_search_page(self, content: str, task: ScrapeTask) -> list[CandidateItem]:
+        self.prompts.append(content)
+        return [
+            CandidateItem(url=url, title="Tjur i brons", price="900 kr", reasoning="synonym", confidence_score=80)
+            for url in re.findall(r"\((https://\S+/item/\d+)\)", content)
+        ]
+
+
+class JsonLdFetcher(FakeFetcher):
+    async def fetch_page(self, crawler: Any, url: str) -> FetchedPage | None:
+        if "/search" not in url:
+            return await super().fetch_page(crawler, url)
+        items = [{"@type": "Product", "name": "Tjur i brons", "url": "/item/7", "offers": {"price": 900}}]
+        data = json.dumps({"@type": "ItemList", "itemListElement": items})
+        html = f'<script type="application/ld+json">{data}</script>'
+        return FetchedPage(url=url, html=html, content="Tjur i brons 900 kr")
+
+
+@pytest.mark.asyncio
+async def test_extracted_listings_without_a_query_term_match_are_judged_by_the_llm() -> None:
+    analyzer = SynonymAnalyzer()
+    fetcher = JsonLdFetcher()
+    pipeline = make_pipeline(analyzer, fetcher, target_sites=["blocket.se"])
+
+    await pipeline.run(None, [ScrapeTask(name="Bull", search_query="bronze bull sculpture")])
+
+    # The lexical filter keeps nothing, so the LLM sees just the extracted rows and keeps the synonym.
+    assert analyzer.prompts == ["- [Tjur i brons](https://www.blocket.se/item/7) 900"]
+    assert canonical_url("https://www.blocket.se/item/7") in fetcher.fetched
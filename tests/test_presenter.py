@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+from src.models import ProductCheck
+from src.services.presenter import ResultsPresenter
+
+
+def _hit(n: int, suffix: str = "") -> ProductCheck:
+    return ProductCheck(
+        url=f"https://www.blocket.se/annons/x/{10000 + n}{suffix}",
+        found_item=True,
+        item_name=f"Item <{n}>",
+        price="100 kr",
+        reasoning="ok",
+    )
+
+
+def _presenter(tmp_path: Path) -> ResultsPresenter:
+    return ResultsPresenter(
+        data_dir=str(tmp_path / "data"),
+        md_path=str(tmp_path / "RESULTS.md"),
+        public_dir=str(tmp_path / "public"),
+        page_size=2,
+    )
+
+
+def test_hits_are_appended_once_per_canonical_url(tmp_path: Path) -> None:
+    presenter = _presenter(tmp_path)
+    presenter.save_results([_hit(1), _hit(2)], "task", total_scanned=5)
+    presenter.save_results([_hit(1, "?utm_source=x")], "task", total_scanned=1)
+
+    reopened = _presenter(tmp_path)
+    reopened.save_results([_hit(2), _hit(3)], "task")
+
+    lines = (tmp_path / "data" / "results.jsonl").read_text().splitlines()
+    assert [json.loads(line)["item_name"] for line in lines] == ["Item <1>", "Item <2>", "Item <3>"]
+    assert presenter.scans["task"] == (2, 6)
+
+
+def test_render_only_rewrites_pages_that_changed(tmp_path: Path) -> None:
+    presenter = _presenter(tmp_path)
+    presenter.save_results([_hit(n) for n in range(3)], "task")
+    presenter.render()
+
+    pages = tmp_path / "public" / "pages"
+    assert sorted(p.name for p in pages.glob("page-*.html")) == ["page-0001.html", "page-0002.html"]
+    (pages / "page-0001.html").write_text("full page, left alone")
+
+    presenter.save_results([_hit(n) for n in range(3, 6)], "task")
+    presenter.render()
+
+    assert (pages / "page-0001.html").read_text() == "full page, left alone"
+    assert "Item &lt;3&gt;" in (pages / "page-0002.html").read_text()
+    assert (pages / "page-0003.html").exists()
+    assert 'href="page-0003.html">← Newer' in (pages / "page-0002.html").read_text()
+    index = (tmp_path / "public" / "index.html").read_text()
+    assert "Item &lt;5&gt;" in index and "Item &lt;0&gt;" not in index
+    assert "Showing the 2 newest of 6 hits" in (tmp_path / "RESULTS.md").read_text()
+
+
+def test_a_new_page_relinks_the_full_page_before_it(tmp_path: Path) -> None:
+    presenter = _presenter(tmp_path)
+    presenter.save_results([_hit(n) for n in range(4)], "task")
+    presenter.render()
+    pages = tmp_path / "public" / "pages"
+    assert "Newer" not in (pages / "page-0002.html").read_text()
+    (pages / "page-0001.html").write_text("full page, left alone")
+
+    presenter.save_results([_hit(4)], "task")
+    presenter.render()
+
+    assert 'href="page-0003.html">← Newer' in (pages / "page-0002.html").read_text()
+    assert 'href="page-0002.html">Older →' in (pages / "page-0003.html").read_text()
+    assert (pages / "page-0001.html").read_text() == "full page, left alone"
+
+
+def test_legacy_results_json_is_migrated(tmp_path: Path) -> None:
+    data = tmp_path / "data"
+    data.mkdir()
+    legacy = [_hit(1).model_dump() | {"timestamp": "2026-01-02"}, _hit(1).model_dump() | {"timestamp": "2026-01-01"}]
+    (data / "results.json").write_text(json.dumps(legacy))
+
+    assert len(_presenter(tmp_path)) == 1
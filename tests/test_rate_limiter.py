@@ -0,0 +1,51 @@
+import pytest
+
+from src.models import RateLimitPolicy
+from src.utils.rate_limiter import DomainRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_burst_then_rate() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # Bucket is empty: the third and fourth callers are queued one second apart.
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_min_interval() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100.0, capacity=5, min_interval=0.5, clock=clock)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_domains_do_not_wait_on_each_other() -> None:
+    limiter = DomainRateLimiter(
+        default=RateLimitPolicy(requests_per_second=0.01, burst=1, min_interval=0),
+        overrides={"tradera.com": RateLimitPolicy(requests_per_second=5, burst=3, min_interval=0)},
+    )
+
+    assert await limiter.acquire("https://www.blocket.se/annons/1") == 0.0
+    assert await limiter.acquire("https://www.finn.no/item/1") == 0.0
+    for n in range(3):
+        assert await limiter.acquire(f"https://www.tradera.com/item/{n}") == 0.0
+
+    assert limiter.stats["tradera.com"].requests == 3
+    assert limiter.stats["blocket.se"].max_wait == 0.0
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.models import ReadinessPolicy
+from src.services.readiness import READY_ATTRIBUTE, ReadinessTracker, build_wait_condition, wait_timed_out
+
+
+def test_wait_condition_embeds_policy_and_escaped_selector() -> None:
+    policy = ReadinessPolicy(stable_ms=500, min_text_length=120)
+
+    generic = build_wait_condition(policy)
+    specific = build_wait_condition(policy, 'article[data-id="ad"]')
+
+    assert generic.startswith("js:() => {")
+    assert "now - state.since >= 500" in generic and "len >= 120" in generic
+    assert 'const selector = "";' in generic
+    assert r'const selector = "article[data-id=\"ad\"]";' in specific
+    assert READY_ATTRIBUTE in generic
+
+
+def test_pages_without_the_ready_marker_timed_out() -> None:
+    assert wait_timed_out("<html><body>Loading...</body></html>")
+    assert not wait_timed_out(f'<html lang="sv" {READY_ATTRIBUTE}="1"><body>Ads</body></html>')
+
+
+def test_percentiles_and_timeouts_survive_a_save(tmp_path: Path) -> None:
+    path = str(tmp_path / "readiness.json")
+    tracker = ReadinessTracker(path)
+    for seconds in (1.0, 2.0, 3.0, 4.0):
+        tracker.record("blocket.se", seconds)
+    tracker.record("blocket.se", 10.0, timed_out=True)
+
+    assert tracker.percentiles("blocket.se") == pytest.approx((3.0, 8.8))
+    assert tracker.percentiles("unknown.se") == (0.0, 0.0)
+    tracker.save()
+
+    reloaded = ReadinessTracker(path)
+    assert reloaded.percentiles("blocket.se") == pytest.approx((3.0, 8.8))
+    assert reloaded.timeouts("blocket.se") == 1
+    summary = json.loads(Path(path).read_text())["summary"]["blocket.se"]
+    assert (summary["count"], summary["timeouts"]) == (5, 1)
+
+
+def test_saves_merge_samples_of_processes_sharing_the_file(tmp_path: Path) -> None:
+    path = tmp_path / "readiness.json"
+    first, second = ReadinessTracker(str(path)), ReadinessTracker(str(path))
+    first.record("tradera.com", 1.5)
+    second.record("tradera.com", 9.0, timed_out=True)
+    second.record("finn.no", 3.0)
+
+    first.save()
+    second.save()
+    second.save()
+
+    merged = ReadinessTracker(str(path)).samples
+    assert merged["tradera.com"] == [(1.5, False), (9.0, True)]
+    assert merged["finn.no"] == [(3.0, False)]
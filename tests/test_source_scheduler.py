@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from src.services.source_scheduler import SourceScheduler
+
+HOUR = 3600.0
+
+
+def _scheduler(tmp_path: Path) -> SourceScheduler:
+    return SourceScheduler(str(tmp_path / "schedule.json"), min_minutes=30, max_minutes=24 * 60, target_new=1.0)
+
+
+def test_hot_sources_are_polled_often_and_dead_ones_back_off(tmp_path: Path) -> None:
+    scheduler = _scheduler(tmp_path)
+    hot, dead = "Sub|blocket.se|xtz", "Sub|dba.dk|xtz"
+    now = 0.0
+    for source in (hot, dead):
+        assert scheduler.due(source, now)
+        scheduler.record(source, new_listings=10, now=now)  # first crawl: backlog, not arrivals
+
+    for _ in range(6):
+        now += 2 * HOUR
+        scheduler.record(hot, new_listings=8, now=now)
+        if scheduler.due(dead, now):
+            scheduler.record(dead, new_listings=0, now=now)
+
+    assert scheduler.sources[hot].interval_minutes == 30
+    assert scheduler.sources[dead].interval_minutes > 4 * 60
+    assert not scheduler.due(dead, now + HOUR)
+
+
+def test_intervals_stay_within_bounds_and_follow_the_arrival_rate(tmp_path: Path) -> None:
+    scheduler = _scheduler(tmp_path)
+    key = "Sub|tradera.com|xtz"
+    scheduler.record(key, new_listings=0, now=0)
+    scheduler.record(key, new_listings=1, now=4 * HOUR)
+    # One arrival in four hours: crawl about every four hours to find one new listing.
+    assert scheduler.sources[key].interval_minutes == 240
+
+    for n in range(2, 30):
+        scheduler.record(key, new_listings=0, now=n * 48 * HOUR)
+    assert scheduler.sources[key].interval_minutes == 24 * 60
+
+
+def test_schedule_persists_and_disabled_scheduler_crawls_everything(tmp_path: Path) -> None:
+    scheduler = _scheduler(tmp_path)
+    scheduler.record("a|b|c", new_listings=0, now=0)
+    scheduler.record("a|b|c", new_listings=0, now=HOUR)
+    scheduler.save()
+
+    reloaded = _scheduler(tmp_path)
+    assert reloaded.sources["a|b|c"].crawls == 2
+    assert not reloaded.due("a|b|c", now=HOUR + 60)
+
+    reloaded.enabled = False
+    assert reloaded.due("a|b|c", now=HOUR + 60)
@@ -0,0 +1,36 @@
+import json
+import time
+from pathlib import Path
+
+from src.services.storage import HistoryManager
+
+
+def test_migrates_legacy_json_once(tmp_path: Path) -> None:
+    legacy = tmp_path / "seen_items.json"
+    legacy.write_text(json.dumps(["https://a.se/item/1", "https://a.se/item/2"]))
+
+    history = HistoryManager(str(tmp_path / "seen.db"), legacy_json_path=str(legacy))
+    assert len(history) == 2
+    assert "https://a.se/item/1" in history
+    history.add("https://a.se/item/3")
+    history.close()
+
+    # Re-opening does not import the JSON again and keeps incremental additions.
+    legacy.write_text(json.dumps(["https://a.se/item/9"]))
+    reopened = HistoryManager(str(tmp_path / "seen.db"), legacy_json_path=str(legacy))
+    assert len(reopened) == 3
+    assert "https://a.se/item/9" not in reopened
+
+
+def test_add_keeps_first_seen_and_expire_drops_old(tmp_path: Path) -> None:
+    history = HistoryManager(str(tmp_path / "seen.db"))
+    history.add("https://a.se/item/1")
+    first = history.first_seen("https://a.se/item/1")
+    history.add("https://a.se/item/1")
+    assert history.first_seen("https://a.se/item/1") == first
+
+    history.conn.execute("UPDATE seen_items SET first_seen = ?", (time.time() - 40 * 86400,))
+    history.add("https://a.se/item/2")
+    assert history.expire(max_age_days=30) == 1
+    assert "https://a.se/item/1" not in history
+    assert "https://a.se/item/2" in history
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from src.utils.stats import percentile
+from src.utils.tracing import ERROR, Tracer
+from src.utils.usage_tracker import current_task
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_per_task_and_record_domain_and_outcome() -> None:
+    tracer = Tracer()
+
+    async def task(name: str) -> None:
+        current_task.set(name)
+        with tracer.span("task"), tracer.span("search_page", url=f"https://www.blocket.se/s?q={name}") as span:
+            with tracer.span("fetch.http"):
+                await asyncio.sleep(0.01)
+            span.outcome = "extracted"
+
+    await asyncio.gather(task("a"), task("b"))
+
+    by_name = {(s.task, s.name): s for s in tracer.spans}
+    fetch = by_name[("a", "fetch.http")]
+    assert fetch.parent_id == by_name[("a", "search_page")].span_id
+    assert fetch.domain == "blocket.se"
+    assert by_name[("b", "search_page")].outcome == "extracted"
+    assert by_name[("b", "task")].parent_id is None
+
+
+def test_exception_marks_span_as_error_and_summary_has_percentiles() -> None:
+    tracer = Tracer()
+    with pytest.raises(ValueError), tracer.span("llm.batch"):
+        raise ValueError("boom")
+    for _ in range(3):
+        with tracer.span("llm.batch"):
+            pass
+
+    row = tracer.summary()["stage"]["llm.batch"]
+    assert (row["count"], row["errors"]) == (4, 1)
+    assert row["p95"] >= row["p50"] >= 0
+
+
+def test_only_failed_spans_count_as_errors() -> None:
+    tracer = Tracer()
+    for outcome in ("ok", "cache", ERROR, "browser", ERROR):
+        with tracer.span("fetch", url="https://www.blocket.se/item/1") as span:
+            span.outcome = outcome
+
+    assert tracer.summary()["stage"]["fetch"]["errors"] == 2
+    assert tracer.summary()["domain"]["fetch @ blocket.se"]["errors"] == 2
+
+
+def test_percentile_interpolates_between_ranks() -> None:
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 0.5) == 2.5
+    assert percentile([float(n) for n in range(1, 21)], 0.95) == 19.05
+
+
+def test_chrome_trace_has_complete_events_and_task_lanes(tmp_path: Path) -> None:
+    tracer = Tracer()
+    token = current_task.set("XTZ")
+    with tracer.span("fetch", url="https://www.tradera.com/item/1/2", url_class="ad"):
+        pass
+    current_task.reset(token)
+    tracer.export_chrome(str(tmp_path / "run.trace.json"))
+    tracer.export_jsonl(str(tmp_path / "run.jsonl"))
+
+    events = json.loads((tmp_path / "run.trace.json").read_text())["traceEvents"]
+    complete = next(e for e in events if e["ph"] == "X")
+    assert complete["args"] == {
+        "outcome": "ok",
+        "domain": "tradera.com",
+        "url": "https://www.tradera.com/item/1/2",
+        "url_class": "ad",
+    }
+    assert {"ph": "M", "name": "thread_name", "pid": 1, "tid": complete["tid"], "args": {"name": "XTZ"}} in events
+    assert json.loads((tmp_path / "run.jsonl").read_text())["name"] == "fetch"
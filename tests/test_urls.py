@@ -0,0 +1,50 @@
+from src.models import PaginationRule
+from src.utils.urls import ad_id, ad_key, canonical_url, domain_of, results_page_url
+
+
+def test_domain_of_strips_www_and_case() -> None:
+    assert domain_of("https://WWW.Blocket.se/annons/1") == "blocket.se"
+
+
+def test_tradera_variants_share_one_canonical_url() -> None:
+    variants = [
+        "https://www.tradera.com/item/341234/612345678/xtz-12-17-edge?utm_source=feed#bids",
+        "http://tradera.com/item/341234/612345678/other-slug",
+        "https://www.tradera.com/item/341234/612345678/",
+    ]
+    assert {canonical_url(v) for v in variants} == {"https://www.tradera.com/item/341234/612345678/"}
+    assert ad_id(variants[0]) == "612345678"
+
+
+def test_kleinanzeigen_and_ebay_ids() -> None:
+    url = "https://www.kleinanzeigen.de/s-anzeige/xtz-subwoofer/2712345678-172-3331?searchId=9"
+    assert canonical_url(url) == "https://www.kleinanzeigen.de/s-anzeige/xtz-subwoofer/2712345678-172-3331"
+    assert ad_key(url) == "kleinanzeigen.de:2712345678"
+
+    ebay = "https://ebay.de/itm/XTZ-Sub-12-17/1234567890?_trksid=p2047675&hash=item1"
+    assert canonical_url(ebay) == "https://www.ebay.de/itm/1234567890"
+
+
+def test_unknown_site_keeps_meaningful_params_only() -> None:
+    url = "https://Shop.example/ad?id=5&utm_campaign=x&fbclid=abc&b=2"
+    assert canonical_url(url) == "https://shop.example/ad?b=2&id=5"
+    assert ad_key(url) == canonical_url(url)
+
+
+def test_search_urls_keep_their_query() -> None:
+    url = "https://www.blocket.se/recommerce/forsale/search?q=xtz+sub&utm_medium=mail"
+    assert canonical_url(url) == "https://www.blocket.se/recommerce/forsale/search?q=xtz+sub"
+
+
+def test_explicit_port_keeps_scheme_and_port() -> None:
+    assert canonical_url("http://127.0.0.1:8080/item/5?ref=x#top") == "http://127.0.0.1:8080/item/5"
+
+
+def test_results_pages_sort_newest_first_and_number_from_the_rule() -> None:
+    rule = PaginationRule(page_param="page", sort_params={"sort": "PUBLISHED_DESC"})
+    url = "https://www.blocket.se/recommerce/forsale/search?q=xtz&sort=RELEVANCE"
+
+    assert (
+        results_page_url(url, rule, 0) == "https://www.blocket.se/recommerce/forsale/search?q=xtz&sort=PUBLISHED_DESC"
+    )
+    assert results_page_url(url, rule, 2).endswith("?q=xtz&sort=PUBLISHED_DESC&page=3")
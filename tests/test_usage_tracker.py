@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.utils.usage_tracker import UsageTracker, current_task
+
+
+def test_usage_is_buffered_then_flushed_with_rollup(tmp_path: Path) -> None:
+    detail = tmp_path / "usage_detail.jsonl"
+    rollup = tmp_path / "usage_metrics.json"
+    tracker = UsageTracker(str(detail), rollup_file=str(rollup), flush_interval=3600)
+
+    token = current_task.set("XTZ Sub")
+    tracker.record("gemini-2.0-flash", "batch", "ok", latency=2.0, tokens_in=1000, tokens_out=200)
+    tracker.record("gemini-2.0-flash", "batch", "ok", latency=4.0, tokens_in=500, tokens_out=100)
+    current_task.reset(token)
+    tracker.record("gemini-2.0-flash", "search_page", "throttled", latency=0.5)
+    assert not detail.exists()
+
+    tracker.flush()
+
+    rows = [json.loads(line) for line in detail.read_text().splitlines()]
+    ok = next(r for r in rows if r["outcome"] == "ok")
+    assert (ok["task"], ok["calls"], ok["tokens_in"], ok["latency_max"]) == ("XTZ Sub", 2, 1500, 4.0)
+    assert next(r for r in rows if r["outcome"] == "throttled")["task"] == "-"
+
+    [entry] = next(iter(json.loads(rollup.read_text()).values()))
+    assert (entry["calls"], entry["tokens_in"], entry["tokens_out"], entry["failures"]) == (3, 1500, 300, 1)
+
+
+def test_tokens_from_usage_metadata() -> None:
+    response = SimpleNamespace(
+        usage_metadata=SimpleNamespace(prompt_token_count=120, candidates_token_count=None, total_token_count=150)
+    )
+    assert UsageTracker.tokens_from(response) == (120, 30)
+    assert UsageTracker.tokens_from(SimpleNamespace()) == (0, 0)
@@ -0,0 +1,206 @@
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+from conftest import FakeAnalyzer, FakeFetcher, FakeNotifier, make_pipeline
+
+from src.models import ProductCheck, ScrapeTask
+from src.services.distributed import DEEP_DIVE, SEARCH, VERIFY, Coordinator, QueueWorker
+from src.services.source_scheduler import SourceScheduler
+from src.services.work_queue import SQLiteWorkQueue, open_queue
+from src.utils.urls import ad_key, canonical_url
+
+
+def test_keys_make_enqueue_idempotent(tmp_path: Path) -> None:
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+
+    assert queue.enqueue("deep_dive", "ad|1", {"n": 1})
+    assert not queue.enqueue("deep_dive", "ad|1", {"n": 2})
+    [job] = queue.claim("w1")
+    assert queue.complete([job]) == 1
+    # Done jobs keep their key, so the ad is not queued again.
+    assert not queue.enqueue("deep_dive", "ad|1", {"n": 3})
+    assert queue.counts() == {"done": 1}
+
+
+def test_claims_follow_priority_and_never_overlap(tmp_path: Path) -> None:
+    path = str(tmp_path / "queue.db")
+    first, second = SQLiteWorkQueue(path), SQLiteWorkQueue(path)
+    first.enqueue("verify", "v", {}, priority=2)
+    first.enqueue("search", "s1", {}, priority=0)
+    first.enqueue("search", "s2", {}, priority=0)
+
+    claimed = first.claim("w1") + second.claim("w2") + first.claim("w1") + second.claim("w2")
+
+    assert [job.key for job in claimed] == ["s1", "s2", "v"]
+    assert first.outstanding() == 3
+
+
+def test_expired_leases_are_reclaimed_and_failures_retried(tmp_path: Path) -> None:
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.01, max_attempts=2)
+    queue.enqueue("deep_dive", "ad|1", {})
+
+    [job] = queue.claim("crashed")
+    assert queue.claim("w2") == []
+    time.sleep(0.02)
+    [retry] = queue.claim("w2")
+    assert retry.id == job.id and retry.attempts == 2
+
+    assert queue.fail([retry], "fetch failed") == 1
+    assert queue.counts() == {"failed": 1}
+    # A permanently failed key may be queued again from scratch.
+    assert queue.enqueue("deep_dive", "ad|1", {})
+    assert queue.claim("w3")[0].attempts == 1
+
+
+def test_a_job_that_keeps_losing_its_worker_fails_after_max_attempts(tmp_path: Path) -> None:
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.01, max_attempts=2)
+    queue.enqueue("deep_dive", "ad|1", {})
+
+    for worker in ("crashed-1", "crashed-2"):
+        assert len(queue.claim(worker)) == 1
+        time.sleep(0.02)
+
+    assert queue.claim("w3") == []
+    assert queue.counts() == {"failed": 1}
+
+
+def test_worker_that_lost_its_lease_cannot_settle_the_job(tmp_path: Path) -> None:
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.01)
+    queue.enqueue("deep_dive", "ad|1", {})
+    [stale] = queue.claim("slow")
+    time.sleep(0.02)
+    [current] = queue.claim("w2")
+
+    assert queue.complete([stale]) == 0
+    assert queue.fail([stale], "timeout") == 0
+    assert queue.counts() == {"running": 1}
+    assert queue.complete([current]) == 1
+    assert queue.counts() == {"done": 1}
+
+
+def test_unknown_backend_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="Unknown queue backend"):
+        open_queue("redis", str(tmp_path / "queue"))
+
+
+# Both sites list the same three ads.
+LISTED = [f"https://www.blocket.se/item/{n}" for n in (1, 2, 3)]
+
+
+@pytest.mark.asyncio
+async def test_workers_share_the_stages_and_handle_each_ad_once(tmp_path: Path) -> None:
+    path = str(tmp_path / "queue.db")
+    analyzer, notifier, seen = FakeAnalyzer(LISTED), FakeNotifier(), cast(set[str], set())
+    scheduler = SourceScheduler(str(tmp_path / "schedule.json"))
+    coordinator = Coordinator(
+        make_pipeline(analyzer, notifier=notifier, seen=seen, source_scheduler=scheduler), SQLiteWorkQueue(path)
+    )
+    task = ScrapeTask(name="Sub", search_query="xtz")
+
+    assert await coordinator.enqueue([task]) == 2
+    # Sources still waiting for a worker are not queued twice.
+    assert await coordinator.enqueue([task]) == 0
+
+    workers = [
+        QueueWorker(
+            make_pipeline(analyzer, notifier=notifier, seen=seen),
+            SQLiteWorkQueue(path),
+            f"w{n}",
+            idle_exit=0,
+            poll_interval=0.01,
+        )
+        for n in (1, 2)
+    ]
+    await asyncio.gather(*(worker.run(None) for worker in workers))
+
+    fetched = [url for w in workers for url in cast(FakeFetcher, w.pipeline.content_fetcher).fetched]
+    assert sum("/item/" in url for url in fetched) == 3
+    assert sorted(notifier.matches) == sorted(seen) and len(seen) == 3
+    assert sum(analyzer.batches) == 3
+    assert sum(w.done["search"] for w in workers) == 2
+    assert coordinator.queue.outstanding() == 0
+
+    # Crawl outcomes come back to the coordinator's schedule; sources that are due again are searched again.
+    coordinator.collect_search_results()
+    assert scheduler.run_crawled == 2
+    coordinator.pipeline.source_scheduler = None
+    assert await coordinator.enqueue([task]) == 2
+
+
+@pytest.mark.asyncio
+async def test_searches_report_only_ads_the_queue_never_held_as_new(tmp_path: Path) -> None:
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"), max_attempts=1)
+    # Ad 1 was found by an earlier search and its deep dive failed for good.
+    queue.enqueue(DEEP_DIVE, f"ad|{ad_key(canonical_url('https://www.blocket.se/item/1'))}", {})
+    queue.fail(queue.claim("earlier"), "fetch failed")
+
+    analyzer, notifier, seen = FakeAnalyzer(LISTED), FakeNotifier(), cast(set[str], set())
+    await Coordinator(make_pipeline(analyzer, notifier=notifier, seen=seen), queue).enqueue(
+        [ScrapeTask(name="Sub", search_query="xtz")]
+    )
+    worker = QueueWorker(
+        make_pipeline(analyzer, notifier=notifier, seen=seen), queue, "w1", idle_exit=0, poll_interval=0.01
+    )
+    await worker.run(None)
+
+    # Both sites list ads 1-3: ad 1 is retried but not new, and each ad counts once.
+    assert len(seen) == 3
+    assert sum(job.result["new_listings"] for job in queue.take_results(SEARCH) if job.result) == 2
+
+
+class DroppingAnalyzer(FakeAnalyzer):
+    """Leaves ad 2 out of its first batch answer, like a model that skips an ad."""
+
+    async def analyze_batch(self, item_name: str, ads: list[dict[str, str]]) -> list[ProductCheck]:
+        results = await super().analyze_batch(item_name, ads)
+        if len(self.batches) == 1:
+            return [res for res in results if not res.url.endswith("/item/2")]
+        return results
+
+
+@pytest.mark.asyncio
+async def test_ads_left_out_of_a_verify_batch_are_retried(tmp_path: Path) -> None:
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    analyzer, notifier, seen = DroppingAnalyzer(LISTED), FakeNotifier(), cast(set[str], set())
+    await Coordinator(make_pipeline(analyzer, notifier=notifier, seen=seen), queue).enqueue(
+        [ScrapeTask(name="Sub", search_query="xtz")]
+    )
+    worker = QueueWorker(
+        make_pipeline(analyzer, notifier=notifier, seen=seen),
+        queue,
+        "w1",
+        concurrency=1,
+        idle_exit=0,
+        poll_interval=0.01,
+    )
+    await worker.run(None)
+
+    assert analyzer.batches == [3, 1]
+    assert sorted(notifier.matches) == [f"https://www.blocket.se/item/{n}" for n in (1, 2, 3)]
+    assert worker.failed["verify"] == 1 and worker.done["verify"] == 3
+    assert queue.counts() == {"done": 8}
+
+
+@pytest.mark.asyncio
+async def test_a_locked_queue_does_not_stall_the_event_loop(tmp_path: Path) -> None:
+    path = str(tmp_path / "queue.db")
+    queue = SQLiteWorkQueue(path)
+    queue.enqueue(VERIFY, "verify|1", {"task": ScrapeTask(name="Sub", search_query="xtz").model_dump(), "ad": {}})
+    # Another process holds the write lock, so the worker's claim has to wait for it.
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+
+    worker = QueueWorker(cast(Any, None), queue, "w1", concurrency=2, idle_exit=0, poll_interval=0.01)
+    running = asyncio.create_task(worker.run(None))
+    started = time.monotonic()
+    await asyncio.sleep(0.05)
+    assert time.monotonic() - started < 0.5 and not running.done()
+
+    holder.execute("ROLLBACK")
+    worker.stop()
+    await asyncio.wait_for(running, timeout=5)
+    holder.close()